@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'projects.middleware.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -60,7 +61,7 @@ ROOT_URLCONF = 'project_management.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'projects.template_backend.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -130,6 +131,61 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic writes content-hashed names plus gzip/brotli and WebP/AVIF
+# copies; see projects/assets.py
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'projects.assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Cache (dashboard, progress series, project pages). Local memory by default;
+# set DJANGO_CACHE_DIR to share one file-based cache between worker processes
+# so that invalidations reach all of them. Management commands that write in
+# bulk clear the cache too; with LocMemCache that only clears their own copy.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'suivi-packs',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+if os.environ.get('DJANGO_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['DJANGO_CACHE_DIR'],
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+
+# Per-request timing (projects.middleware.ServerTimingMiddleware): sent as a
+# Server-Timing header when SERVER_TIMING is on, logged one line per request
+# when the projects.timing logger is at INFO (DJANGO_TIMING_LOG_LEVEL=INFO).
+SERVER_TIMING = DEBUG
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'projects': {
+            'handlers': ['console'],
+            'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'projects.timing': {
+            'level': os.environ.get('DJANGO_TIMING_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -145,6 +201,11 @@ BOOTSTRAP5 = {
 # Import-Export settings
 IMPORT_EXPORT_USE_TRANSACTIONS = True
 
+# Generated exports are kept on disk and reused until the data changes
+EXPORT_CACHE_DIR = os.path.join(BASE_DIR, 'export_cache')
+EXPORT_CACHE_MAX_SIZE = 500 * 1024 * 1024  # bytes
+EXPORT_CACHE_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,11 +1,40 @@
 from django.contrib import admin
 from import_export.admin import ImportExportModelAdmin
-from .models import Project
+from .models import Project, ProjectYear
+
+
+class ProjectYearFilter(admin.SimpleListFilter):
+    """Filter on the indexed ProjectYear rows instead of the JSON year lists."""
+    kind = None
+
+    def lookups(self, request, model_admin):
+        years = ProjectYear.objects.filter(kind=self.kind).values_list('year', flat=True).distinct().order_by('year')
+        return [(str(year), str(year)) for year in years]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(
+                pk__in=ProjectYear.objects.filter(kind=self.kind, year=int(self.value())).values('project_id')
+            )
+        return queryset
+
+
+class ImplementationYearFilter(ProjectYearFilter):
+    title = 'سنة التنفيذ'
+    parameter_name = 'implementation_year'
+    kind = ProjectYear.KIND_IMPLEMENTATION
+
+
+class BudgetYearFilter(ProjectYearFilter):
+    title = 'سنة الميزانية'
+    parameter_name = 'budget_year'
+    kind = ProjectYear.KIND_BUDGET
+
 
 @admin.register(Project)
 class ProjectAdmin(ImportExportModelAdmin):
-    list_display = ('code', 'program', 'location', 'district', 'start_year', 'estimated_cost')
-    list_filter = ('start_year', 'district', 'property_status')
+    list_display = ('code', 'program', 'location', 'district', 'start_year', 'estimated_cost', 'total_estimated_cost')
+    list_filter = ('start_year', ImplementationYearFilter, BudgetYearFilter, 'district', 'property_status')
     search_fields = ('code', 'program', 'location', 'district', 'planning_code')
     list_per_page = 20
     date_hierarchy = 'created_at'
@@ -0,0 +1,133 @@
+"""
+Read-only JSON API.
+
+Each resource lists the fields it exposes and the filters it accepts; the
+filters are the ones of the matching HTML list. A page is read with a
+single ``values()`` query restricted to the requested fields, so long
+text columns are only read when ``fields=`` asks for them, and is
+paginated by keyset on ``-id`` (``after``/``before`` cursors). The ETag is
+a hash of the page, so an unchanged page is answered with a 304.
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+
+from .exports import column_name, raw_export_fields
+from .filters import (
+    filter_execution_rates, filter_project_trackings, filter_projects,
+    EXECUTION_RATE_FILTER_PARAMS, PROJECT_FILTER_PARAMS, PROJECT_TRACKING_FILTER_PARAMS,
+)
+from .models import ExecutionRate, Project, ProjectTracking
+from .pagination import cursor_querystring, keyset_paginate
+
+API_PAGE_SIZE = 100
+MAX_API_PAGE_SIZE = 1000
+
+# Fields left out of a response unless ``fields=`` names them
+LONG_FIELD_TYPES = (models.TextField, models.JSONField)
+
+
+class ApiError(Exception):
+    """An invalid API request, answered with a 400."""
+
+
+class ApiResource:
+    """A read-only collection exposed by the API."""
+
+    def __init__(self, model, filter_function, filter_params, related=()):
+        self.model = model
+        self.filter_function = filter_function
+        self.filter_params = filter_params
+        lookups = raw_export_fields(model, related)
+        # Response name -> values() lookup
+        self.fields = {column_name(lookup): lookup for lookup in lookups}
+        self.default_fields = [
+            column_name(lookup) for lookup in lookups
+            if '__' in lookup or not isinstance(model._meta.get_field(lookup), LONG_FIELD_TYPES)
+        ]
+
+    def parse_fields(self, value):
+        """Return the field names selected by a ``fields=`` parameter."""
+        if not value:
+            return self.default_fields
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f"حقول غير معروفة: {', '.join(unknown)}")
+        return names
+
+    def page(self, params):
+        """Return ``(field names, KeysetPage of dicts)`` for the query parameters."""
+        names = self.parse_fields(params.get('fields'))
+        lookups = ['id'] + [self.fields[name] for name in names if name != 'id']
+        queryset = self.filter_function(self.model.objects.all(), params).values(*lookups)
+        page = keyset_paginate(
+            queryset,
+            after=params.get('after'),
+            before=params.get('before'),
+            per_page=parse_limit(params.get('limit')),
+        )
+        return names, page
+
+
+def parse_limit(value):
+    """Read the ``limit`` parameter, clamped to 1..MAX_API_PAGE_SIZE."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return API_PAGE_SIZE
+    return min(max(limit, 1), MAX_API_PAGE_SIZE)
+
+
+API_RESOURCES = {
+    'projects': ApiResource(Project, filter_projects, PROJECT_FILTER_PARAMS),
+    'execution-rates': ApiResource(
+        ExecutionRate, filter_execution_rates, EXECUTION_RATE_FILTER_PARAMS, related=['project__code'],
+    ),
+    'project-trackings': ApiResource(
+        ProjectTracking, filter_project_trackings, PROJECT_TRACKING_FILTER_PARAMS, related=['project__code'],
+    ),
+}
+
+
+def api_response(request, resource):
+    """JSON page of ``resource`` for ``request.GET``, or a 304 when unchanged."""
+    try:
+        names, page = resource.page(request.GET)
+    except ApiError as error:
+        return JsonResponse({'error': str(error), 'fields': list(resource.fields)}, status=400)
+
+    lookups = [resource.fields[name] for name in names]
+    path = request.path
+    next_query = cursor_querystring(request.GET, after=page.next_cursor) if page.next_cursor else None
+    previous_query = cursor_querystring(request.GET, before=page.previous_cursor) if page.previous_cursor else None
+    content = json.dumps({
+        'results': [{name: row[lookup] for name, lookup in zip(names, lookups)} for row in page],
+        'next': f'{path}?{next_query}' if next_query else None,
+        'previous': f'{path}?{previous_query}' if previous_query else None,
+    }, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+    etag = '"{}"'.format(hashlib.sha256(content.encode('utf-8')).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def api_index(request):
+    """List the resources with their fields and filters."""
+    return JsonResponse({
+        name: {
+            'url': request.build_absolute_uri(f'{name}/'),
+            'fields': list(resource.fields),
+            'default_fields': resource.default_fields,
+            'filters': list(resource.filter_params) + ['fields', 'limit', 'after', 'before'],
+        }
+        for name, resource in API_RESOURCES.items()
+    }, json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,210 @@
+"""
+Static asset pipeline.
+
+``collectstatic`` stores every file under a content-hashed name listed in
+the manifest, writes gzip (and brotli, when the ``brotli`` package is
+installed) copies next to the text assets, and, when Pillow is installed,
+WebP/AVIF versions of the PNG/JPEG images. ``serve_static`` sends the
+smallest copy the browser accepts; hashed names never change content, so
+they are cached for a year and a repeat visit loads no static bytes.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map')
+# Smaller files gain nothing once headers are counted
+MIN_COMPRESS_SIZE = 256
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+# Extension -> (Pillow format, MIME type, save options), best first
+IMAGE_VARIANTS = {
+    '.avif': ('AVIF', 'image/avif', {'quality': 60}),
+    '.webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 6}),
+}
+
+# Content encoding -> file suffix, preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CACHE_FOREVER = 'public, max-age=31536000, immutable'
+# Names ManifestStaticFilesStorage gives its copies: name.<12 hex digits>.ext
+_HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^.]+$')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed static files with precompressed and next-generation image copies."""
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        # Files not collected by this storage yet (development, tests, an old
+        # STATIC_ROOT) keep their plain name rather than a guessed hashed one
+        if self.hash_key(urlsplit(unquote(name)).path.strip()) not in self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        for name in list(paths):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                for variant, hashed_variant in self._save_image_variants(name):
+                    self.hashed_files[self.hash_key(variant)] = hashed_variant
+                    yield variant, hashed_variant, True
+        self.save_manifest()
+
+        for name in set(self.hashed_files) | set(self.hashed_files.values()):
+            if name.lower().endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self._save_compressed(name)
+
+    def _save_image_variants(self, name):
+        try:
+            from PIL import Image, features
+        except ImportError:
+            return []
+
+        with self.open(self.stored_name(name)) as original:
+            data = original.read()
+        saved = []
+        root = os.path.splitext(name)[0]
+        for extension, (image_format, _, save_options) in IMAGE_VARIANTS.items():
+            if not features.check(image_format.lower()):
+                continue
+            buffer = BytesIO()
+            with Image.open(BytesIO(data)) as image:
+                image.save(buffer, image_format, **save_options)
+            if buffer.tell() >= len(data):
+                continue
+            variant = root + extension
+            content = ContentFile(buffer.getvalue())
+            hashed_variant = self.hashed_name(variant, content)
+            for target in (variant, hashed_variant):
+                if self.exists(target):
+                    self.delete(target)
+                self._save(target, content)
+            saved.append((variant, hashed_variant))
+        return saved
+
+    def _save_compressed(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        compressors = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressors['.br'] = lambda data: brotli.compress(data, quality=11)
+        for suffix, compress in compressors.items():
+            compressed = compress(data)
+            if len(compressed) >= len(data) * 0.95:
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+
+def image_variants(name):
+    """
+    Return ``[(url, MIME type)]`` of the collected WebP/AVIF copies of the
+    image ``name``, best first. Empty in development, where files are served
+    from the app directories and the copies do not exist.
+    """
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    if settings.DEBUG or not hashed_files:
+        return []
+    root = posixpath.splitext(name)[0]
+    return [
+        (staticfiles_storage.url(root + extension), mime_type)
+        for extension, (_, mime_type, _) in IMAGE_VARIANTS.items()
+        if root + extension in hashed_files
+    ]
+
+
+def accepted_encodings(header):
+    """
+    Return ``{coding: quality}`` for an Accept-Encoding header. A coding with
+    quality 0 is refused; ``*`` stands for the codings not listed.
+    """
+    qualities = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def _preferred_encodings(header):
+    # Highest quality first; ENCODINGS order breaks ties
+    qualities = accepted_encodings(header)
+    ranked = [(qualities.get(coding, qualities.get('*', 0.0)), coding, suffix) for coding, suffix in ENCODINGS]
+    return [(coding, suffix) for quality, coding, suffix in sorted(ranked, key=lambda item: -item[0]) if quality > 0]
+
+
+def serve_static(request, path):
+    """
+    Serve a collected static file, precompressed when the browser accepts it,
+    with far-future caching for hashed names.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    encoding = None
+    for candidate, suffix in _preferred_encodings(request.headers.get('Accept-Encoding', '')):
+        if os.path.isfile(full_path + suffix):
+            encoding, served_path = candidate, full_path + suffix
+            break
+    else:
+        served_path = full_path
+
+    stat = os.stat(served_path)
+    # HTTP dates have whole seconds, as does If-Modified-Since
+    last_modified = int(stat.st_mtime)
+    etag = f'"{last_modified}-{stat.st_size}-{encoding or "identity"}"'
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Vary'] = 'Accept-Encoding'
+    if _HASHED_NAME_RE.search(path):
+        response['Cache-Control'] = CACHE_FOREVER
+    else:
+        response['Cache-Control'] = 'public, no-cache'
+    return response
@@ -0,0 +1,174 @@
+"""
+Benchmarks of the hot views, the project import and the exports.
+
+Each target is timed against a database seeded with ``seeding.seed_portfolio``
+and run through the test client, so middleware and templates are included.
+The page cache and the export cache are emptied before every run, so the
+figures are those of a first visit. Results are plain dicts that can be
+saved as JSON and compared with an earlier run by ``compare_results``.
+"""
+import statistics
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from . import export_cache, jobs
+from .models import ImportJob, Project
+from .seeding import import_rows, iter_import_workbook
+from .xlsx import XLSX_CONTENT_TYPE
+
+BENCHMARK_SIZES = (1000, 10000, 100000)
+
+# A run slower than the baseline by this share is a regression...
+DEFAULT_TOLERANCE = 0.25
+# ...unless it is only slower by less than this many seconds (timer noise)
+MIN_REGRESSION_SECONDS = 0.01
+
+
+class BenchmarkError(Exception):
+    """A benchmarked request did not succeed."""
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook counting queries and their time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def _get(client, path, **params):
+    response = client.get(path, params)
+    if response.status_code != 200:
+        raise BenchmarkError(f'GET {path}: HTTP {response.status_code}')
+    # Streamed responses only do their work when read
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def _middle_project_pk():
+    count = Project.objects.count()
+    return Project.objects.order_by('pk').values_list('pk', flat=True)[count // 2]
+
+
+def bench_project_list(client, rows):
+    return lambda: _get(client, reverse('projects:project_list'))
+
+
+def bench_project_detail(client, rows):
+    path = reverse('projects:project_detail', kwargs={'pk': _middle_project_pk()})
+    return lambda: _get(client, path)
+
+
+def bench_execution_rate_list(client, rows):
+    return lambda: _get(client, reverse('projects:execution_rate_list'))
+
+
+def bench_export_projects(client, rows):
+    def run():
+        export_cache.clear()
+        _get(client, reverse('projects:export_projects'))
+    return run
+
+
+def bench_export_execution_rates(client, rows):
+    def run():
+        export_cache.clear()
+        _get(client, reverse('projects:execution_rate_export'))
+    return run
+
+
+def build_import_workbook(rows, seed=0, start=1):
+    """Return the bytes of an import workbook holding ``rows`` synthetic projects."""
+    return b''.join(iter_import_workbook(import_rows(rows, seed, start)))
+
+
+def bench_import_projects(client, rows):
+    runs = 0
+
+    def run():
+        nonlocal runs
+        runs += 1
+        # Every run imports new codes, so no row is skipped as a duplicate
+        workbook = build_import_workbook(rows, start=runs * rows + 1)
+        upload = SimpleUploadedFile('benchmark.xlsx', workbook, content_type=XLSX_CONTENT_TYPE)
+        # Run the job here rather than in the web process's worker thread
+        with mock.patch.object(jobs, 'IMPORT_WORKER_IN_PROCESS', False):
+            response = client.post(reverse('projects:project_import'), {'file': upload})
+        if response.status_code != 302:
+            raise BenchmarkError(f'import: HTTP {response.status_code}')
+        jobs.work_queue()
+        job = ImportJob.objects.latest('pk')
+        if job.status != ImportJob.STATUS_COMPLETED or job.rows_created != rows:
+            raise BenchmarkError(f'import: job {job.status}, {job.rows_created}/{rows} rows created')
+    return run
+
+
+# name -> factory(client, rows) returning the callable to time. The import
+# adds projects, so it is run last.
+BENCHMARK_TARGETS = {
+    'project_list': bench_project_list,
+    'project_detail': bench_project_detail,
+    'execution_rate_list': bench_execution_rate_list,
+    'export_projects': bench_export_projects,
+    'export_execution_rates': bench_export_execution_rates,
+    'import_projects': bench_import_projects,
+}
+
+
+def measure(name, rows, repeat=3):
+    """
+    Time target ``name`` ``repeat`` times against the current data. Returns a
+    result dict; ``seconds`` is the fastest run.
+    """
+    run = BENCHMARK_TARGETS[name](Client(), rows)
+    timings = []
+    for _ in range(repeat):
+        cache.clear()
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start, counter.seconds, counter.queries))
+    seconds, db_time, queries = min(timings)
+    return {
+        'target': name,
+        'rows': rows,
+        'seconds': round(seconds, 5),
+        'median': round(statistics.median(timing[0] for timing in timings), 5),
+        'db_seconds': round(db_time, 5),
+        'queries': queries,
+    }
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare results with the results of a baseline run. Returns
+    ``[(result, baseline seconds or None, regressed)]``.
+    """
+    previous = {(item['target'], item['rows']): item['seconds'] for item in baseline}
+    comparison = []
+    for result in results:
+        before = previous.get((result['target'], result['rows']))
+        regressed = (
+            before is not None
+            and result['seconds'] > before * (1 + tolerance)
+            and result['seconds'] - before > MIN_REGRESSION_SECONDS
+        )
+        comparison.append((result, before, regressed))
+    return comparison
@@ -0,0 +1,82 @@
+"""
+Portfolio figures shown on the home page.
+
+Everything comes from five aggregate queries (one per GROUP BY plus two
+totals). The result is cached and dropped by the signals in ``signals.py``
+whenever a project or an execution rate changes, so the home page normally
+does not touch the projects table at all.
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import ExecutionRate, Project, latest_execution_rates
+
+DASHBOARD_CACHE_KEY = 'projects:dashboard'
+# Overdue projects depend on today's date, so the figures are never kept
+# longer than this even when nothing changes
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+# Number of programs listed; the rest are summed into one line
+TOP_PROGRAMS = 10
+
+
+def _cost_breakdown(field):
+    return list(
+        Project.objects.values(field)
+        .annotate(count=Count('pk'), total=Sum('estimated_cost'))
+        .order_by('-total', field)
+    )
+
+
+def compute_dashboard():
+    today = timezone.localdate()
+    totals = Project.objects.aggregate(
+        count=Count('pk'),
+        estimated_cost=Sum('estimated_cost'),
+        total_estimated_cost=Sum('total_estimated_cost'),
+    )
+    # Only the latest snapshot of each project describes where it stands now
+    latest = ExecutionRate.objects.filter(pk=Subquery(latest_execution_rates('project').values('pk')[:1]))
+    execution = latest.aggregate(
+        avg_work_progress=Avg('work_progress_percentage'),
+        avg_financial_achievement=Avg('financial_achievement_percentage'),
+        tracked_projects=Count('project', distinct=True),
+        # Finished late, or past the expected end date and still running
+        delayed_projects=Count('project', distinct=True, filter=(
+            Q(duration_difference_days__gt=0) |
+            Q(actual_end_date__isnull=True, expected_end_date__lt=today)
+        )),
+    )
+
+    by_program = _cost_breakdown('program')
+    other_programs = by_program[TOP_PROGRAMS:]
+    by_program = by_program[:TOP_PROGRAMS]
+    if other_programs:
+        by_program.append({
+            'program': None,
+            'count': sum(row['count'] for row in other_programs),
+            'total': sum(row['total'] or 0 for row in other_programs),
+        })
+
+    return {
+        'totals': totals,
+        'execution': execution,
+        'by_district': _cost_breakdown('district'),
+        'by_year': sorted(_cost_breakdown('start_year'), key=lambda row: row['start_year'] or 0),
+        'by_program': by_program,
+        'computed_at': timezone.now(),
+    }
+
+
+def get_dashboard():
+    """Return the cached dashboard figures, computing them on a miss."""
+    dashboard = cache.get(DASHBOARD_CACHE_KEY)
+    if dashboard is None:
+        dashboard = compute_dashboard()
+        cache.set(DASHBOARD_CACHE_KEY, dashboard, DASHBOARD_CACHE_TIMEOUT)
+    return dashboard
+
+
+def invalidate_dashboard():
+    cache.delete(DASHBOARD_CACHE_KEY)
@@ -0,0 +1,206 @@
+"""
+Disk cache for generated exports.
+
+An export is identified by its kind and format, its normalized filters and a
+fingerprint of the rows it reads (latest ``updated_at`` and row count). Any
+edit, addition or deletion changes the fingerprint, so stale files are never
+served; they simply stop being requested and are evicted by age and by total
+size.
+
+The cache key doubles as the ETag of the response, and the latest
+``updated_at`` as its Last-Modified date, so browsers revalidating a download
+get a 304 without the file being read at all.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CACHE_DIR = getattr(settings, 'EXPORT_CACHE_DIR', os.path.join(settings.BASE_DIR, 'export_cache'))
+EXPORT_CACHE_MAX_SIZE = getattr(settings, 'EXPORT_CACHE_MAX_SIZE', 500 * 1024 * 1024)
+EXPORT_CACHE_MAX_AGE = getattr(settings, 'EXPORT_CACHE_MAX_AGE', 7 * 24 * 60 * 60)
+
+# Bump when the layout of an export changes so that older files are not served
+EXPORT_CACHE_VERSION = 2
+
+_DATA_SUFFIX = '.export'
+_META_SUFFIX = '.json'
+
+
+def normalize_filters(params, names):
+    """Keep the non-empty filters among ``names``, with spaces collapsed."""
+    filters = {}
+    for name in names:
+        value = ' '.join((params.get(name) or '').split())
+        if value:
+            filters[name] = value
+    return filters
+
+
+def fingerprint(queryset, timestamp_fields=('updated_at',)):
+    """Return (row count, latest timestamp) of ``queryset`` in a single query."""
+    aggregates = {f'latest_{index}': Max(field) for index, field in enumerate(timestamp_fields)}
+    values = queryset.order_by().aggregate(rows=Count('pk'), **aggregates)
+    timestamps = [values[name] for name in aggregates if values[name] is not None]
+    return values['rows'], max(timestamps) if timestamps else None
+
+
+def cache_key(kind, export_format, filters, rows, latest):
+    payload = json.dumps(
+        [EXPORT_CACHE_VERSION, kind, export_format, filters, rows, latest.isoformat() if latest else None],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _paths(key):
+    return (os.path.join(EXPORT_CACHE_DIR, key + _DATA_SUFFIX),
+            os.path.join(EXPORT_CACHE_DIR, key + _META_SUFFIX))
+
+
+def _cached_response(key):
+    data_path, meta_path = _paths(key)
+    try:
+        with open(meta_path, encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+        file = open(data_path, 'rb')
+    except (OSError, ValueError):
+        return None
+    # Hits count as recent use for the size-based eviction
+    now = time.time()
+    for path in (data_path, meta_path):
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+    response = FileResponse(file, content_type=meta['content_type'])
+    response['Content-Disposition'] = meta['content_disposition']
+    return response
+
+
+def _store(key, response, chunks):
+    """
+    Yield ``chunks`` unchanged while copying them to a temporary file that
+    replaces the cache entry once the last chunk has been sent.
+    """
+    data_path, meta_path = _paths(key)
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=EXPORT_CACHE_DIR, suffix='.tmp')
+    complete = False
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            for chunk in chunks:
+                temp_file.write(chunk)
+                yield chunk
+        with open(meta_path, 'w', encoding='utf-8') as meta_file:
+            json.dump({
+                'content_type': response['Content-Type'],
+                'content_disposition': response.get('Content-Disposition', ''),
+            }, meta_file)
+        os.replace(temp_path, data_path)
+        complete = True
+    finally:
+        # The download was interrupted or failed: nothing is cached
+        if not complete and os.path.exists(temp_path):
+            os.remove(temp_path)
+    try:
+        evict()
+    except OSError:
+        logger.exception('Export cache eviction failed')
+
+
+def cached_export(request, kind, export_format, queryset, filters, build_response,
+                  timestamp_fields=('updated_at',)):
+    """
+    Answer an export request from the cache when possible.
+
+    ``build_response()`` is only called on a cache miss; its response is sent
+    as usual and saved on disk as it goes out. Responses other than 200 are
+    not cached.
+    """
+    rows, latest = fingerprint(queryset, timestamp_fields)
+    key = cache_key(kind, export_format, filters, rows, latest)
+    etag = f'"{key}"'
+    # HTTP dates have whole seconds; keeping the fraction would never match If-Modified-Since
+    last_modified = int(latest.timestamp()) if latest else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = _cached_response(key)
+    if response is None:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+        if response.streaming:
+            response.streaming_content = _store(key, response, response.streaming_content)
+        else:
+            # Consume the generator so the file is written right away
+            for _ in _store(key, response, [response.content]):
+                pass
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Browsers may keep the file but must check the ETag before reusing it
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def evict(max_size=None, max_age=None):
+    """
+    Delete entries older than ``max_age`` seconds, then the least recently
+    used ones until the cache fits in ``max_size`` bytes. Returns the number of
+    entries removed.
+    """
+    max_size = EXPORT_CACHE_MAX_SIZE if max_size is None else max_size
+    max_age = EXPORT_CACHE_MAX_AGE if max_age is None else max_age
+    if not os.path.isdir(EXPORT_CACHE_DIR):
+        return 0
+
+    entries = []
+    now = time.time()
+    for name in os.listdir(EXPORT_CACHE_DIR):
+        path = os.path.join(EXPORT_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if name.endswith('.tmp'):
+            # Left behind by a killed process
+            if now - stat.st_mtime > max_age:
+                os.remove(path)
+            continue
+        if name.endswith(_DATA_SUFFIX):
+            entries.append((stat.st_mtime, stat.st_size, name[:-len(_DATA_SUFFIX)]))
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, key in entries:
+        if now - mtime <= max_age and total <= max_size:
+            break
+        for path in _paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def clear():
+    """Delete every cached export."""
+    return evict(max_size=0, max_age=0)
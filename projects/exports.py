@@ -0,0 +1,442 @@
+"""
+Streaming exports.
+
+Rows are read with ``values_list(...).iterator()`` in chunks and written as
+they arrive, so memory stays flat and the first bytes reach the browser
+before the whole table has been read.
+
+The export views write .xlsx, .xls and CSV from one ``ExportSpec`` per model,
+so the three show the same columns. Raw data can also be exported as CSV
+(``raw_csv``), NDJSON or Parquet (``RAW_EXPORT_FORMATS``) with one column per
+model field.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import ExecutionRate, Project
+from .xlsx import StreamSink, StreamingXlsxWriter, XlsxStyle, XLSX_CONTENT_TYPE
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Data rows that fit in a .xls sheet
+XLS_MAX_ROWS = 65535
+
+# Parquet row groups are much cheaper to read when they are not tiny
+PARQUET_CHUNK_SIZE = 20000
+
+HEADER_STYLE = XlsxStyle(
+    bold=True, font_color='FFFFFF', font_size=11, fill_color='808080',
+    border='thin', border_color='FFFFFF',
+    horizontal='center', vertical='center', wrap=True, right_to_left=True,
+)
+TEXT_STYLE = XlsxStyle(
+    border='thin', horizontal='right', vertical='center', wrap=True, right_to_left=True,
+)
+NUMBER_STYLE = XlsxStyle(
+    border='thin', horizontal='right', vertical='center', num_format='#,##0.00',
+)
+INTEGER_STYLE = XlsxStyle(
+    border='thin', horizontal='right', vertical='center', num_format='#,##0',
+)
+# Percentages are stored as 0-100, so the % sign is a literal
+PERCENT_STYLE = XlsxStyle(
+    border='thin', horizontal='right', vertical='center', num_format='0.00"%"',
+)
+DATE_STYLE = XlsxStyle(
+    border='thin', horizontal='right', vertical='center', num_format='yyyy-mm-dd',
+)
+
+# xlwt only knows its palette; colours outside this map are left out of .xls files
+_XLS_COLOURS = {'FFFFFF': 'white', '808080': 'gray50', '000080': 'dark_blue', '000000': 'black'}
+
+
+def _xls_style(style):
+    """Translate an XlsxStyle into the equivalent xlwt style."""
+    import xlwt
+
+    font = [f'height {style.font_size * 20}']
+    if style.bold:
+        font.append('bold on')
+    if style.font_color in _XLS_COLOURS:
+        font.append(f'colour {_XLS_COLOURS[style.font_color]}')
+    parts = ['font: ' + ', '.join(font)]
+
+    alignment = []
+    if style.horizontal:
+        alignment.append(f'horz {style.horizontal}')
+    if style.vertical:
+        alignment.append(f'vert {style.vertical}')
+    if style.wrap:
+        alignment.append('wrap on')
+    if style.right_to_left:
+        alignment.append('direction rl')
+    if alignment:
+        parts.append('align: ' + ', '.join(alignment))
+
+    if style.border:
+        borders = 'left thin, right thin, top thin, bottom thin'
+        if style.border_color in _XLS_COLOURS:
+            colour = _XLS_COLOURS[style.border_color]
+            borders += f', left_colour {colour}, right_colour {colour}, top_colour {colour}, bottom_colour {colour}'
+        parts.append('borders: ' + borders)
+
+    if style.fill_color in _XLS_COLOURS:
+        parts.append(f'pattern: pattern solid, fore_colour {_XLS_COLOURS[style.fill_color]}')
+
+    return xlwt.easyxf('; '.join(parts), num_format_str=style.num_format or 'General')
+
+
+def local_date(value):
+    """Timestamps are exported as the local calendar date."""
+    if value is None:
+        return None
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def list_text(value):
+    if isinstance(value, (list, tuple)):
+        return ', '.join(map(str, value))
+    if isinstance(value, dict):
+        return str(value)
+    return value
+
+
+class ExportColumn:
+    """
+    One column of a spreadsheet export.
+
+    ``accessor`` is a ``values_list`` lookup (``project__code``), ``formatter``
+    an optional function applied to the value read, and ``style`` the
+    XlsxStyle of the data cells.
+    """
+
+    def __init__(self, header, accessor, formatter=None, style=TEXT_STYLE, width=15):
+        self.header = header
+        self.accessor = accessor
+        self.formatter = formatter
+        self.style = style
+        self.width = width
+
+
+class ExportSpec:
+    """
+    Column registry of an export. The same spec drives the .xlsx, .xls and CSV
+    outputs, so the three always show the same columns in the same order.
+    """
+
+    def __init__(self, sheet_name, filename_prefix, columns, ordering=('pk',),
+                 header_style=HEADER_STYLE, header_height=25):
+        self.sheet_name = sheet_name
+        self.filename_prefix = filename_prefix
+        self.columns = columns
+        self.ordering = ordering
+        self.header_style = header_style
+        self.header_height = header_height
+        self._xls_styles = None
+
+    @property
+    def headers(self):
+        return [column.header for column in self.columns]
+
+    def iter_rows(self, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        """Yield one list of formatted cell values per object, reading the table in chunks."""
+        lookups = [column.accessor for column in self.columns]
+        formatters = [column.formatter for column in self.columns]
+        rows = queryset.order_by(*self.ordering).values_list(*lookups).iterator(chunk_size=chunk_size)
+        for row in rows:
+            yield [
+                formatter(value) if formatter else value
+                for formatter, value in zip(formatters, row)
+            ]
+
+    def _attachment(self, response, extension):
+        response['Content-Disposition'] = (
+            f'attachment; filename="{export_filename(self.filename_prefix, extension)}"'
+        )
+        return response
+
+    def xlsx_response(self, queryset):
+        """Stream an RTL-styled .xlsx workbook."""
+        writer = StreamingXlsxWriter(
+            self.sheet_name,
+            [(column.header, column.width, column.style) for column in self.columns],
+            header_style=self.header_style,
+            show_grid=False,
+            header_height=self.header_height,
+        )
+        response = StreamingHttpResponse(writer.iter_bytes(self.iter_rows(queryset)),
+                                         content_type=XLSX_CONTENT_TYPE)
+        return self._attachment(response, 'xlsx')
+
+    def csv_response(self, queryset):
+        """Stream the same columns as UTF-8 CSV with a byte order mark."""
+        chunks = _chunked(self.iter_rows(queryset), EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(_iter_csv_chunks(self.headers, chunks),
+                                         content_type='text/csv; charset=utf-8')
+        return self._attachment(response, 'csv')
+
+    def xls_response(self, queryset):
+        """
+        Legacy .xls workbook (65,535 rows at most). The BIFF format is only
+        written once the workbook is complete, so it is saved straight into
+        the response instead of being streamed.
+        """
+        import xlwt
+
+        if self._xls_styles is None:
+            self._xls_styles = (
+                _xls_style(self.header_style),
+                [_xls_style(column.style) for column in self.columns],
+            )
+        header_style, column_styles = self._xls_styles
+
+        workbook = xlwt.Workbook(encoding='utf-8')
+        sheet = workbook.add_sheet(self.sheet_name[:31])
+        sheet.cols_right_to_left = True
+        sheet.set_panes_frozen(True)
+        sheet.set_horz_split_pos(1)
+        for index, column in enumerate(self.columns):
+            sheet.col(index).width = 256 * column.width
+            sheet.write(0, index, column.header, header_style)
+
+        for row_number, values in enumerate(islice(self.iter_rows(queryset), XLS_MAX_ROWS), 1):
+            row = sheet.row(row_number)
+            for index, value in enumerate(values):
+                row.write(index, value, column_styles[index])
+
+        response = HttpResponse(content_type='application/vnd.ms-excel')
+        workbook.save(response)
+        return self._attachment(response, 'xls')
+
+    def response(self, queryset, export_format='xlsx'):
+        if export_format == 'xls':
+            return self.xls_response(queryset)
+        if export_format == 'csv':
+            return self.csv_response(queryset)
+        return self.xlsx_response(queryset)
+
+
+def export_filename(prefix, extension):
+    return f'{prefix}_{timezone.localtime().strftime("%Y%m%d_%H%M")}.{extension}'
+
+
+# The order matches the legacy .xls export
+PROJECT_EXPORT = ExportSpec('المشاريع', 'projects_export', [
+    ExportColumn('مصادر التمويل المحتملة', 'funding_sources', width=19),
+    ExportColumn('الشركاء المحتملين', 'potential_partners', width=19),
+    ExportColumn('المؤشر 3', 'indicator_3'),
+    ExportColumn('المؤشر 2', 'indicator_2'),
+    ExportColumn('المؤشر 1', 'indicator_1'),
+    ExportColumn('سنوات الميزانية', 'budget_years', list_text),
+    ExportColumn('سنوات التنفيذ', 'implementation_years', list_text),
+    ExportColumn('المدة التقديرية(أشهر)', 'estimated_duration'),
+    ExportColumn('سنة الانطلاق', 'start_year', width=11),
+    ExportColumn('التكلفة التقديرية', 'estimated_cost', style=NUMBER_STYLE),
+    ExportColumn('الإنجازات', 'achievements', width=23),
+    ExportColumn('الدراسات', 'studies', width=19),
+    ExportColumn('كلفة تعبئة العقار', 'property_prep_cost', style=NUMBER_STYLE),
+    ExportColumn('المساحة', 'area', style=NUMBER_STYLE, width=11),
+    ExportColumn('الرسم العقاري', 'property_drawing'),
+    ExportColumn('وضعية العقار', 'property_status'),
+    ExportColumn('الفئة المستهدفة', 'target_group'),
+    ExportColumn('مكونات المشروع', 'components', width=23),
+    ExportColumn('الرمز في تصميم التهيئة', 'planning_code'),
+    ExportColumn('المقاطعة/الجماعة', 'district'),
+    ExportColumn('المكان', 'location'),
+    ExportColumn('المشاريع', 'projects', width=23),
+    ExportColumn('البرنامج', 'program'),
+    ExportColumn('الرمز', 'code', width=8),
+    ExportColumn('الاهداف التنموية', 'development_goals', width=23),
+])
+
+EXECUTION_RATE_EXPORT = ExportSpec('معدلات التنفيذ', 'execution_rates_export', [
+    ExportColumn('رمز المشروع', 'project__code', width=12),
+    ExportColumn('البرنامج', 'project__program', width=25),
+    ExportColumn('المشاريع', 'project__projects', width=40),
+    ExportColumn('المبلغ المبرمج', 'programmed_amount', style=NUMBER_STYLE),
+    ExportColumn('تعبئة الشركاء', 'partner_contribution', style=NUMBER_STYLE),
+    ExportColumn('تاريخ البرمجة', 'programming_date', style=DATE_STYLE),
+    ExportColumn('تاريخ إطلاق الصفقات', 'market_launch_date', style=DATE_STYLE),
+    ExportColumn('التكاليف الفعلية (أ)', 'actual_costs', style=NUMBER_STYLE),
+    ExportColumn('التكاليف التقديرية (ب)', 'estimated_costs', style=NUMBER_STYLE),
+    ExportColumn('فرق التكلفة (%)', 'cost_difference_percentage', style=PERCENT_STYLE),
+    ExportColumn('تاريخ الانتهاء المتوقع', 'expected_end_date', style=DATE_STYLE),
+    ExportColumn('تاريخ البداية الفعلية', 'actual_start_date', style=DATE_STYLE),
+    ExportColumn('تاريخ الانتهاء الفعلي', 'actual_end_date', style=DATE_STYLE),
+    ExportColumn('فرق المدة (بالأيام)', 'duration_difference_days', style=INTEGER_STYLE),
+    ExportColumn('معدل التأخير (%)', 'delay_percentage', style=PERCENT_STYLE),
+    ExportColumn('معدل التقدم (%) للأشغال', 'work_progress_percentage', style=PERCENT_STYLE),
+    ExportColumn('معدل الإنجاز (%) (مالي)', 'financial_achievement_percentage', style=PERCENT_STYLE),
+    ExportColumn('تاريخ الإنشاء', 'created_at', local_date, style=DATE_STYLE),
+    ExportColumn('آخر تحديث', 'updated_at', local_date, style=DATE_STYLE),
+], ordering=('-created_at', '-pk'))
+
+EXPORT_SPECS = {
+    'projects': PROJECT_EXPORT,
+    'execution_rates': EXECUTION_RATE_EXPORT,
+}
+SPEC_EXPORT_FORMATS = ('xlsx', 'xls', 'csv')
+
+
+# Raw exports
+# ===========
+
+class ExportFormatUnavailable(Exception):
+    """Raised when the library needed for an export format is not installed."""
+
+
+def raw_export_fields(model, related=()):
+    """
+    Return the ``values_list`` lookups of a raw export: every concrete field
+    of ``model`` (foreign keys as ids) followed by the ``related`` lookups.
+    """
+    return [field.attname for field in model._meta.concrete_fields] + list(related)
+
+
+def column_name(lookup):
+    """Name of the raw export column (and API field) of a values lookup."""
+    return lookup.replace('__', '_')
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_raw_chunks(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of value tuples, reading the table with a server-side cursor."""
+    rows = queryset.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+    return _chunked(rows, chunk_size)
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _iter_csv_chunks(header, chunks):
+    # The byte order mark makes Excel read the file as UTF-8 (Arabic text)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for chunk in chunks:
+        writer.writerows([[_csv_value(value) for value in row] for row in chunk])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_csv(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """UTF-8 CSV with a byte order mark, so that Excel shows the Arabic text correctly."""
+    header = [column_name(field) for field in fields]
+    return _iter_csv_chunks(header, iter_raw_chunks(queryset, fields, chunk_size))
+
+
+def iter_ndjson(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """One JSON object per line; decimals are written as strings to keep their precision."""
+    names = [column_name(field) for field in fields]
+    encode = DjangoJSONEncoder(ensure_ascii=False).encode
+    for chunk in iter_raw_chunks(queryset, fields, chunk_size):
+        yield ''.join(encode(dict(zip(names, row))) + '\n' for row in chunk).encode('utf-8')
+
+
+def _arrow_type(pa, field):
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.ForeignKey)):
+        return pa.int64()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.IntegerField):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    # Text, JSON (serialized) and anything else
+    return pa.string()
+
+
+def _field_for_lookup(model, lookup):
+    """Resolve ``project_id`` or ``project__code`` style lookups to a model field."""
+    path = lookup.split('__')
+    for name in path[:-1]:
+        model = model._meta.get_field(name).related_model
+    for field in model._meta.concrete_fields:
+        if field.attname == path[-1] or field.name == path[-1]:
+            return field
+    return model._meta.get_field(path[-1])
+
+
+def iter_parquet(queryset, fields, chunk_size=PARQUET_CHUNK_SIZE):
+    """
+    Parquet file written one row group per chunk. Needs pyarrow; raises
+    ``ExportFormatUnavailable`` when it is missing.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportFormatUnavailable('parquet')
+
+    model = queryset.model
+    model_fields = [_field_for_lookup(model, lookup) for lookup in fields]
+    schema = pa.schema([
+        pa.field(column_name(lookup), _arrow_type(pa, field))
+        for lookup, field in zip(fields, model_fields)
+    ])
+    serialize = [isinstance(field, models.JSONField) for field in model_fields]
+
+    def generate():
+        sink = StreamSink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+        for chunk in iter_raw_chunks(queryset, fields, chunk_size):
+            columns = []
+            for index, column in enumerate(zip(*chunk)):
+                if serialize[index]:
+                    column = [None if value is None else json.dumps(value, ensure_ascii=False) for value in column]
+                columns.append(pa.array(column, type=schema.field(index).type))
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
+
+
+PROJECT_RAW_FIELDS = raw_export_fields(Project)
+EXECUTION_RATE_RAW_FIELDS = raw_export_fields(ExecutionRate, related=['project__code'])
+
+RAW_EXPORT_FORMATS = {
+    # format: (writer, content type, file extension)
+    'raw_csv': (iter_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+    'parquet': (iter_parquet, 'application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def raw_export_response(queryset, fields, export_format, prefix):
+    """Stream ``queryset`` in one of the ``RAW_EXPORT_FORMATS``."""
+    writer, content_type, extension = RAW_EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(writer(queryset, fields), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(prefix, extension)}"'
+    return response
@@ -0,0 +1,75 @@
+from django.db.models import Q, Subquery
+
+from .models import Project, ProjectYear, latest_execution_rates
+from .search import search_projects
+
+# Query parameters read by the filters below
+PROJECT_FILTER_PARAMS = ('q', 'year', 'implementation_year', 'budget_year')
+EXECUTION_RATE_FILTER_PARAMS = ('code', 'project', 'q', 'latest')
+PROJECT_TRACKING_FILTER_PARAMS = ('q',)
+
+
+def filter_projects(queryset, params):
+    """
+    Apply the project list filters (search text, start year, implementation
+    year and budget year) to a queryset.
+
+    ``params`` is any mapping with a ``get`` method, usually ``request.GET``.
+    """
+    query = (params.get('q') or '').strip()
+    year = (params.get('year') or '').strip()
+
+    if query:
+        queryset = search_projects(queryset, query)
+
+    if year.isdigit():
+        queryset = queryset.filter(start_year=int(year))
+
+    for param, kind in (('implementation_year', ProjectYear.KIND_IMPLEMENTATION),
+                        ('budget_year', ProjectYear.KIND_BUDGET)):
+        value = (params.get(param) or '').strip()
+        if value.isdigit():
+            # Indexed lookup in ProjectYear instead of decoding every JSON list
+            queryset = queryset.filter(
+                pk__in=ProjectYear.objects.filter(kind=kind, year=int(value)).values('project_id')
+            )
+
+    return queryset
+
+
+def filter_execution_rates(queryset, params):
+    """
+    Apply the execution rate list filters (project code and name) to a queryset.
+
+    ``q`` matches the code or the name at once and is kept for older links.
+    ``latest`` keeps only the most recent snapshot of each project.
+    """
+    code = (params.get('code') or '').strip()
+    project_name = (params.get('project') or '').strip()
+    query = (params.get('q') or '').strip()
+
+    if code:
+        queryset = queryset.filter(project__code__icontains=code)
+    if project_name:
+        queryset = queryset.filter(
+            Q(project__program__icontains=project_name) |
+            Q(project__projects__icontains=project_name)
+        )
+    if query:
+        queryset = queryset.filter(
+            Q(project__code__icontains=query) |
+            Q(project__program__icontains=query) |
+            Q(project__projects__icontains=query)
+        )
+    if params.get('latest') in ('1', 'on', 'true'):
+        queryset = queryset.filter(pk=Subquery(latest_execution_rates('project').values('pk')[:1]))
+
+    return queryset
+
+
+def filter_project_trackings(queryset, params):
+    """Apply the project tracking list filter (project search text) to a queryset."""
+    query = (params.get('q') or '').strip()
+    if query:
+        queryset = queryset.filter(project__in=search_projects(Project.objects.all(), query).values('pk'))
+    return queryset
@@ -2,7 +2,10 @@ from django import forms
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from .models import Project, ExecutionRate
+from .models import Project, ExecutionRate, ProjectTracking
+
+
+MAX_IMPORT_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
 
 class ProjectImportForm(forms.Form):
@@ -22,10 +25,10 @@ class ProjectImportForm(forms.Form):
             if not file.name.endswith(('.xls', '.xlsx')):
                 raise forms.ValidationError(_('الرجاء تحميل ملف Excel صالح (ملفات xls أو xlsx فقط)'))
             
-            # Check file size (max 5MB)
-            max_size = 5 * 1024 * 1024  # 5MB
-            if file.size > max_size:
-                raise forms.ValidationError(_('حجم الملف كبير جداً. الحد الأقصى المسموح به هو 5 ميجابايت'))
+            # Check file size. Rows are streamed during import, so the limit
+            # only guards disk space and upload time, not server memory.
+            if file.size > MAX_IMPORT_FILE_SIZE:
+                raise forms.ValidationError(_('حجم الملف كبير جداً. الحد الأقصى المسموح به هو 50 ميجابايت'))
             
             # Check file content type
             valid_content_types = [
@@ -183,7 +186,8 @@ class ExecutionRateForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         # Set up the project field to show code and program
-        self.fields['project'].label_from_instance = lambda obj: f"{obj.code} - {obj.program}"
+        if 'project' in self.fields:
+            self.fields['project'].label_from_instance = lambda obj: f"{obj.code} - {obj.program}"
         
         # Add Bootstrap classes and other attributes to form fields
         for field_name, field in self.fields.items():
@@ -247,3 +251,41 @@ class ExecutionRateForm(forms.ModelForm):
                              _('التكاليف الفعلية أعلى من التقديرية بنسبة كبيرة. يرجى مراجعة القيم'))
         
         return cleaned_data
+
+
+class ExecutionRateRowForm(ExecutionRateForm):
+    """
+    One row of the execution rate grid. The project is resolved by the caller
+    for the whole grid at once, so validating a row runs no query.
+    """
+    class Meta(ExecutionRateForm.Meta):
+        fields = [field for field in ExecutionRateForm.Meta.fields if field != 'project']
+
+
+class ProjectTrackingForm(forms.ModelForm):
+    class Meta:
+        model = ProjectTracking
+        fields = [
+            'market_launch_date', 'actual_costs', 'planned_end_date',
+            'actual_start_date', 'actual_end_date'
+        ]
+        widgets = {
+            'market_launch_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'actual_costs': forms.NumberInput(attrs={
+                'step': '0.01', 'min': '0', 'dir': 'ltr', 'class': 'form-control text-end'
+            }),
+            'planned_end_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'actual_start_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'actual_end_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        }
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        actual_start_date = cleaned_data.get('actual_start_date')
+        actual_end_date = cleaned_data.get('actual_end_date')
+        
+        if actual_start_date and actual_end_date and actual_end_date < actual_start_date:
+            self.add_error('actual_end_date',
+                         _('يجب أن يكون تاريخ الانتهاء الفعلي بعد تاريخ البداية الفعلية'))
+        
+        return cleaned_data
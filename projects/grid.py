@@ -0,0 +1,120 @@
+"""
+Bulk entry of execution rates.
+
+A grid submission is a list of rows, one per project snapshot. Projects and
+the snapshots being edited are loaded with one query each, every row is
+validated with ``ExecutionRateRowForm`` (no query per row), the derived
+metrics are computed for all rows at once and the rows are written with
+``bulk_create``/``bulk_update`` in a single transaction. Nothing is written
+unless every row is valid.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from .dashboard import invalidate_dashboard
+from .page_cache import clear_project_pages
+from .forms import ExecutionRateRowForm
+from .metrics import DERIVED_FIELDS, compute_execution_metrics
+from .models import ExecutionRate, Project
+
+GRID_FIELDS = tuple(ExecutionRateRowForm.Meta.fields)
+
+# Largest grid accepted in one request
+MAX_GRID_ROWS = 2000
+
+BULK_BATCH_SIZE = 500
+
+
+class GridResult:
+    """Outcome of a bulk submission: created/updated objects or per-row errors."""
+
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        # (row index, {field: [messages]}) pairs
+        self.errors = []
+
+    @property
+    def has_errors(self):
+        return bool(self.errors)
+
+
+def _load_projects(rows):
+    ids = {row.get('project') for row in rows if str(row.get('project') or '').isdigit()}
+    codes = {str(row['code']).strip() for row in rows if row.get('code')}
+    projects = Project.objects.filter(Q(pk__in=ids) | Q(code__in=codes)).only('pk', 'code')
+    by_id, by_code = {}, {}
+    for project in projects:
+        by_id[project.pk] = project
+        by_code[project.code] = project
+    return by_id, by_code
+
+
+def save_grid(rows):
+    """
+    Validate and save grid rows.
+
+    Each row is a dict with ``project`` (id) or ``code``, an optional ``id``
+    of an existing snapshot of that project to update, and values for any of
+    ``GRID_FIELDS``. Rows without ``id`` create a new snapshot. Fields left
+    out of an update keep their current value.
+    """
+    result = GridResult()
+    if len(rows) > MAX_GRID_ROWS:
+        result.errors.append((None, {'__all__': [f'الحد الأقصى {MAX_GRID_ROWS} سطر في كل إرسال']}))
+        return result
+
+    projects_by_id, projects_by_code = _load_projects(rows)
+    rate_ids = [row['id'] for row in rows if str(row.get('id') or '').isdigit()]
+    existing = ExecutionRate.objects.in_bulk([int(pk) for pk in rate_ids])
+
+    new_rates, changed_rates = [], []
+    for index, row in enumerate(rows):
+        project = None
+        if str(row.get('project') or '').isdigit():
+            project = projects_by_id.get(int(row['project']))
+        elif row.get('code'):
+            project = projects_by_code.get(str(row['code']).strip())
+        if project is None:
+            result.errors.append((index, {'project': ['المشروع غير موجود']}))
+            continue
+
+        rate = None
+        if row.get('id') not in (None, ''):
+            rate = existing.get(int(row['id'])) if str(row['id']).isdigit() else None
+            if rate is None or rate.project_id != project.pk:
+                result.errors.append((index, {'id': ['معدل التنفيذ غير موجود لهذا المشروع']}))
+                continue
+
+        data = model_to_dict(rate, fields=GRID_FIELDS) if rate else {}
+        data.update({field: row[field] for field in GRID_FIELDS if field in row})
+        data = {field: '' if value is None else value for field, value in data.items()}
+
+        form = ExecutionRateRowForm(data=data, instance=rate or ExecutionRate(project=project))
+        if not form.is_valid():
+            result.errors.append((index, {field: list(messages) for field, messages in form.errors.items()}))
+            continue
+        (changed_rates if rate else new_rates).append(form.instance)
+
+    if result.has_errors:
+        return result
+
+    compute_execution_metrics(new_rates + changed_rates)
+    now = timezone.now()
+    for rate in changed_rates:
+        # bulk_update does not apply auto_now
+        rate.updated_at = now
+
+    with transaction.atomic():
+        result.created = ExecutionRate.objects.bulk_create(new_rates, batch_size=BULK_BATCH_SIZE)
+        if changed_rates:
+            ExecutionRate.objects.bulk_update(
+                changed_rates, GRID_FIELDS + DERIVED_FIELDS + ('updated_at',), batch_size=BULK_BATCH_SIZE
+            )
+        result.updated = changed_rates
+        # Bulk writes send no post_save signal
+        transaction.on_commit(invalidate_dashboard)
+        transaction.on_commit(clear_project_pages)
+    return result
@@ -0,0 +1,232 @@
+"""
+Batched project import.
+
+Spreadsheets are read row by row (``iter_workbook_rows``) so that memory use
+does not grow with the size of the file. Rows are cleaned with ``ProjectResource`` (same
+column mapping and defaults as the admin import), validated in Python, and
+inserted one chunk at a time with ``bulk_create`` inside a single transaction
+per chunk.
+"""
+import math
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import search
+from .dashboard import invalidate_dashboard
+from .maintenance import sync_project_years
+from .models import Project, ProjectYear
+from .resources import ProjectResource
+
+IMPORT_CHUNK_SIZE = 500
+
+# Project fields that can be filled from a spreadsheet column
+IMPORT_FIELDS = ProjectResource.Meta.fields
+
+YEAR_LIST_FIELDS = ('implementation_years', 'budget_years')
+
+
+def normalize_cell(value):
+    """Return a cell value with surrounding spaces removed and blanks as None."""
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _iter_xlsx_rows(file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_rows(file):
+    import xlrd
+
+    # .xls is capped at 65,536 rows by the format, so loading it is bounded
+    workbook = xlrd.open_workbook(file_contents=file.read(), on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        for index in range(sheet.nrows):
+            yield sheet.row_values(index)
+    finally:
+        workbook.release_resources()
+
+
+def iter_sheet_rows(file, file_name=None, xlsx_reader=_iter_xlsx_rows):
+    """
+    Yield the rows of the first sheet of an Excel file as sequences of values,
+    header first. ``.xlsx`` files are read with ``xlsx_reader``, by default
+    openpyxl in read-only mode.
+    """
+    file_name = (file_name or getattr(file, 'name', '') or '').lower()
+    return _iter_xls_rows(file) if file_name.endswith('.xls') else xlsx_reader(file)
+
+
+def iter_workbook_rows(file, file_name=None):
+    """
+    Yield ``(row_number, row)`` for the data rows of the first sheet of an
+    Excel file; ``row_number`` is the row as numbered in the spreadsheet.
+
+    Row dict keys come from the header row (surrounding spaces removed),
+    values are passed through ``normalize_cell`` and completely empty rows are
+    skipped. ``.xlsx`` files are streamed with openpyxl in read-only mode.
+    """
+    headers = None
+    for row_number, values in enumerate(iter_sheet_rows(file, file_name), 1):
+        if headers is None:
+            headers = [str(value).strip() if value is not None else None for value in values]
+            continue
+        row = {}
+        for header, value in zip(headers, values):
+            if header:
+                row[header] = normalize_cell(value)
+        if any(value is not None for value in row.values()):
+            yield row_number, row
+
+
+class ImportResult:
+    """Outcome of an import run: counts, skipped codes and per-row errors."""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.created = 0
+        self.skipped_codes = []
+        # (row_number, message) pairs, row_number as shown in the spreadsheet
+        self.errors = []
+
+    @property
+    def has_errors(self):
+        return bool(self.errors)
+
+    def error_messages(self):
+        return [f'خطأ في السطر {row_number}: {message}' for row_number, message in self.errors]
+
+
+def format_validation_error(error):
+    """Flatten a ValidationError into a single line."""
+    if hasattr(error, 'message_dict'):
+        return '; '.join(
+            f"{field}: {', '.join(messages)}" for field, messages in error.message_dict.items()
+        )
+    return '; '.join(error.messages)
+
+
+class ProjectImporter:
+    """
+    Validate spreadsheet rows and insert them in chunks.
+
+    Rows whose code already exists (in the database or earlier in the same
+    file) are skipped. Every other row is either created or reported with its
+    spreadsheet row number.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE, existing_codes=None):
+        self.chunk_size = chunk_size
+        self.resource = ProjectResource()
+        if existing_codes is None:
+            existing_codes = set(Project.objects.values_list('code', flat=True))
+        self.existing_codes = existing_codes
+
+    def build_project(self, row):
+        """Clean a row dict and return an unsaved, validated Project."""
+        row = dict(row)
+        for field in YEAR_LIST_FIELDS:
+            value = row.get(field)
+            if value is not None and not isinstance(value, (str, list, tuple)):
+                row[field] = str(value)
+        self.resource.before_import_row(row)
+
+        project = Project(**{field: row[field] for field in IMPORT_FIELDS if field in row})
+        self.resource.before_save_instance(project)
+        project.full_clean(validate_unique=False)
+        project.total_estimated_cost = project.compute_total_estimated_cost()
+        return project
+
+    def run(self, rows, start=0, result=None, on_chunk=None, should_stop=None):
+        """
+        Import an iterable of ``(row_number, row dict)`` pairs, as yielded by
+        ``iter_workbook_rows``.
+
+        ``start`` skips rows that an earlier, interrupted run already handled.
+        ``on_chunk(result, rows_done)`` is called for every chunk, inside the
+        transaction that writes it, and ``should_stop()`` is checked before
+        each chunk is written.
+        """
+        result = result or ImportResult()
+        pending = []  # (row_number, project)
+        rows_done = start
+
+        for index, (row_number, row) in enumerate(rows):
+            if index < start:
+                continue
+            result.total_rows += 1
+            rows_done = index + 1
+
+            try:
+                project = self.build_project(row)
+            except ValidationError as e:
+                result.errors.append((row_number, format_validation_error(e)))
+            except (ValueError, TypeError) as e:
+                result.errors.append((row_number, str(e)))
+            else:
+                if project.code in self.existing_codes:
+                    result.skipped_codes.append(project.code)
+                else:
+                    self.existing_codes.add(project.code)
+                    pending.append((row_number, project))
+
+            if rows_done % self.chunk_size == 0:
+                if should_stop and should_stop():
+                    return result
+                self._commit_chunk(pending, result, rows_done, on_chunk)
+                pending = []
+
+        if should_stop and should_stop():
+            return result
+        self._commit_chunk(pending, result, rows_done, on_chunk)
+        return result
+
+    def _commit_chunk(self, pending, result, rows_done, on_chunk):
+        # Progress reported by on_chunk is committed together with the rows it
+        # counts, so a crash can never leave the two out of step.
+        with transaction.atomic():
+            self._write_chunk(pending, result)
+            if on_chunk:
+                on_chunk(result, rows_done)
+
+    def _write_chunk(self, pending, result):
+        if not pending:
+            return
+        projects = [project for _, project in pending]
+        try:
+            with transaction.atomic():
+                created = Project.objects.bulk_create(projects)
+                self.after_create(created)
+            result.created += len(created)
+        except IntegrityError:
+            # Something in the chunk clashed with the database (e.g. a code added
+            # by another user meanwhile): retry row by row to pinpoint it.
+            for row_number, project in pending:
+                project.pk = None
+                project._state.adding = True
+                try:
+                    with transaction.atomic():
+                        created = Project.objects.bulk_create([project])
+                        self.after_create(created)
+                    result.created += 1
+                except IntegrityError as e:
+                    result.errors.append((row_number, str(e)))
+
+    def after_create(self, projects):
+        """Update the data derived from newly inserted projects."""
+        search.index_projects([project for project in projects if project.pk])
+        sync_project_years(ProjectYear, projects)
+        # bulk_create does not send post_save
+        invalidate_dashboard()
@@ -0,0 +1,201 @@
+"""
+Background import jobs.
+
+Jobs are queued in the ``ImportJob`` table, so no external broker is needed.
+Any process can work the queue: the web process starts a daemon thread when a
+job is submitted, and ``manage.py run_import_worker`` runs a standalone
+worker. Jobs are claimed with a conditional UPDATE, so two workers never run
+the same job.
+
+Progress is saved in the same transaction as each imported chunk. A worker
+that dies stops sending heartbeats; its job is put back in the queue once the
+heartbeat is older than ``IMPORT_JOB_STALE_AFTER`` seconds and resumes after
+the last committed row.
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .importing import ProjectImporter, iter_workbook_rows
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+IMPORT_JOB_STALE_AFTER = getattr(settings, 'IMPORT_JOB_STALE_AFTER', 300)
+IMPORT_WORKER_IN_PROCESS = getattr(settings, 'IMPORT_WORKER_IN_PROCESS', True)
+IMPORT_WORKER_POLL_INTERVAL = getattr(settings, 'IMPORT_WORKER_POLL_INTERVAL', 30)
+
+_worker_lock = threading.Lock()
+_worker_thread = None
+_wake = threading.Event()
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def enqueue_import(uploaded_file):
+    """Store an uploaded workbook as a pending job and wake the local worker."""
+    job = ImportJob(original_name=uploaded_file.name)
+    job.file.save(uploaded_file.name, uploaded_file, save=False)
+    job.save()
+    if IMPORT_WORKER_IN_PROCESS:
+        ensure_worker()
+    return job
+
+
+def ensure_worker():
+    """Wake the in-process worker thread, starting it on first use."""
+    global _worker_thread
+    with _worker_lock:
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(
+                target=_worker_loop, name='import-worker', daemon=True
+            )
+            _worker_thread.start()
+    _wake.set()
+
+
+def _worker_loop():
+    while True:
+        _wake.clear()
+        try:
+            work_queue()
+        except Exception:
+            logger.exception('Import worker error')
+        _wake.wait(IMPORT_WORKER_POLL_INTERVAL)
+
+
+def requeue_stale_jobs():
+    """Put running jobs whose worker stopped sending heartbeats back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=IMPORT_JOB_STALE_AFTER)
+    return ImportJob.objects.filter(
+        status=ImportJob.STATUS_RUNNING, heartbeat_at__lt=cutoff
+    ).update(status=ImportJob.STATUS_PENDING, worker='')
+
+
+def claim_next_job(worker):
+    """Atomically take the oldest pending job. Returns None when the queue is empty."""
+    while True:
+        job = ImportJob.objects.filter(status=ImportJob.STATUS_PENDING).order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_PENDING).update(
+            status=ImportJob.STATUS_RUNNING,
+            worker=worker,
+            attempts=F('attempts') + 1,
+            started_at=job.started_at or now,
+            run_started_at=now,
+            run_start_rows=job.rows_processed,
+            heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def work_queue(once=False):
+    """Run pending jobs until the queue is empty. Returns the number of jobs run."""
+    worker = worker_name()
+    count = 0
+    try:
+        while True:
+            close_old_connections()
+            requeue_stale_jobs()
+            job = claim_next_job(worker)
+            if job is None:
+                return count
+            run_job(job)
+            count += 1
+            if once:
+                return count
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+
+def _discard_file(job):
+    if job.file:
+        job.file.delete(save=False)
+    job.file = ''
+
+
+def _finish(job, status, message=''):
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    job.heartbeat_at = job.finished_at
+    update_fields = ['status', 'message', 'finished_at', 'heartbeat_at']
+    # Keep the workbook of failed jobs for inspection
+    if status != ImportJob.STATUS_FAILED:
+        _discard_file(job)
+        update_fields.append('file')
+    job.save(update_fields=update_fields)
+
+
+def run_job(job):
+    """Import the rows of a claimed job, resuming after the last committed row."""
+    base_created = job.rows_created
+    base_skipped = job.rows_skipped
+    base_errors = job.error_count
+    stored_errors = list(job.errors)
+    saved_errors = 0
+
+    def on_chunk(result, rows_done):
+        nonlocal saved_errors
+        room = max(ImportJob.MAX_STORED_ERRORS - len(stored_errors), 0)
+        stored_errors.extend(list(error) for error in result.errors[saved_errors:][:room])
+        saved_errors = len(result.errors)
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=rows_done,
+            rows_created=base_created + result.created,
+            rows_skipped=base_skipped + len(result.skipped_codes),
+            error_count=base_errors + len(result.errors),
+            errors=stored_errors,
+            heartbeat_at=timezone.now(),
+        )
+
+    def should_stop():
+        return ImportJob.objects.filter(pk=job.pk, cancel_requested=True).exists()
+
+    try:
+        with job.file.open('rb') as file:
+            result = ProjectImporter().run(
+                iter_workbook_rows(file, job.original_name),
+                start=job.rows_processed,
+                on_chunk=on_chunk,
+                should_stop=should_stop,
+            )
+    except Exception as e:
+        logger.exception('Import job %s failed', job.pk)
+        job.refresh_from_db()
+        _finish(job, ImportJob.STATUS_FAILED, str(e))
+        return
+
+    job.refresh_from_db()
+    if job.cancel_requested:
+        _finish(job, ImportJob.STATUS_CANCELLED)
+    else:
+        _finish(job, ImportJob.STATUS_COMPLETED)
+    logger.info('Import job %s finished: %s rows created', job.pk, result.created)
+
+
+def cancel_job(job):
+    """Ask a job to stop. Pending jobs are cancelled at once, running ones after their current chunk."""
+    ImportJob.objects.filter(pk=job.pk).update(cancel_requested=True)
+    cancelled = ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_PENDING).update(
+        status=ImportJob.STATUS_CANCELLED, finished_at=timezone.now()
+    )
+    job.refresh_from_db()
+    if cancelled:
+        _discard_file(job)
+        job.save(update_fields=['file'])
+    return job
@@ -0,0 +1,174 @@
+"""
+Chunked maintenance jobs used by migrations and management commands.
+
+The functions take the model class as an argument so that migrations can pass
+their historical models. They walk the table by primary key ranges, so memory
+stays flat and no query has to skip over already-processed rows.
+"""
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .metrics import DERIVED_FIELDS, TRACKING_DERIVED_FIELDS, compute_execution_metrics, compute_tracking_metrics
+from .models import PROJECT_YEAR_SOURCES, compute_total_estimated_cost, parse_year_list
+
+
+def iter_chunks(queryset, chunk_size):
+    """Yield lists of at most ``chunk_size`` objects, walking ``queryset`` by primary key."""
+    last_pk = None
+    queryset = queryset.order_by('pk')
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def backfill_total_estimated_cost(model, chunk_size=1000, only_missing=False, using='default'):
+    """
+    Recompute ``total_estimated_cost`` for every project and save the rows that changed.
+
+    ``updated_at`` of the changed rows is bumped so that the cached exports and
+    project pages, which are keyed on it, are rebuilt. Returns a
+    ``(checked, updated)`` tuple.
+    """
+    queryset = model.objects.using(using).only(
+        'pk', 'property_prep_cost', 'studies', 'achievements', 'total_estimated_cost'
+    )
+    if only_missing:
+        queryset = queryset.filter(total_estimated_cost__isnull=True)
+
+    checked = updated = 0
+    for chunk in iter_chunks(queryset, chunk_size):
+        changed = []
+        now = timezone.now()
+        for project in chunk:
+            total = compute_total_estimated_cost(
+                project.property_prep_cost, project.studies, project.achievements
+            )
+            if project.total_estimated_cost != total:
+                project.total_estimated_cost = total
+                project.updated_at = now
+                changed.append(project)
+        if changed:
+            with transaction.atomic(using=using):
+                model.objects.using(using).bulk_update(changed, ['total_estimated_cost', 'updated_at'])
+        checked += len(chunk)
+        updated += len(changed)
+    return checked, updated
+
+
+def sync_project_years(year_model, projects, using='default'):
+    """
+    Replace the year rows of ``projects`` with the years found in their
+    implementation_years and budget_years lists.
+    """
+    projects = [project for project in projects if project.pk]
+    if not projects:
+        return
+    rows = [
+        year_model(project_id=project.pk, kind=kind, year=year)
+        for project in projects
+        for kind, field in PROJECT_YEAR_SOURCES.items()
+        for year in parse_year_list(getattr(project, field))
+    ]
+    with transaction.atomic(using=using):
+        year_model.objects.using(using).filter(project_id__in=[project.pk for project in projects]).delete()
+        year_model.objects.using(using).bulk_create(rows)
+
+
+def rebuild_project_years(project_model, year_model, chunk_size=1000, using='default'):
+    """Rebuild the year rows of every project. Returns the number of projects processed."""
+    queryset = project_model.objects.using(using).only('pk', *PROJECT_YEAR_SOURCES.values())
+    count = 0
+    for chunk in iter_chunks(queryset, chunk_size):
+        sync_project_years(year_model, chunk, using=using)
+        count += len(chunk)
+    return count
+
+
+class MetricsDrift:
+    """Rows checked and rows whose stored derived fields differ from a recompute."""
+
+    def __init__(self):
+        self.checked = 0
+        self.changed = 0
+        # Changed rows per derived field
+        self.fields = {}
+
+
+def _recompute(queryset, fields, compute, chunk_size, dry_run, stamp=None):
+    drift = MetricsDrift()
+    drift.fields = dict.fromkeys(fields, 0)
+    for chunk in iter_chunks(queryset, chunk_size):
+        stored = [tuple(getattr(obj, field) for field in fields) for obj in chunk]
+        compute(chunk)
+        changed = []
+        for obj, old in zip(chunk, stored):
+            new = tuple(getattr(obj, field) for field in fields)
+            if new == old:
+                continue
+            changed.append(obj)
+            for field, before, after in zip(fields, old, new):
+                drift.fields[field] += before != after
+        drift.checked += len(chunk)
+        drift.changed += len(changed)
+        if changed and not dry_run:
+            update_fields = list(fields)
+            if stamp:
+                # bulk_update does not apply auto_now
+                now = timezone.now()
+                for obj in changed:
+                    setattr(obj, stamp, now)
+                update_fields.append(stamp)
+            _update_rows(queryset.model, changed, update_fields, queryset.db)
+    return drift
+
+
+def _update_rows(model, objs, field_names, using):
+    """
+    Write ``field_names`` of ``objs`` with one parameterized UPDATE run through
+    executemany. bulk_update builds a CASE expression per row and field, which
+    costs more than the recompute itself on large tables.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in field_names]
+    pk = model._meta.pk
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(model._meta.db_table),
+        ', '.join(f'{quote(field.column)} = %s' for field in fields),
+        quote(pk.column),
+    )
+    params = [
+        [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields] + [obj.pk]
+        for obj in objs
+    ]
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def recompute_execution_metrics(model, chunk_size=5000, dry_run=False, using='default'):
+    """
+    Recompute the derived fields of every execution rate and save the rows
+    that drifted. Returns a ``MetricsDrift``.
+    """
+    queryset = model.objects.using(using).only(
+        'pk', 'estimated_costs', 'actual_costs', 'expected_end_date', 'actual_start_date',
+        'actual_end_date', *DERIVED_FIELDS
+    )
+    return _recompute(queryset, DERIVED_FIELDS, compute_execution_metrics, chunk_size, dry_run,
+                      stamp='updated_at')
+
+
+def recompute_tracking_metrics(model, chunk_size=5000, dry_run=False, using='default'):
+    """
+    Recompute the derived fields of every project tracking and save the rows
+    that drifted. Returns a ``MetricsDrift``.
+    """
+    queryset = model.objects.using(using).select_related('project').only(
+        'pk', 'actual_costs', 'planned_end_date', 'actual_start_date', 'actual_end_date',
+        'project__estimated_cost', *TRACKING_DERIVED_FIELDS
+    )
+    return _recompute(queryset, TRACKING_DERIVED_FIELDS, compute_tracking_metrics, chunk_size, dry_run)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from projects.dashboard import invalidate_dashboard
+from projects.page_cache import LOCAL_CACHE_WARNING, cache_is_shared, clear_project_pages
+from projects.maintenance import backfill_total_estimated_cost
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the stored total estimated cost of projects in chunks. The cached '
+        'dashboard and project pages are cleared afterwards, which only reaches the web '
+        'server when the cache is shared (DJANGO_CACHE_DIR).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of projects processed per batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fill projects that have no stored total yet'
+        )
+
+    def handle(self, *args, **options):
+        checked, updated = backfill_total_estimated_cost(
+            Project,
+            chunk_size=options['chunk_size'],
+            only_missing=options['only_missing'],
+        )
+        if updated:
+            invalidate_dashboard()
+            clear_project_pages()
+            if not cache_is_shared():
+                self.stdout.write(self.style.WARNING(LOCAL_CACHE_WARNING))
+        self.stdout.write(
+            self.style.SUCCESS(f'تمت مراجعة {checked} مشروع وتحديث {updated} منها')
+        )
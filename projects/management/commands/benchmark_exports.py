@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from projects import export_cache, views
+from projects.models import ExecutionRate, Project
+
+# (label, view, model)
+EXPORT_TARGETS = [
+    ('projects', views.export_projects, Project),
+    ('execution_rates', views.export_execution_rates, ExecutionRate),
+]
+
+# The legacy styled export of every target is the baseline
+BASELINE_FORMAT = 'xls'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures rows/sec and output size of every export format against the xls export. '
+        'The export cache is emptied before each run so that files are really generated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--formats',
+            default='xls,xlsx,csv,ndjson,parquet',
+            help='Comma separated formats to measure (default: all)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Runs per format; the fastest one is reported (default: 1)'
+        )
+
+    def run_export(self, view, export_format):
+        export_cache.clear()
+        request = RequestFactory().get('/', {'format': export_format})
+        start = time.perf_counter()
+        response = view(request)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return time.perf_counter() - start, size, response.status_code
+
+    def handle(self, *args, **options):
+        formats = [name.strip() for name in options['formats'].split(',') if name.strip()]
+        repeat = max(options['repeat'], 1)
+
+        for label, view, model in EXPORT_TARGETS:
+            rows = model.objects.count()
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label} ({rows} rows)'))
+            self.stdout.write(f'{"format":<10}{"seconds":>10}{"rows/sec":>12}{"bytes":>14}{"vs xls":>10}')
+
+            baseline = None
+            for export_format in formats:
+                runs = [self.run_export(view, export_format) for _ in range(repeat)]
+                seconds, size, status = min(runs)
+                if status != 200:
+                    self.stdout.write(self.style.WARNING(f'{export_format:<10} HTTP {status}'))
+                    continue
+                if export_format == BASELINE_FORMAT:
+                    baseline = seconds
+                rate = rows / seconds if seconds else 0
+                speedup = f'{baseline / seconds:.1f}x' if baseline and seconds else '-'
+                self.stdout.write(f'{export_format:<10}{seconds:>10.3f}{rate:>12.0f}{size:>14}{speedup:>10}')
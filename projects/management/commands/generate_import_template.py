@@ -1,11 +1,16 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 import os
+import time
 from django.conf import settings
 import tablib
 from django.utils import timezone
+from projects.seeding import DIRTY_KINDS, import_rows, iter_import_workbook
 
 class Command(BaseCommand):
-    help = 'Generates a sample Excel template for importing projects'
+    help = (
+        'Generates a sample Excel template for importing projects, or with --rows a large '
+        'synthetic workbook (optionally with dirty values) for import benchmarks'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -14,8 +19,33 @@ class Command(BaseCommand):
             default='project_import_template.xlsx',
             help='Output file name (default: project_import_template.xlsx)'
         )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            help='Write this many synthetic projects instead of the two sample rows (.xlsx only)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated rows (default: 0)')
+        parser.add_argument(
+            '--arabic-headers',
+            action='store_true',
+            help='Use the Arabic column names the importer maps instead of field names'
+        )
+        parser.add_argument(
+            '--dirty-share',
+            type=float,
+            default=0,
+            help='Share of the rows, from 0 to 1, given one invalid value (default: 0)'
+        )
+        parser.add_argument(
+            '--dirty-kinds',
+            default=','.join(DIRTY_KINDS),
+            help=f'Comma separated kinds of invalid values (default: {",".join(DIRTY_KINDS)})'
+        )
 
     def handle(self, *args, **options):
+        if options['rows'] is not None:
+            return self.write_synthetic(options)
+
         # Define the headers with Arabic labels
         headers = [
             'code',                  # الرمز
@@ -127,3 +157,37 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.WARNING('ملاحظة: يمكنك حذف أي أعمدة غير مطلوبة من الملف')
         )
+
+    def write_synthetic(self, options):
+        """Stream ``--rows`` synthetic projects into an .xlsx workbook."""
+        dirty_kinds = tuple(kind.strip() for kind in options['dirty_kinds'].split(',') if kind.strip())
+        unknown = set(dirty_kinds) - set(DIRTY_KINDS)
+        if unknown:
+            raise CommandError(f'Unknown dirty kinds: {", ".join(sorted(unknown))}')
+        if options['rows'] < 1:
+            raise CommandError('--rows must be positive')
+        if not 0 <= options['dirty_share'] <= 1:
+            raise CommandError('--dirty-share must be between 0 and 1')
+
+        output_file = options['output']
+        if output_file.endswith('.xls'):
+            raise CommandError('--rows writes .xlsx files only')
+        if not output_file.endswith('.xlsx'):
+            output_file += '.xlsx'
+        output_path = os.path.join(settings.BASE_DIR, output_file)
+
+        started = time.perf_counter()
+        rows = import_rows(
+            options['rows'],
+            seed=options['seed'],
+            dirty_share=options['dirty_share'],
+            dirty_kinds=dirty_kinds,
+        )
+        with open(output_path, 'wb') as f:
+            for chunk in iter_import_workbook(rows, arabic_headers=options['arabic_headers']):
+                f.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'تم إنشاء ملف من {options["rows"]} سطر في {time.perf_counter() - started:.1f} ثانية '
+            f'({os.path.getsize(output_path)} بايت): {output_path}'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from projects import export_cache
+
+
+class Command(BaseCommand):
+    help = 'Deletes cached export files that are too old or over the size limit'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Delete every cached export'
+        )
+
+    def handle(self, *args, **options):
+        removed = export_cache.clear() if options['all'] else export_cache.evict()
+        self.stdout.write(self.style.SUCCESS(f'تم حذف {removed} ملف من ذاكرة التصدير'))
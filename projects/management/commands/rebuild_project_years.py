@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from projects.maintenance import rebuild_project_years
+from projects.models import Project, ProjectYear
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the implementation/budget year table from the project year lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of projects processed per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_project_years(Project, ProjectYear, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'تمت إعادة بناء سنوات {count} مشروع'))
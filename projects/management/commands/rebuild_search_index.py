@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from projects import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the Arabic-normalized full-text search index of projects'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of projects indexed per batch (default: 2000)'
+        )
+
+    def handle(self, *args, **options):
+        total = search.rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'تمت فهرسة {total} مشروع')
+        )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from projects.dashboard import invalidate_dashboard
+from projects.page_cache import LOCAL_CACHE_WARNING, cache_is_shared, clear_project_pages
+from projects.maintenance import recompute_execution_metrics, recompute_tracking_metrics
+from projects.models import ExecutionRate, ProjectTracking
+
+TARGETS = {
+    'execution': ('معدلات التنفيذ', ExecutionRate, recompute_execution_metrics),
+    'tracking': ('تتبع المشاريع', ProjectTracking, recompute_tracking_metrics),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the derived execution rate and project tracking metrics in chunks. The '
+        'cached dashboard and project pages are cleared afterwards, which only reaches the '
+        'web server when the cache is shared (DJANGO_CACHE_DIR).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            choices=[*TARGETS, 'all'],
+            default='all',
+            help='Metrics to recompute (default: all)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of rows processed per batch (default: 5000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the rows whose stored metrics are out of date'
+        )
+
+    def handle(self, *args, **options):
+        names = list(TARGETS) if options['model'] == 'all' else [options['model']]
+        updated = False
+        for name in names:
+            label, model, recompute = TARGETS[name]
+            drift = recompute(model, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+            for field, count in drift.fields.items():
+                if count:
+                    self.stdout.write(f'  {field}: {count}')
+            if options['dry_run']:
+                message = f'{label}: تمت مراجعة {drift.checked} سطر، {drift.changed} منها غير محدثة'
+            else:
+                message = f'{label}: تمت مراجعة {drift.checked} سطر وتحديث {drift.changed} منها'
+                updated = updated or bool(drift.changed)
+            self.stdout.write(self.style.SUCCESS(message))
+        if updated:
+            invalidate_dashboard()
+            clear_project_pages()
+            if not cache_is_shared():
+                self.stdout.write(self.style.WARNING(LOCAL_CACHE_WARNING))
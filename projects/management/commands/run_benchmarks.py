@@ -0,0 +1,158 @@
+import json
+import os
+import platform
+import tempfile
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from projects import export_cache, search
+from projects.benchmarks import (
+    BENCHMARK_SIZES, BENCHMARK_TARGETS, DEFAULT_TOLERANCE, BenchmarkError, compare_results, measure,
+)
+from projects.seeding import seed_portfolio
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'run-benchmarks',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Times the project list/detail, execution rate list, import and exports on a '
+        'separate test database seeded with N projects, writes the results as JSON and, '
+        'with --baseline, fails when a target got slower than in the baseline run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default=','.join(str(size) for size in BENCHMARK_SIZES),
+            help='Comma separated numbers of seeded projects (default: %(default)s)'
+        )
+        parser.add_argument(
+            '--rates-per-project',
+            type=int,
+            default=2,
+            help='Execution rate snapshots seeded per project (default: 2)'
+        )
+        parser.add_argument(
+            '--targets',
+            default=','.join(BENCHMARK_TARGETS),
+            help='Comma separated targets to measure (default: all)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per target; the fastest one is reported (default: 3)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data (default: 0)')
+        parser.add_argument(
+            '--output',
+            default='benchmark_results.json',
+            help='JSON file the results are written to (default: benchmark_results.json)'
+        )
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=DEFAULT_TOLERANCE,
+            help=f'Allowed slowdown against the baseline, as a share (default: {DEFAULT_TOLERANCE})'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(',') if size.strip())
+        except ValueError:
+            raise CommandError('--sizes takes comma separated numbers')
+        targets = [name.strip() for name in options['targets'].split(',') if name.strip()]
+        unknown = set(targets) - set(BENCHMARK_TARGETS)
+        if unknown:
+            raise CommandError(f'Unknown targets: {", ".join(sorted(unknown))}')
+        # Keep the order of BENCHMARK_TARGETS: the import must run last
+        targets = [name for name in BENCHMARK_TARGETS if name in targets]
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+
+        results = self.run(sizes, targets, options)
+        self.write_results(results, options)
+
+        if baseline is not None:
+            self.report(compare_results(results, baseline, options['tolerance']), options['tolerance'])
+        else:
+            self.report([(result, None, False) for result in results], options['tolerance'])
+
+    def run(self, sizes, targets, options):
+        # Never touch the real data: work on a throwaway test database, media
+        # directory, export cache and cache (the benchmarks clear the caches)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        results = []
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root, DEBUG=False, CACHES=BENCHMARK_CACHES), \
+                    mock.patch.object(export_cache, 'EXPORT_CACHE_DIR', os.path.join(media_root, 'export_cache')):
+                for size in sizes:
+                    call_command('flush', interactive=False, verbosity=0)
+                    search.rebuild_index()
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'{size} مشروع'))
+                    seed_portfolio(size, options['rates_per_project'], seed=options['seed'])
+                    for name in targets:
+                        try:
+                            result = measure(name, size, max(options['repeat'], 1))
+                        except BenchmarkError as e:
+                            raise CommandError(str(e))
+                        self.stdout.write(f'  {name:<24}{result["seconds"]:>10.3f}s{result["queries"]:>8} queries')
+                        results.append(result)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        return results
+
+    def write_results(self, results, options):
+        output = options['output']
+        if not os.path.isabs(output):
+            output = os.path.join(settings.BASE_DIR, output)
+        data = {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'rates_per_project': options['rates_per_project'],
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'تم حفظ النتائج في {output}'))
+
+    def report(self, comparison, tolerance):
+        self.stdout.write(f'{"target":<24}{"rows":>8}{"seconds":>10}{"median":>10}{"queries":>9}{"baseline":>10}{"change":>9}')
+        regressions = []
+        for result, before, regressed in comparison:
+            change = f'{(result["seconds"] / before - 1) * 100:+.0f}%' if before else '-'
+            line = (
+                f'{result["target"]:<24}{result["rows"]:>8}{result["seconds"]:>10.3f}{result["median"]:>10.3f}'
+                f'{result["queries"]:>9}{before if before is not None else "-":>10}{change:>9}'
+            )
+            if regressed:
+                regressions.append(result)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+        if regressions:
+            names = ', '.join(f'{result["target"]}@{result["rows"]}' for result in regressions)
+            raise CommandError(f'Slower than the baseline by more than {tolerance:.0%}: {names}')
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.jobs import work_queue, IMPORT_WORKER_POLL_INTERVAL
+
+
+class Command(BaseCommand):
+    help = 'Runs queued project import jobs (standalone worker, no broker needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs currently queued, then exit'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=IMPORT_WORKER_POLL_INTERVAL,
+            help=f'Seconds between queue checks (default: {IMPORT_WORKER_POLL_INTERVAL})'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = work_queue()
+            if count:
+                self.stdout.write(self.style.SUCCESS(f'تم تنفيذ {count} عملية استيراد'))
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.models import Project
+from projects.seeding import SEED_BATCH_SIZE, seed_portfolio
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds synthetic projects with Arabic text, execution rate snapshots and trackings '
+        'for load testing. The same options always produce the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('projects', type=int, help='Number of projects to create')
+        parser.add_argument(
+            '--rates-per-project',
+            type=int,
+            default=3,
+            help='Execution rate snapshots per project (default: 3)'
+        )
+        parser.add_argument(
+            '--tracking-share',
+            type=float,
+            default=0.5,
+            help='Share of the projects that get a tracking, from 0 to 1 (default: 0.5)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data (default: 0)')
+        parser.add_argument(
+            '--code-prefix',
+            default='SEED',
+            help='Prefix of the generated project codes (default: SEED)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEED_BATCH_SIZE,
+            help=f'Projects inserted per transaction (default: {SEED_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['projects'] < 1 or options['rates_per_project'] < 0 or options['batch_size'] < 1:
+            raise CommandError('The number of projects and the batch size must be positive')
+        if not 0 <= options['tracking_share'] <= 1:
+            raise CommandError('--tracking-share must be between 0 and 1')
+
+        prefix = options['code_prefix']
+        # Continue after the projects seeded earlier with the same prefix
+        start = Project.objects.filter(code__startswith=f'{prefix}-').count() + 1
+        started = time.perf_counter()
+
+        reported = 0
+
+        def on_batch(projects, rates, trackings):
+            # Report about every tenth of the run
+            nonlocal reported
+            if (projects - reported) * 10 >= options['projects'] or projects == options['projects']:
+                reported = projects
+                self.stdout.write(f'{projects}/{options["projects"]} مشروع، {rates} معدل تنفيذ، {trackings} تتبع')
+
+        projects, rates, trackings = seed_portfolio(
+            options['projects'],
+            rates_per_project=options['rates_per_project'],
+            tracking_share=options['tracking_share'],
+            seed=options['seed'],
+            start=start,
+            code_prefix=prefix,
+            batch_size=options['batch_size'],
+            on_batch=on_batch,
+        )
+        seconds = time.perf_counter() - started
+        rows = projects + rates + trackings
+        self.stdout.write(self.style.SUCCESS(
+            f'تم إنشاء {projects} مشروع و{rates} معدل تنفيذ و{trackings} تتبع '
+            f'({rows} سطر في {seconds:.1f} ثانية، {rows / seconds:.0f} سطر/ثانية)'
+        ))
@@ -0,0 +1,108 @@
+"""
+Derived execution and tracking metrics computed for many rows at once.
+
+``ExecutionRate.save()`` and ``ProjectTracking.save()`` compute their derived
+fields one row at a time. The functions below apply the same rules to a whole
+list with NumPy, for the code paths that write with ``bulk_create``/
+``bulk_update`` and therefore never call ``save()``.
+"""
+from decimal import Context, Decimal
+
+import numpy as np
+
+CENT = Decimal('0.01')
+
+# Fields written by compute_execution_metrics
+DERIVED_FIELDS = ('cost_difference_percentage', 'duration_difference_days', 'delay_percentage')
+
+# Fields written by compute_tracking_metrics
+TRACKING_DERIVED_FIELDS = ('cost_variance_percentage', 'delay_rate', 'delay_variance_days')
+
+
+def _amounts(values):
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=float)
+
+
+def _dates(values):
+    return np.array([np.datetime64('NaT') if value is None else value for value in values],
+                    dtype='datetime64[D]')
+
+
+def _percentage(value, precision=15):
+    # save() hands a float to the DecimalField, which first rounds it to
+    # max_digits significant digits (precision=10). Costs are computed with
+    # Decimals there; 15 digits drops the float noise of the NumPy division.
+    return Context(prec=precision).create_decimal_from_float(float(value)).quantize(CENT)
+
+
+def compute_execution_metrics(rates):
+    """
+    Set the derived fields of ``rates`` (ExecutionRate instances) in one pass.
+
+    As in ``ExecutionRate.save()``, a field whose inputs are missing keeps its
+    current value. Returns ``rates``.
+    """
+    if not rates:
+        return rates
+
+    actual = _amounts(rate.actual_costs for rate in rates)
+    estimated = _amounts(rate.estimated_costs for rate in rates)
+    expected_end = _dates(rate.expected_end_date for rate in rates)
+    actual_start = _dates(rate.actual_start_date for rate in rates)
+    actual_end = _dates(rate.actual_end_date for rate in rates)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_costs = ~np.isnan(actual) & ~np.isnan(estimated) & (estimated != 0)
+        cost_difference = (estimated - actual) / estimated * 100
+
+        has_end_dates = ~np.isnat(expected_end) & ~np.isnat(actual_end)
+        duration_difference = (actual_end - expected_end).astype('int64')
+        planned_days = (expected_end - actual_start).astype('int64')
+        has_delay = has_end_dates & ~np.isnat(actual_start) & (planned_days > 0)
+        delay = duration_difference / planned_days * 100
+
+    for index in np.flatnonzero(has_costs):
+        rates[index].cost_difference_percentage = _percentage(cost_difference[index])
+    for index in np.flatnonzero(has_end_dates):
+        rates[index].duration_difference_days = int(duration_difference[index])
+    for index in np.flatnonzero(has_delay):
+        rates[index].delay_percentage = _percentage(delay[index], precision=10)
+    return rates
+
+
+def compute_tracking_metrics(trackings):
+    """
+    Set the derived fields of ``trackings`` (ProjectTracking instances, with
+    ``project.estimated_cost`` loaded) in one pass.
+
+    As in ``ProjectTracking.save()``, a metric that cannot be computed is set
+    to None. Returns ``trackings``.
+    """
+    if not trackings:
+        return trackings
+
+    actual = _amounts(tracking.actual_costs for tracking in trackings)
+    estimated = _amounts(tracking.project.estimated_cost for tracking in trackings)
+    planned_end = _dates(tracking.planned_end_date for tracking in trackings)
+    actual_start = _dates(tracking.actual_start_date for tracking in trackings)
+    actual_end = _dates(tracking.actual_end_date for tracking in trackings)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_cost = ~np.isnan(actual) & ~np.isnan(estimated) & (estimated != 0)
+        cost_variance = (estimated - actual) / estimated * 100
+
+        has_dates = ~np.isnat(planned_end) & ~np.isnat(actual_start) & ~np.isnat(actual_end)
+        planned_days = (planned_end - actual_start).astype('int64')
+        actual_days = (actual_end - actual_start).astype('int64')
+        delay_days = (actual_end - planned_end).astype('int64')
+        has_delay = has_dates & (planned_days > 0) & (actual_days > 0)
+        delay_rate = delay_days / planned_days * 100
+
+    for index, tracking in enumerate(trackings):
+        tracking.cost_variance_percentage = _percentage(cost_variance[index]) if has_cost[index] else None
+        if has_delay[index]:
+            tracking.delay_rate = _percentage(delay_rate[index], precision=10)
+            tracking.delay_variance_days = int(delay_days[index])
+        else:
+            tracking.delay_rate = tracking.delay_variance_days = None
+    return trackings
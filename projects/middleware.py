@@ -0,0 +1,52 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .timing import record_query, timed_request
+
+logger = logging.getLogger('projects.timing')
+
+
+class ServerTimingMiddleware:
+    """
+    Measure each request's database, template and application time.
+
+    The figures are sent in a ``Server-Timing`` header (when ``SERVER_TIMING``
+    is on, by default in DEBUG) and logged as one line per request on the
+    ``projects.timing`` logger at INFO. With both off the middleware removes
+    itself at startup and costs nothing.
+    """
+
+    def __init__(self, get_response):
+        self.server_timing = getattr(settings, 'SERVER_TIMING', settings.DEBUG)
+        if not self.server_timing and not logger.isEnabledFor(logging.INFO):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timed_request() as timing, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            response = self.get_response(request)
+            metrics = timing.metrics()
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics["db_ms"]};desc="{metrics["queries"]} queries"',
+                f'tpl;dur={metrics["template_ms"]}',
+                f'app;dur={metrics["app_ms"]}',
+                f'total;dur={metrics["total_ms"]}',
+            ])
+        if logger.isEnabledFor(logging.INFO):
+            match = request.resolver_match
+            view = match.view_name if match else '-'
+            logger.info(
+                'view=%s method=%s status=%s total_ms=%s db_ms=%s queries=%s template_ms=%s app_ms=%s',
+                view, request.method, response.status_code, metrics['total_ms'], metrics['db_ms'],
+                metrics['queries'], metrics['template_ms'], metrics['app_ms'],
+                extra={'view': view, 'status': response.status_code, **metrics},
+            )
+        return response
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from projects import search
+
+    connection = schema_editor.connection
+    search.create_index_table(connection)
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+
+    Project = apps.get_model('projects', 'Project')
+    chunk = []
+    for project in Project.objects.using(connection.alias).only('pk', *search.SEARCH_FIELDS).iterator(chunk_size=2000):
+        chunk.append(project)
+        if len(chunk) >= 2000:
+            search.index_projects(chunk, using=connection.alias)
+            chunk = []
+    search.index_projects(chunk, using=connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    from projects import search
+
+    search.drop_index_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_remove_projecttracking_estimated_costs_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:53
+
+from django.db import migrations, models
+
+
+def backfill_total_estimated_cost(apps, schema_editor):
+    from projects.maintenance import backfill_total_estimated_cost
+
+    Project = apps.get_model('projects', 'Project')
+    backfill_total_estimated_cost(Project, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_project_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='total_estimated_cost',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, help_text='كلفة تعبئة العقار + الدراسات + الإنجازات', max_digits=17, null=True, verbose_name='التكلفة الإجمالية'),
+        ),
+        migrations.RunPython(backfill_total_estimated_cost, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_project_total_estimated_cost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='imports/', verbose_name='الملف')),
+                ('original_name', models.CharField(max_length=255, verbose_name='اسم الملف')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('running', 'قيد التنفيذ'), ('completed', 'مكتمل'), ('failed', 'فشل'), ('cancelled', 'ملغى')], db_index=True, default='pending', max_length=20, verbose_name='الحالة')),
+                ('rows_processed', models.PositiveIntegerField(default=0, verbose_name='الأسطر المعالجة')),
+                ('rows_created', models.PositiveIntegerField(default=0, verbose_name='المشاريع المضافة')),
+                ('rows_skipped', models.PositiveIntegerField(default=0, verbose_name='الأسطر المتخطاة')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='عدد الأخطاء')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='الأخطاء')),
+                ('message', models.TextField(blank=True, default='', verbose_name='رسالة')),
+                ('cancel_requested', models.BooleanField(default=False, verbose_name='طلب الإلغاء')),
+                ('worker', models.CharField(blank=True, default='', max_length=100, verbose_name='العامل')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ البدء')),
+                ('run_started_at', models.DateTimeField(blank=True, null=True, verbose_name='بداية التشغيل الحالي')),
+                ('run_start_rows', models.PositiveIntegerField(default=0, verbose_name='الأسطر عند بداية التشغيل')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر نشاط')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الانتهاء')),
+            ],
+            options={
+                'verbose_name': 'عملية استيراد',
+                'verbose_name_plural': 'عمليات الاستيراد',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
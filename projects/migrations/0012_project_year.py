@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_project_years(apps, schema_editor):
+    from projects.maintenance import rebuild_project_years
+
+    Project = apps.get_model('projects', 'Project')
+    ProjectYear = apps.get_model('projects', 'ProjectYear')
+    rebuild_project_years(Project, ProjectYear, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('implementation', 'سنة التنفيذ'), ('budget', 'سنة الميزانية')], max_length=20, verbose_name='النوع')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='السنة')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='year_entries', to='projects.project', verbose_name='المشروع')),
+            ],
+            options={
+                'verbose_name': 'سنة مشروع',
+                'verbose_name_plural': 'سنوات المشاريع',
+                'indexes': [models.Index(fields=['kind', 'year', 'project'], name='projectyear_kind_year_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'kind', 'year'), name='unique_project_year')],
+            },
+        ),
+        migrations.RunPython(build_project_years, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_project_year'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='executionrate',
+            index=models.Index(fields=['project', '-created_at', '-id'], name='executionrate_latest_idx'),
+        ),
+    ]
@@ -2,6 +2,97 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 from django.core.validators import MinValueValidator, MaxValueValidator
+from decimal import Decimal, InvalidOperation
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Fields that feed Project.total_estimated_cost
+TOTAL_COST_SOURCE_FIELDS = ('property_prep_cost', 'studies', 'achievements')
+
+# Largest amount that fits in a DecimalField(max_digits=15, decimal_places=2)
+MAX_AMOUNT = Decimal('9999999999999.99')
+
+
+# Eastern Arabic digits and decimal separator; thousands separators (Arabic,
+# comma, spaces) are dropped
+_NUMBER_TRANSLATION = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹٫', '01234567890123456789.', '٬, \u00a0\u202f')
+
+
+def parse_number(value):
+    """
+    Convert a cell or free-text number to a Decimal.
+
+    Eastern Arabic digits and separators are read, thousands separators are
+    ignored. Returns None for blanks and for anything that is not a finite
+    number.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, Decimal):
+        number = value
+    else:
+        text = str(value).strip().translate(_NUMBER_TRANSLATION)
+        if not text:
+            return None
+        try:
+            number = Decimal(text)
+        except (InvalidOperation, ValueError):
+            return None
+    return number if number.is_finite() else None
+
+
+def parse_amount(value):
+    """
+    Convert a free-text amount to a Decimal rounded to cents.
+
+    Returns None for blank text, text that is not a number (see
+    ``parse_number``) and amounts too large to be stored.
+    """
+    amount = parse_number(value)
+    if amount is None or abs(amount) > MAX_AMOUNT:
+        return None
+    return amount.quantize(Decimal('0.01'))
+
+
+def compute_total_estimated_cost(property_prep_cost, studies, achievements):
+    """Sum the property preparation cost and the numeric studies/achievements amounts."""
+    total = Decimal('0.00')
+    for value in (property_prep_cost, studies, achievements):
+        amount = parse_amount(value)
+        if amount is not None:
+            total += amount
+    return total
+
+
+# ProjectYear kind -> Project JSON list field it is derived from
+PROJECT_YEAR_SOURCES = {
+    'implementation': 'implementation_years',
+    'budget': 'budget_years',
+}
+
+# Four-digit years inside a list item, whatever digits were used to type it
+_YEAR_RE = re.compile(r'\d{4}')
+
+
+def parse_year_list(value):
+    """
+    Return the sorted distinct years of a year list field.
+
+    Items may be numbers or text such as "2025" or "٢٠٢٥"; anything without
+    a four-digit year is ignored.
+    """
+    if value is None:
+        return []
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    years = set()
+    for item in value:
+        for match in _YEAR_RE.findall(str(item)):
+            years.add(int(match))
+    return sorted(years)
+
 
 class Project(models.Model):
     # Basic Information
@@ -28,6 +119,9 @@ class Project(models.Model):
     achievements = models.TextField(_('الإنجازات'), blank=True, null=True)
     estimated_cost = models.DecimalField(_('التكلفة التقديرية'), max_digits=15, decimal_places=2,
                                        help_text=_('بالدرهم المغربي'))
+    total_estimated_cost = models.DecimalField(_('التكلفة الإجمالية'), max_digits=17, decimal_places=2,
+                                             null=True, blank=True, editable=False, db_index=True,
+                                             help_text=_('كلفة تعبئة العقار + الدراسات + الإنجازات'))
     start_year = models.PositiveIntegerField(_('سنة الانطلاق'))
     estimated_duration = models.PositiveIntegerField(_('المدة التقديرية (أشهر)'))
     
@@ -63,34 +157,64 @@ class Project(models.Model):
     def __str__(self):
         return f"{self.code} - {self.program}"
         
-    @property
-    def total_estimated_cost(self):
+    def compute_total_estimated_cost(self):
         """
         Calculate the total estimated cost as the sum of:
-        - studies (converted to float, default to 0)
-        - achievements (converted to float, default to 0)
-        - property_prep_cost (already a Decimal)
+        - studies (when it holds a number, default to 0)
+        - achievements (when it holds a number, default to 0)
+        - property_prep_cost
         """
-        total = self.property_prep_cost or 0
-        
-        try:
-            studies_cost = float(self.studies) if self.studies and self.studies.strip() else 0
-            total += studies_cost
-        except (ValueError, TypeError):
-            pass
-            
-        try:
-            achievements_cost = float(self.achievements) if self.achievements and self.achievements.strip() else 0
-            total += achievements_cost
-        except (ValueError, TypeError):
-            pass
-            
-        return total
+        return compute_total_estimated_cost(self.property_prep_cost, self.studies, self.achievements)
+
+    def save(self, *args, **kwargs):
+        # Keep the stored total in step with the fields it is derived from
+        self.total_estimated_cost = self.compute_total_estimated_cost()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(TOTAL_COST_SOURCE_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | {'total_estimated_cost'}
+        super().save(*args, **kwargs)
         
     def get_absolute_url(self):
         return reverse('project_detail', kwargs={'pk': self.pk})
 
 
+class ProjectYear(models.Model):
+    """
+    One year of a project's implementation_years or budget_years list.
+
+    The JSON lists stay the source of truth; these rows are derived from them
+    on every save so that "projects executed in 2026" is an indexed lookup.
+    """
+    KIND_IMPLEMENTATION = 'implementation'
+    KIND_BUDGET = 'budget'
+    KIND_CHOICES = [
+        (KIND_IMPLEMENTATION, _('سنة التنفيذ')),
+        (KIND_BUDGET, _('سنة الميزانية')),
+    ]
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='year_entries',
+        verbose_name=_('المشروع')
+    )
+    kind = models.CharField(_('النوع'), max_length=20, choices=KIND_CHOICES)
+    year = models.PositiveSmallIntegerField(_('السنة'))
+
+    class Meta:
+        verbose_name = _('سنة مشروع')
+        verbose_name_plural = _('سنوات المشاريع')
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'kind', 'year'], name='unique_project_year'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'year', 'project'], name='projectyear_kind_year_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id} - {self.get_kind_display()} {self.year}"
+
+
 class ProjectTracking(models.Model):
     """Model to track project progress and financial information."""
     project = models.OneToOneField(
@@ -227,7 +351,7 @@ class ProjectTracking(models.Model):
             return delay_rate, delay_days
             
         except (TypeError, AttributeError, ValueError) as e:
-            print(f"Error calculating delay metrics: {e}")
+            logger.warning('Error calculating delay metrics for project %s: %s', self.project_id, e)
             return None, None
     
     def save(self, *args, **kwargs):
@@ -251,12 +375,20 @@ class ProjectTracking(models.Model):
         Update related project status based on tracking information.
         This can be expanded to update project status based on tracking data.
         """
-        # Example: You could update project status based on completion
+        if self.apply_project_status():
+            self.project.save(update_fields=['achievements'])
+    
+    def apply_project_status(self):
+        """
+        Set the completion note on the (already loaded) project without saving it.
+        Returns True when the project changed and has to be saved.
+        """
         if self.actual_end_date and not self.project.achievements:
             self.project.achievements = _("تم الانتهاء من المشروع في {}").format(
                 self.actual_end_date.strftime('%Y-%m-%d')
             )
-            self.project.save(update_fields=['achievements'])
+            return True
+        return False
     
     @property
     def is_delayed(self):
@@ -288,7 +420,7 @@ class ProjectTracking(models.Model):
             return _("مكتمل في الوقت المحدد")
     
     def get_absolute_url(self):
-        return reverse('project_tracking_detail', kwargs={'pk': self.pk})
+        return reverse('projects:project_tracking_edit', kwargs={'pk': self.project_id})
 
 
 class ExecutionRate(models.Model):
@@ -420,6 +552,10 @@ class ExecutionRate(models.Model):
         verbose_name = _('معدل التنفيذ')
         verbose_name_plural = _('معدلات التنفيذ')
         ordering = ['-created_at']
+        indexes = [
+            # Latest snapshot of a project (see latest_execution_rates)
+            models.Index(fields=['project', '-created_at', '-id'], name='executionrate_latest_idx'),
+        ]
     
     def __str__(self):
         return f"{self.project.code} - {self.project.program} - {self.created_at.strftime('%Y-%m-%d')}"
@@ -445,3 +581,99 @@ class ExecutionRate(models.Model):
     
     def get_absolute_url(self):
         return reverse('execution_rate_detail', kwargs={'pk': self.pk})
+
+
+def latest_execution_rates(project_ref='pk'):
+    """
+    Execution rates of the project referenced by ``project_ref`` (an OuterRef
+    name), newest first, for use in Subquery annotations and filters.
+    """
+    return ExecutionRate.objects.filter(project=models.OuterRef(project_ref)).order_by('-created_at', '-pk')
+
+
+def with_latest_execution(queryset):
+    """
+    Annotate projects with their latest execution snapshot: latest_execution_id,
+    latest_work_progress, latest_financial_achievement, latest_execution_at and
+    latest_execution_updated_at (None when the project has no execution rate).
+    """
+    latest = latest_execution_rates()
+    return queryset.annotate(
+        latest_execution_id=models.Subquery(latest.values('pk')[:1]),
+        latest_work_progress=models.Subquery(latest.values('work_progress_percentage')[:1]),
+        latest_financial_achievement=models.Subquery(latest.values('financial_achievement_percentage')[:1]),
+        latest_execution_at=models.Subquery(latest.values('created_at')[:1]),
+        latest_execution_updated_at=models.Subquery(latest.values('updated_at')[:1]),
+    )
+
+
+class ImportJob(models.Model):
+    """A spreadsheet import queued in the database and run by a background worker."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _('في الانتظار')),
+        (STATUS_RUNNING, _('قيد التنفيذ')),
+        (STATUS_COMPLETED, _('مكتمل')),
+        (STATUS_FAILED, _('فشل')),
+        (STATUS_CANCELLED, _('ملغى')),
+    ]
+    FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+    # Number of row errors kept for display; error_count has the full total
+    MAX_STORED_ERRORS = 1000
+
+    file = models.FileField(_('الملف'), upload_to='imports/')
+    original_name = models.CharField(_('اسم الملف'), max_length=255)
+    status = models.CharField(_('الحالة'), max_length=20, choices=STATUS_CHOICES,
+                              default=STATUS_PENDING, db_index=True)
+
+    # Progress. rows_processed is also the resume point after a crash: it is
+    # saved in the same transaction as the rows it counts.
+    rows_processed = models.PositiveIntegerField(_('الأسطر المعالجة'), default=0)
+    rows_created = models.PositiveIntegerField(_('المشاريع المضافة'), default=0)
+    rows_skipped = models.PositiveIntegerField(_('الأسطر المتخطاة'), default=0)
+    error_count = models.PositiveIntegerField(_('عدد الأخطاء'), default=0)
+    errors = models.JSONField(_('الأخطاء'), default=list, blank=True)
+    message = models.TextField(_('رسالة'), blank=True, default='')
+
+    cancel_requested = models.BooleanField(_('طلب الإلغاء'), default=False)
+    worker = models.CharField(_('العامل'), max_length=100, blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(_('عدد المحاولات'), default=0)
+
+    created_at = models.DateTimeField(_('تاريخ الإنشاء'), auto_now_add=True)
+    started_at = models.DateTimeField(_('تاريخ البدء'), null=True, blank=True)
+    run_started_at = models.DateTimeField(_('بداية التشغيل الحالي'), null=True, blank=True)
+    run_start_rows = models.PositiveIntegerField(_('الأسطر عند بداية التشغيل'), default=0)
+    heartbeat_at = models.DateTimeField(_('آخر نشاط'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('تاريخ الانتهاء'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('عملية استيراد')
+        verbose_name_plural = _('عمليات الاستيراد')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.original_name} - {self.get_status_display()}"
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def rows_per_second(self):
+        """Throughput of the current (or last) run of the job."""
+        if not self.run_started_at:
+            return 0
+        end = self.finished_at or self.heartbeat_at
+        if not end:
+            return 0
+        elapsed = (end - self.run_started_at).total_seconds()
+        rows = self.rows_processed - self.run_start_rows
+        return round(rows / elapsed, 1) if elapsed > 0 else 0
+
+    def get_absolute_url(self):
+        return reverse('projects:import_job_detail', kwargs={'pk': self.pk})
@@ -0,0 +1,156 @@
+"""
+Cached project pages.
+
+The rendered detail page of a project and the cells of its project list row
+are cached under keys holding the project id. Each entry records the
+project's ``updated_at`` and the id and ``updated_at`` of its latest execution
+rate, and is only used while those still match. The signals in ``signals.py`` drop the
+entries of a project when it, one of its execution rates or its tracking is
+saved or deleted; bulk writes, which send no signals, call
+``clear_project_pages`` to drop every entry at once.
+
+Hits and misses are counted in the cache so that ``api/cache-stats/`` can
+show whether the cache works.
+"""
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+PAGE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Bumped by clear_project_pages; part of every key
+GENERATION_KEY = 'projects:pages:generation'
+
+CACHE_STATS = ('project_detail', 'project_row')
+
+# Shown by management commands that clear a cache the web workers cannot see
+LOCAL_CACHE_WARNING = (
+    'الذاكرة المؤقتة محلية (LocMemCache)، لذلك لم يصل مسحها إلى الخادم: '
+    'أعد تشغيل الخادم، أو عرّف DJANGO_CACHE_DIR لمشاركة الذاكرة المؤقتة بين العمليات.'
+)
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def _key(kind, pk, generation):
+    return f'projects:pages:{generation}:{kind}:{pk}'
+
+
+def _stats_key(name, outcome):
+    return f'projects:cache_stats:{name}:{outcome}'
+
+
+def count(name, hits=0, misses=0):
+    """Add to the hit/miss counters of ``name``."""
+    for outcome, amount in (('hits', hits), ('misses', misses)):
+        if not amount:
+            continue
+        key = _stats_key(name, outcome)
+        if not cache.add(key, amount, timeout=None):
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                # Evicted between add and incr
+                cache.set(key, amount, timeout=None)
+
+
+def cache_stats():
+    """Return {name: {'hits': n, 'misses': n, 'hit_rate': ratio or None}}."""
+    keys = {(name, outcome): _stats_key(name, outcome)
+            for name in CACHE_STATS for outcome in ('hits', 'misses')}
+    values = cache.get_many(keys.values())
+    stats = {}
+    for name in CACHE_STATS:
+        hits = values.get(keys[name, 'hits'], 0)
+        misses = values.get(keys[name, 'misses'], 0)
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _stamp(project):
+    # Bulk writes to execution rates (grid, recompute_metrics) only bump the
+    # rate's updated_at, so the latest rate is part of the stamp
+    return [
+        _isoformat(project.updated_at),
+        project.latest_execution_id,
+        _isoformat(project.latest_execution_updated_at),
+    ]
+
+
+def cached_project_detail(project, render):
+    """
+    Return ``(content, hit)`` for the detail page of ``project`` (annotated
+    with ``with_latest_execution``); ``render()`` builds the content on a miss.
+    """
+    key = _key('detail', project.pk, _generation())
+    stamp = _stamp(project)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == stamp:
+        count('project_detail', hits=1)
+        return entry[1], True
+
+    content = render()
+    cache.set(key, (stamp, content), PAGE_CACHE_TIMEOUT)
+    count('project_detail', misses=1)
+    return content, False
+
+
+def cached_project_rows(projects, render):
+    """
+    Return ``{pk: fragments}`` of the list rows of ``projects`` (annotated
+    with ``with_latest_execution``), read with one cache lookup;
+    ``render(project)`` builds the fragments of a project missing from the cache.
+    """
+    generation = _generation()
+    keys = {project.pk: _key('row', project.pk, generation) for project in projects}
+    entries = cache.get_many(keys.values())
+
+    rows, missing = {}, {}
+    for project in projects:
+        stamp = _stamp(project)
+        entry = entries.get(keys[project.pk])
+        if entry is not None and entry[0] == stamp:
+            rows[project.pk] = entry[1]
+        else:
+            rows[project.pk] = render(project)
+            missing[keys[project.pk]] = (stamp, rows[project.pk])
+
+    if missing:
+        cache.set_many(missing, PAGE_CACHE_TIMEOUT)
+    count('project_row', hits=len(rows) - len(missing), misses=len(missing))
+    return rows
+
+
+def cache_is_shared():
+    """
+    False when the cache lives in the current process (LocMemCache), so that
+    clearing it from a management command does not reach the web workers.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def invalidate_project_pages(pk):
+    """Drop the cached detail page and list row of project ``pk``."""
+    generation = _generation()
+    cache.delete_many([_key('detail', pk, generation), _key('row', pk, generation)])
+
+
+def clear_project_pages():
+    """Drop the cached pages of every project."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, timeout=None)
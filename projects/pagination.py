@@ -0,0 +1,84 @@
+from django.utils.http import urlencode
+
+
+def parse_cursor(value):
+    """Return the cursor as a positive integer id, or None if it is missing or invalid."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+
+def _row_pk(row):
+    # Model instances, or dicts from values() that include 'id'
+    return row['id'] if isinstance(row, dict) else row.pk
+
+
+class KeysetPage:
+    """A page of objects fetched with keyset (cursor) pagination on ``-id``."""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        return _row_pk(self.object_list[-1]) if self.has_next and self.object_list else None
+
+    @property
+    def previous_cursor(self):
+        return _row_pk(self.object_list[0]) if self.has_previous and self.object_list else None
+
+
+def keyset_paginate(queryset, after=None, before=None, per_page=50):
+    """
+    Return a KeysetPage of ``queryset`` ordered by ``-id``.
+
+    ``after`` returns the rows that follow the given id (older rows), ``before``
+    the rows that precede it (newer rows). Each page costs a single indexed
+    query, whatever its position in the table.
+    """
+    after = parse_cursor(after)
+    before = parse_cursor(before)
+
+    if before is not None:
+        rows = list(queryset.filter(pk__gt=before).order_by('pk')[:per_page + 1])
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page]
+        rows.reverse()
+        return KeysetPage(rows, has_next=True, has_previous=has_previous)
+
+    if after is not None:
+        queryset = queryset.filter(pk__lt=after)
+    rows = list(queryset.order_by('-pk')[:per_page + 1])
+    has_next = len(rows) > per_page
+    return KeysetPage(rows[:per_page], has_next=has_next, has_previous=after is not None)
+
+
+def estimate_count(queryset, limit=1000):
+    """
+    Count the rows of ``queryset`` without scanning past ``limit``.
+
+    Returns a ``(count, is_capped)`` tuple; when ``is_capped`` is True the real
+    total is larger than ``limit``.
+    """
+    count = queryset.order_by()[:limit + 1].count()
+    if count > limit:
+        return limit, True
+    return count, False
+
+
+def cursor_querystring(params, **cursor):
+    """Build a query string that keeps the current filters and sets a cursor."""
+    query = {key: value for key, value in params.items()
+             if value and key not in ('after', 'before')}
+    query.update({key: value for key, value in cursor.items() if value})
+    return urlencode(query)
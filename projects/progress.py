@@ -0,0 +1,139 @@
+"""
+Execution progress time series.
+
+The series of a set of projects is read in one query ordered by
+(project, created_at), which the ExecutionRate latest-snapshot index serves
+in reverse, and reduced to at most ``points`` samples per project before it
+is serialized. Responses carry an ETag derived from the rows they summarize
+and are kept in the Django cache under that key.
+"""
+import hashlib
+import json
+from itertools import groupby
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .export_cache import fingerprint
+from .models import ExecutionRate, Project
+
+SERIES_FIELDS = ('work_progress_percentage', 'financial_achievement_percentage', 'actual_costs')
+
+DEFAULT_POINTS = 100
+MAX_POINTS = 1000
+# Projects returned by one request for a filtered set
+MAX_PROJECTS = 500
+
+PROGRESS_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def parse_points(value):
+    """Read the ``points`` parameter, clamped to 2..MAX_POINTS."""
+    try:
+        points = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_POINTS
+    return min(max(points, 2), MAX_POINTS)
+
+
+def downsample(rows, points):
+    """
+    Keep at most ``points`` evenly spaced rows; the first and last rows are
+    always kept so that a curve starts and ends at the real values.
+    """
+    count = len(rows)
+    if count <= points:
+        return rows
+    step = (count - 1) / (points - 1)
+    return [rows[round(index * step)] for index in range(points)]
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+def build_series(project_ids, points):
+    """
+    Return {project_id: {'total_points': n, 'points': [[timestamp, *values], ...]}}
+    for the projects of ``project_ids`` (a list or a values('pk') subquery).
+    Timestamps are Unix seconds.
+    """
+    rows = (
+        ExecutionRate.objects.filter(project__in=project_ids)
+        .order_by('project_id', 'created_at', 'pk')
+        .values_list('project_id', 'created_at', *SERIES_FIELDS)
+        .iterator(chunk_size=5000)
+    )
+    series = {}
+    for project_id, project_rows in groupby(rows, key=lambda row: row[0]):
+        project_rows = list(project_rows)
+        series[project_id] = {
+            'total_points': len(project_rows),
+            'points': [
+                [int(created_at.timestamp())] + [_number(value) for value in values]
+                for _, created_at, *values in downsample(project_rows, points)
+            ],
+        }
+    return series
+
+
+def progress_response(request, projects, points, single=False):
+    """
+    JSON progress series for the ``projects`` queryset, answered with a 304
+    when the client already has the current version.
+    """
+    # Both the snapshots and the projects listed (codes, projects without
+    # snapshots) have to be unchanged for a cached version to be reused.
+    # Only the projects served count, plus one to tell whether the list is
+    # truncated.
+    project_ids = list(projects.order_by('pk').values_list('pk', flat=True)[:MAX_PROJECTS + 1])
+    rate_count, rates_latest = fingerprint(ExecutionRate.objects.filter(project__in=project_ids[:MAX_PROJECTS]))
+    project_count, projects_latest = fingerprint(Project.objects.filter(pk__in=project_ids))
+    latest = max(filter(None, (rates_latest, projects_latest)), default=None)
+    key = hashlib.sha256(json.dumps([
+        str(projects.query), points, single, rate_count, project_count,
+        latest.isoformat() if latest else None,
+    ]).encode('utf-8')).hexdigest()
+    etag = f'"{key}"'
+    # HTTP dates have whole seconds; a fraction would never match If-Modified-Since
+    last_modified = int(latest.timestamp()) if latest else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        cache_key = f'projects:progress:{key}'
+        content = cache.get(cache_key)
+        if content is None:
+            content = json.dumps(
+                _payload(projects, points, single), ensure_ascii=False, separators=(',', ':')
+            )
+            cache.set(cache_key, content, PROGRESS_CACHE_TIMEOUT)
+        response = HttpResponse(content, content_type='application/json')
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _payload(projects, points, single):
+    fields = ['timestamp', *SERIES_FIELDS]
+    if single:
+        project = projects.get()
+        data = build_series([project.pk], points).get(project.pk, {'total_points': 0, 'points': []})
+        return {'project': project.pk, 'code': project.code, 'fields': fields, **data}
+
+    selected = list(projects.order_by('pk').values_list('pk', 'code')[:MAX_PROJECTS + 1])
+    truncated = len(selected) > MAX_PROJECTS
+    selected = selected[:MAX_PROJECTS]
+    series = build_series([pk for pk, _ in selected], points)
+    return {
+        'fields': fields,
+        'truncated': truncated,
+        'projects': [
+            {'project': pk, 'code': code, **series.get(pk, {'total_points': 0, 'points': []})}
+            for pk, code in selected
+        ],
+    }
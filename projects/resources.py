@@ -1,9 +1,53 @@
 from import_export import resources, fields, widgets
 from import_export.widgets import ForeignKeyWidget, ManyToManyWidget, Widget
-from .models import Project
+from .models import Project, parse_number
 from django.utils.translation import gettext_lazy as _
 import json
 
+# Arabic column names accepted in import files, mapped to field names
+IMPORT_COLUMN_NAMES = {
+    'الرمز': 'code',
+    'البرنامج': 'program',
+    'المشاريع': 'projects',
+    'المكان': 'location',
+    'المقاطعة/الجماعة': 'district',
+    'الرمز في تصميم التهيئة': 'planning_code',
+    'الأهداف التنموية': 'development_goals',
+    'مكونات المشروع': 'components',
+    'الفئة المستهدفة': 'target_group',
+    'أهداف المشروع': 'project_goals',
+    'وضعية العقار': 'property_status',
+    'الرسم العقاري': 'property_drawing',
+    'المساحة': 'area',
+    'كلفة تعبئة العقار': 'property_prep_cost',
+    'الدراسات': 'studies',
+    'الإنجازات': 'achievements',
+    'التكلفة التقديرية': 'estimated_cost',
+    'سنة الانطلاق': 'start_year',
+    'المدة التقديرية (أشهر)': 'estimated_duration',
+}
+
+# Text fields left empty get a placeholder on import
+IMPORT_TEXT_PLACEHOLDERS = {
+    'program': 'برنامج غير محدد',
+    'location': 'غير محدد',
+    'district': 'غير محدد',
+    'projects': 'مشروع جديد',
+    'components': 'غير محدد',
+    'target_group': 'غير محدد',
+    'property_status': 'غير محدد',
+}
+
+# Number fields that are empty or not a number get a default on import
+# (None: the current year)
+IMPORT_NUMBER_DEFAULTS = {
+    'area': '0.00',
+    'property_prep_cost': '0.00',
+    'estimated_cost': '0.00',
+    'estimated_duration': '12',
+    'start_year': None,
+}
+
 class EmptyStringToDefaultWidget(Widget):
     """Widget that converts empty strings to None."""
     def clean(self, value, row=None, *args, **kwargs):
@@ -100,37 +144,12 @@ class ProjectResource(resources.ModelResource):
         """Handle empty or invalid values before import."""
         from django.utils import timezone
         from random import randint
-        from decimal import Decimal, InvalidOperation
-        import re
-        
-        # Map Excel column names to field names
-        field_mapping = {
-            'الرمز': 'code',
-            'البرنامج': 'program',
-            'المشاريع': 'projects',
-            'المكان': 'location',
-            'المقاطعة/الجماعة': 'district',
-            'الرمز في تصميم التهيئة': 'planning_code',
-            'الأهداف التنموية': 'development_goals',
-            'مكونات المشروع': 'components',
-            'الفئة المستهدفة': 'target_group',
-            'أهداف المشروع': 'project_goals',
-            'وضعية العقار': 'property_status',
-            'الرسم العقاري': 'property_drawing',
-            'المساحة': 'area',
-            'كلفة تعبئة العقار': 'property_prep_cost',
-            'الدراسات': 'studies',
-            'الإنجازات': 'achievements',
-            'التكلفة التقديرية': 'estimated_cost',
-            'سنة الانطلاق': 'start_year',
-            'المدة التقديرية (أشهر)': 'estimated_duration'
-        }
         
-        # Create a new row with mapped field names
+        # Create a new row with mapped field names (Arabic headers)
         mapped_row = {}
         for col_name, value in row.items():
-            if col_name in field_mapping:
-                mapped_row[field_mapping[col_name]] = value
+            if col_name in IMPORT_COLUMN_NAMES:
+                mapped_row[IMPORT_COLUMN_NAMES[col_name]] = value
             else:
                 mapped_row[col_name] = value
         
@@ -151,30 +170,14 @@ class ProjectResource(resources.ModelResource):
             row['code'] = f"PRJ-{timezone.now().strftime('%Y%m%d')}-{randint(1000, 9999)}"
         
         # Handle numeric fields
-        numeric_fields = {
-            'area': '0.00',
-            'property_prep_cost': '0.00',
-            'estimated_cost': '0.00',
-            'estimated_duration': '12',
-            'start_year': str(timezone.now().year)
-        }
-        
-        for field, default in numeric_fields.items():
+        for field, default in IMPORT_NUMBER_DEFAULTS.items():
             if field in row and row[field] is not None:
-                try:
-                    # Convert to string and clean
-                    value = str(row[field]).strip()
-                    # Remove any non-numeric characters except decimal point and negative sign
-                    value = re.sub(r'[^\d.-]', '', value)
-                    if value and value != '.':
-                        # Convert to Decimal to handle both integers and floats
-                        decimal_value = Decimal(value)
-                        # Convert back to string with proper format
-                        row[field] = str(decimal_value.normalize())
-                    else:
-                        row[field] = default
-                except (ValueError, InvalidOperation, TypeError):
-                    row[field] = default
+                number = parse_number(row[field])
+                if number is not None:
+                    # Fixed-point: str() of a normalized 2020 would be '2.02E+3'
+                    row[field] = format(number.normalize(), 'f')
+                else:
+                    row[field] = default or str(timezone.now().year)
         
         # Handle JSON fields
         json_fields = {
@@ -206,17 +209,7 @@ class ProjectResource(resources.ModelResource):
                 row[field] = json_fields[field]
         
         # Set default values for required text fields if they're empty
-        required_text_fields = {
-            'program': 'برنامج غير محدد',
-            'location': 'غير محدد',
-            'district': 'غير محدد',
-            'projects': 'مشروع جديد',
-            'components': 'غير محدد',
-            'target_group': 'غير محدد',
-            'property_status': 'غير محدد',
-        }
-        
-        for field, default in required_text_fields.items():
+        for field, default in IMPORT_TEXT_PLACEHOLDERS.items():
             if field not in row or not row[field] or str(row[field]).strip() == '':
                 row[field] = default
         
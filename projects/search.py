@@ -0,0 +1,205 @@
+"""
+Full-text search over projects.
+
+Searchable text is normalized (hamza/alef forms, taa marbuta, alef maqsura,
+tashkeel, tatweel and Eastern Arabic digits) and stripped of the definite
+article before it is indexed and before it is queried, so spelling variants
+of the same word match each other.
+
+The index lives in ``projects_project_fts``: an FTS5 virtual table on SQLite
+and a GIN-indexed ``tsvector`` table on PostgreSQL. On any other database, or
+if the table is missing, searches fall back to ``icontains`` lookups.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Project
+
+FTS_TABLE = 'projects_project_fts'
+
+# Project fields that make up the search document
+SEARCH_FIELDS = ('code', 'program', 'location', 'district', 'projects', 'components')
+
+# Harakat, Quranic annotation marks, superscript alef and tatweel
+_TASHKEEL_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_TOKEN_RE = re.compile(r'\w+')
+
+_CHAR_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي',
+    'ؤ': 'و',
+    'ئ': 'ي',
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # Eastern Arabic digits
+    **{chr(0x06f0 + i): str(i) for i in range(10)},  # Persian digits
+})
+
+# Definite article and its common proclitic forms, longest first
+_ARTICLES = ('وال', 'بال', 'كال', 'فال', 'ال', 'لل')
+
+_available = {}
+
+
+def normalize_arabic(text):
+    """Normalize Arabic text so that common spelling variants compare equal."""
+    if not text:
+        return ''
+    text = _TASHKEEL_RE.sub('', str(text))
+    return text.translate(_CHAR_MAP).lower()
+
+
+def _strip_article(token):
+    for article in _ARTICLES:
+        if token.startswith(article) and len(token) - len(article) >= 2:
+            return token[len(article):]
+    return token
+
+
+def tokenize(text):
+    """Split text into normalized search tokens."""
+    return [_strip_article(token) for token in _TOKEN_RE.findall(normalize_arabic(text))]
+
+
+def search_document(project):
+    """Return the normalized text indexed for a project."""
+    return ' '.join(
+        ' '.join(tokenize(getattr(project, field, '') or '')) for field in SEARCH_FIELDS
+    )
+
+
+def _connection(using=None):
+    return connections[using or router.db_for_write(Project)]
+
+
+def _backend(connection):
+    """Return the vendor name if the search table is usable on this connection."""
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return None
+    if connection.alias not in _available:
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        _available[connection.alias] = FTS_TABLE in tables
+    return connection.vendor if _available[connection.alias] else None
+
+
+def reset_availability_cache():
+    """Forget which connections have a search table (after migrations)."""
+    _available.clear()
+
+
+def create_index_table(connection):
+    """Create the search table for the connection's vendor."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                f'USING fts5(document, tokenize="unicode61 remove_diacritics 2")'
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {FTS_TABLE} ('
+                f'project_id bigint PRIMARY KEY REFERENCES projects_project(id) '
+                f'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+                f'document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_idx '
+                f'ON {FTS_TABLE} USING GIN (document)'
+            )
+    reset_availability_cache()
+
+
+def drop_index_table(connection):
+    """Drop the search table, if the vendor supports one."""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    reset_availability_cache()
+
+
+def index_projects(projects, using=None):
+    """Add or refresh the search entries of the given Project instances."""
+    connection = _connection(using)
+    backend = _backend(connection)
+    if backend is None:
+        return
+    rows = [(project.pk, search_document(project)) for project in projects]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk, _ in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, document) VALUES (%s, %s)', rows
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (project_id, document) "
+                f"VALUES (%s, to_tsvector('simple', %s)) "
+                f"ON CONFLICT (project_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def remove_projects(pks, using=None):
+    """Remove the search entries of the given project ids."""
+    connection = _connection(using)
+    backend = _backend(connection)
+    pks = [(pk,) for pk in pks]
+    if backend is None or not pks:
+        return
+    column = 'rowid' if backend == 'sqlite' else 'project_id'
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE {column} = %s', pks)
+
+
+def rebuild_index(chunk_size=2000, using=None):
+    """Re-index every project in chunks. Returns the number of projects indexed."""
+    connection = _connection(using)
+    if _backend(connection) is None:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    total = 0
+    chunk = []
+    queryset = Project.objects.using(connection.alias).only('pk', *SEARCH_FIELDS).order_by('pk')
+    for project in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(project)
+        if len(chunk) >= chunk_size:
+            index_projects(chunk, using=connection.alias)
+            total += len(chunk)
+            chunk = []
+    index_projects(chunk, using=connection.alias)
+    return total + len(chunk)
+
+
+def search_projects(queryset, query):
+    """Restrict a Project queryset to the rows matching a free-text query."""
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+    backend = _backend(connections[queryset.db])
+    if backend == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        subquery = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        return queryset.filter(pk__in=subquery)
+    if backend == 'postgresql':
+        match = ' & '.join(f'{token}:*' for token in tokens)
+        subquery = RawSQL(
+            f"SELECT project_id FROM {FTS_TABLE} WHERE document @@ to_tsquery('simple', %s)",
+            [match],
+        )
+        return queryset.filter(pk__in=subquery)
+
+    query = query.strip()
+    return queryset.filter(
+        Q(code__icontains=query) |
+        Q(program__icontains=query) |
+        Q(location__icontains=query) |
+        Q(district__icontains=query)
+    )
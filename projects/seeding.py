@@ -0,0 +1,262 @@
+"""
+Synthetic portfolio data for benchmarks and load tests.
+
+Each project's values are drawn from a ``random.Random`` seeded with the
+given seed and the project number, so the same arguments always produce the
+same rows. Rows are written with
+``bulk_create`` in batches, and the data an import derives from new projects
+(year table, search index) is filled in the same way.
+"""
+import datetime
+import random
+from decimal import Decimal
+
+from django.db import transaction
+
+from . import search
+from .dashboard import invalidate_dashboard
+from .importing import IMPORT_FIELDS
+from .maintenance import sync_project_years
+from .metrics import compute_execution_metrics, compute_tracking_metrics
+from .models import ExecutionRate, Project, ProjectTracking, ProjectYear
+from .page_cache import clear_project_pages
+from .resources import IMPORT_COLUMN_NAMES
+from .xlsx import StreamingXlsxWriter
+
+SEED_BATCH_SIZE = 1000
+
+PROGRAMS = (
+    'برنامج التأهيل الحضري', 'برنامج التنمية المحلية', 'برنامج تأهيل الأحياء الناقصة التجهيز',
+    'برنامج المرافق العمومية', 'برنامج الطرق والتنقل', 'برنامج المساحات الخضراء',
+)
+DISTRICTS = ('بطانة', 'المريسة', 'تابريكت', 'احصين', 'العيايدة')
+LOCATIONS = (
+    'حي السلام', 'حي الرحمة', 'حي الانبعاث', 'سيدي موسى', 'قرية أولاد موسى',
+    'حي كريمة', 'سعيد حجي', 'حي الواد', 'باب لمريسة', 'حي النهضة',
+)
+WORKS = (
+    'تهيئة', 'توسيع', 'إعادة تأهيل', 'بناء', 'تجهيز', 'تقوية',
+)
+SUBJECTS = (
+    'الطريق الرئيسية', 'الملعب الرياضي للقرب', 'المركز الصحي', 'دار الشباب',
+    'شبكة التطهير السائل', 'الإنارة العمومية', 'السوق النموذجي', 'الحديقة العمومية',
+    'المدرسة الجماعاتية', 'المركب الثقافي',
+)
+GOALS = (
+    'تحسين البنية التحتية', 'تقليص الفوارق المجالية', 'تحسين جودة الحياة',
+    'تعزيز التنقل الحضري', 'دعم الأنشطة الاقتصادية',
+)
+TARGET_GROUPS = ('ساكنة الحي', 'الشباب', 'النساء والأطفال', 'التجار', 'ساكنة المقاطعة')
+PROPERTY_STATUSES = ('ملك جماعي', 'ملك الدولة الخاص', 'ملك الخواص', 'في طور التسوية')
+PARTNERS = (
+    'وزارة الداخلية', 'مجلس جهة الرباط سلا القنيطرة', 'المبادرة الوطنية للتنمية البشرية',
+    'وزارة التجهيز والماء', 'الوكالة الحضرية',
+)
+FUNDING_SOURCES = ('الميزانية الجماعية', 'صندوق التجهيز الجماعي', 'ميزانية الجهة', 'اتفاقية شراكة')
+
+FIRST_YEAR = 2020
+LAST_YEAR = 2030
+
+# Problems import_rows can put in a row
+DIRTY_KINDS = ('blank', 'duplicate', 'digits', 'years')
+BLANKABLE_FIELDS = (
+    'program', 'projects', 'location', 'district', 'area', 'estimated_cost', 'start_year',
+    'estimated_duration',
+)
+NUMERIC_IMPORT_FIELDS = ('area', 'property_prep_cost', 'estimated_cost', 'start_year', 'estimated_duration')
+EASTERN_ARABIC_DIGITS = str.maketrans('0123456789', '٠١٢٣٤٥٦٧٨٩')
+
+
+def _amount(rng, low, high):
+    return Decimal(rng.randrange(low * 100, high * 100)) / 100
+
+
+def project_values(rng, number, code_prefix='SEED'):
+    """Return the field values of synthetic project ``number``."""
+    work, subject = rng.choice(WORKS), rng.choice(SUBJECTS)
+    location = rng.choice(LOCATIONS)
+    start_year = rng.randint(FIRST_YEAR, LAST_YEAR - 2)
+    span = rng.randint(1, 3)
+    years = list(range(start_year, start_year + span))
+    property_prep_cost = _amount(rng, 0, 500_000) if rng.random() < 0.6 else Decimal('0')
+    return {
+        'code': f'{code_prefix}-{number:07d}',
+        'program': rng.choice(PROGRAMS),
+        'projects': f'{work} {subject} - {location}',
+        'location': location,
+        'district': rng.choice(DISTRICTS),
+        'planning_code': f'PA-{rng.randint(1, 999):03d}' if rng.random() < 0.7 else None,
+        'development_goals': rng.choice(GOALS),
+        'components': f'{work} و{rng.choice(WORKS)} {subject}',
+        'target_group': rng.choice(TARGET_GROUPS),
+        'project_goals': rng.choice(GOALS),
+        'property_status': rng.choice(PROPERTY_STATUSES),
+        'property_drawing': f'R-{rng.randint(1000, 99999)}' if rng.random() < 0.5 else None,
+        'area': _amount(rng, 100, 50_000),
+        'property_prep_cost': property_prep_cost,
+        'studies': str(_amount(rng, 10_000, 400_000)) if rng.random() < 0.5 else None,
+        'achievements': str(_amount(rng, 100_000, 20_000_000)) if rng.random() < 0.7 else None,
+        'estimated_cost': _amount(rng, 200_000, 30_000_000),
+        'start_year': start_year,
+        'estimated_duration': rng.choice((6, 9, 12, 18, 24, 36)),
+        'implementation_years': years,
+        'budget_years': years[:rng.randint(1, len(years))],
+        'indicator_1': 'نسبة الإنجاز',
+        'indicator_2': 'عدد المستفيدين' if rng.random() < 0.5 else None,
+        'indicator_3': None,
+        'potential_partners': '، '.join(rng.sample(PARTNERS, rng.randint(1, 3))),
+        'funding_sources': rng.choice(FUNDING_SOURCES),
+    }
+
+
+def execution_rate_values(rng, project):
+    """Return the field values of a synthetic execution snapshot of ``project``."""
+    programming_date = datetime.date(project.start_year, rng.randint(1, 12), rng.randint(1, 28))
+    launch = programming_date + datetime.timedelta(days=rng.randint(30, 240))
+    start = launch + datetime.timedelta(days=rng.randint(15, 120))
+    expected_end = start + datetime.timedelta(days=project.estimated_duration * 30)
+    estimated = project.estimated_cost
+    values = {
+        'programmed_amount': estimated,
+        'partner_contribution': (estimated * Decimal(rng.randint(0, 40)) / 100).quantize(Decimal('0.01')),
+        'programming_date': programming_date,
+        'market_launch_date': launch,
+        'estimated_costs': estimated,
+        'actual_costs': (estimated * Decimal(rng.randint(60, 140)) / 100).quantize(Decimal('0.01')),
+        'expected_end_date': expected_end,
+        'actual_start_date': start,
+        'actual_end_date': None,
+        'work_progress_percentage': Decimal(rng.randint(0, 100)),
+        'financial_achievement_percentage': Decimal(rng.randint(0, 100)),
+    }
+    if values['work_progress_percentage'] == 100:
+        values['actual_end_date'] = expected_end + datetime.timedelta(days=rng.randint(-60, 365))
+    return values
+
+
+def tracking_values(rng, project):
+    """Return the field values of a synthetic tracking of ``project``."""
+    launch = datetime.date(project.start_year, rng.randint(1, 12), rng.randint(1, 28))
+    start = launch + datetime.timedelta(days=rng.randint(15, 120))
+    planned_end = start + datetime.timedelta(days=project.estimated_duration * 30)
+    finished = rng.random() < 0.4
+    return {
+        'market_launch_date': launch,
+        'actual_costs': (project.estimated_cost * Decimal(rng.randint(70, 130)) / 100).quantize(Decimal('0.01')),
+        'planned_end_date': planned_end,
+        'actual_start_date': start,
+        'actual_end_date': planned_end + datetime.timedelta(days=rng.randint(-60, 400)) if finished else None,
+    }
+
+
+def seed_portfolio(count, rates_per_project=0, tracking_share=0, seed=0, start=1, code_prefix='SEED',
+                   batch_size=SEED_BATCH_SIZE, on_batch=None):
+    """
+    Insert ``count`` synthetic projects numbered from ``start``, each with
+    ``rates_per_project`` execution snapshots, and a tracking for a
+    ``tracking_share`` (0 to 1) of them.
+
+    Every project draws its values from its own generator, seeded with
+    ``seed`` and its number, so a project's data does not depend on the batch
+    size or on ``start``. ``on_batch(projects, rates, trackings)`` is called
+    with the running totals after each batch. Returns the same totals.
+    """
+    created_projects = created_rates = created_trackings = 0
+    for offset in range(0, count, batch_size):
+        projects, rates, trackings = [], [], []
+        for number in range(start + offset, start + min(offset + batch_size, count)):
+            rng = random.Random(f'{seed}:{code_prefix}:{number}')
+            project = Project(**project_values(rng, number, code_prefix))
+            projects.append(project)
+            # Foreign keys to the unsaved project are resolved by bulk_create
+            rates.extend(
+                ExecutionRate(project=project, **execution_rate_values(rng, project))
+                for _ in range(rates_per_project)
+            )
+            if rng.random() < tracking_share:
+                tracking = ProjectTracking(project=project, **tracking_values(rng, project))
+                tracking.apply_project_status()
+                trackings.append(tracking)
+            project.total_estimated_cost = project.compute_total_estimated_cost()
+        compute_execution_metrics(rates)
+        compute_tracking_metrics(trackings)
+
+        with transaction.atomic():
+            Project.objects.bulk_create(projects)
+            search.index_projects(projects)
+            sync_project_years(ProjectYear, projects)
+            ExecutionRate.objects.bulk_create(rates, batch_size=batch_size)
+            ProjectTracking.objects.bulk_create(trackings, batch_size=batch_size)
+        created_projects += len(projects)
+        created_rates += len(rates)
+        created_trackings += len(trackings)
+        if on_batch:
+            on_batch(created_projects, created_rates, created_trackings)
+
+    # bulk_create sends no post_save signal
+    invalidate_dashboard()
+    clear_project_pages()
+    return created_projects, created_rates, created_trackings
+
+
+def _dirty(rng, row, kind, number, start, code_prefix):
+    if kind == 'blank':
+        row[rng.choice(BLANKABLE_FIELDS)] = None
+    elif kind == 'duplicate':
+        if number > start:
+            row['code'] = f'{code_prefix}-{number - rng.randint(1, min(number - start, 100)):07d}'
+    elif kind == 'digits':
+        for field in NUMERIC_IMPORT_FIELDS + ('implementation_years', 'budget_years'):
+            if row[field] is not None:
+                row[field] = str(row[field]).translate(EASTERN_ARABIC_DIGITS)
+    elif kind == 'years':
+        field = rng.choice(('implementation_years', 'budget_years'))
+        years = row[field].split(',')
+        row[field] = rng.choice((
+            '؛'.join(years),
+            ' - '.join(years),
+            '[' + ', '.join(years),
+            'سنة ' + years[0],
+            ''.join(years) + '0',
+            ','.join(year[2:] for year in years),
+        ))
+
+
+def import_rows(count, seed=0, start=1, code_prefix='IMPORT', dirty_share=0, dirty_kinds=DIRTY_KINDS):
+    """
+    Yield synthetic project rows as an import workbook holds them: numbers as
+    numbers, year lists as comma separated text, empty cells as None.
+
+    A ``dirty_share`` (0 to 1) of the rows get one problem of a kind drawn from
+    ``dirty_kinds``: a blank required value, the code of an earlier row,
+    Eastern Arabic digits in the numbers or a malformed year list.
+    """
+    for number in range(start, start + count):
+        rng = random.Random(f'{seed}:{code_prefix}:{number}')
+        row = project_values(rng, number, code_prefix)
+        for field in ('implementation_years', 'budget_years'):
+            row[field] = ','.join(str(year) for year in row[field])
+        for field in ('studies', 'achievements'):
+            if row[field] is not None:
+                row[field] = Decimal(row[field])
+        if dirty_kinds and rng.random() < dirty_share:
+            _dirty(rng, row, rng.choice(dirty_kinds), number, start, code_prefix)
+        yield row
+
+
+def import_headers(arabic=False):
+    """Column headers of an import workbook, Arabic where the importer maps them."""
+    names = {field: column for column, field in IMPORT_COLUMN_NAMES.items()} if arabic else {}
+    return [names.get(field, field) for field in IMPORT_FIELDS]
+
+
+def iter_import_workbook(rows, arabic_headers=False):
+    """
+    Yield, piece by piece, the .xlsx bytes of an import workbook holding the
+    rows of ``import_rows``. Memory use does not depend on the number of rows.
+    """
+    writer = StreamingXlsxWriter(
+        'projects', [(header, 20, None) for header in import_headers(arabic_headers)],
+        right_to_left=arabic_headers, freeze_header=False,
+    )
+    return writer.iter_bytes([row[field] for field in IMPORT_FIELDS] for row in rows)
@@ -0,0 +1,56 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import search
+from .dashboard import invalidate_dashboard
+from .maintenance import sync_project_years
+from .models import PROJECT_YEAR_SOURCES, ExecutionRate, Project, ProjectTracking, ProjectYear
+from .page_cache import invalidate_project_pages
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    """Keep the search index in sync when a project is saved."""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(search.SEARCH_FIELDS):
+        return
+    search.index_projects([instance], using=using)
+
+
+@receiver(post_save, sender=Project)
+def sync_years(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    """Rebuild the project's year rows from its implementation/budget year lists."""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(PROJECT_YEAR_SOURCES.values()):
+        return
+    sync_project_years(ProjectYear, [instance], using=using)
+
+
+@receiver(post_delete, sender=Project)
+def unindex_project(sender, instance, using=None, **kwargs):
+    """Drop a deleted project from the search index."""
+    search.remove_projects([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=ExecutionRate)
+@receiver(post_delete, sender=ExecutionRate)
+def refresh_dashboard(sender, raw=False, **kwargs):
+    """Drop the cached home page figures when the portfolio changes."""
+    if not raw:
+        invalidate_dashboard()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=ExecutionRate)
+@receiver(post_delete, sender=ExecutionRate)
+@receiver(post_save, sender=ProjectTracking)
+@receiver(post_delete, sender=ProjectTracking)
+def refresh_project_pages(sender, instance, raw=False, **kwargs):
+    """Drop the cached detail page and list row of the project that changed."""
+    if not raw:
+        invalidate_project_pages(instance.pk if sender is Project else instance.project_id)
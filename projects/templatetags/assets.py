@@ -0,0 +1,23 @@
+from django import template
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from projects.assets import image_variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(name, **attrs):
+    """
+    Render the static image ``name`` as a <picture> offering its AVIF/WebP
+    copies when they were collected, with the original as the fallback.
+    Keyword arguments become attributes of the <img>.
+    """
+    sources = format_html_join(
+        '', '<source srcset="{}" type="{}">', image_variants(name)
+    )
+    return format_html(
+        '<picture>{}<img src="{}"{}></picture>', sources, static(name), flatatt(attrs)
+    )
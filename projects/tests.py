@@ -1,3 +1,761 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import random
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import xlrd
+from django.core.cache import cache
+from django.http import Http404
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+
+from . import export_cache, exports, progress, views
+from .assets import serve_static
+from .dashboard import compute_dashboard
+from .grid import save_grid
+from .xlsx import StreamingXlsxWriter, StyledCell, XlsxStyle, iter_xlsx_rows
+from .importing import IMPORT_FIELDS, ProjectImporter, iter_workbook_rows, normalize_cell
+from .maintenance import backfill_total_estimated_cost, recompute_execution_metrics
+from .metrics import (
+    DERIVED_FIELDS, TRACKING_DERIVED_FIELDS, compute_execution_metrics, compute_tracking_metrics,
+)
+from .models import ExecutionRate, Project, ProjectTracking, compute_total_estimated_cost, parse_amount
+from .pagination import cursor_querystring, keyset_paginate
+from .tracking import save_tracking_rows
+from .validation import validate_workbook
+
+
+def make_project(code='P-1', **fields):
+    values = {
+        'code': code, 'program': 'برنامج', 'projects': 'مشروع', 'location': 'المكان',
+        'district': 'المقاطعة', 'components': 'مكونات', 'target_group': 'الساكنة',
+        'property_status': 'ملك جماعي', 'area': Decimal('100'), 'property_prep_cost': Decimal('0'),
+        'estimated_cost': Decimal('1000000'),
+        'start_year': 2024, 'estimated_duration': 12,
+        'implementation_years': [2024, 2025], 'budget_years': [2024],
+    }
+    values.update(fields)
+    return Project.objects.create(**values)
+
+
+def import_row(code, **fields):
+    """Cells of one import workbook row, by field name."""
+    row = {
+        'code': code, 'program': 'برنامج', 'projects': 'مشروع', 'location': 'المكان',
+        'district': 'المقاطعة', 'components': 'مكونات', 'target_group': 'الساكنة',
+        'property_status': 'ملك جماعي', 'area': 100, 'property_prep_cost': 0, 'estimated_cost': 1000000,
+        'start_year': 2024, 'estimated_duration': 12,
+        'implementation_years': '2024,2025', 'budget_years': '2024',
+    }
+    row.update(fields)
+    return row
+
+
+def import_workbook(rows, fields=IMPORT_FIELDS):
+    """An in-memory .xlsx import file; a None row is left empty."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(fields))
+    for index, row in enumerate(rows, 2):
+        if row is not None:
+            for column, field in enumerate(fields, 1):
+                sheet.cell(index, column, row.get(field))
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+def run_import(rows):
+    return ProjectImporter().run(iter_workbook_rows(import_workbook(rows), 'projects.xlsx'))
+
+
+class AmountTests(SimpleTestCase):
+
+    def test_parse_amount(self):
+        values = [None, '', '  12.346 ', '7', 7, Decimal('5'), '-3.5', 'abc', 'تم الإنجاز', 'NaN', 'Infinity', '1E20']
+        self.assertEqual([parse_amount(value) for value in values], [
+            None, None, Decimal('12.35'), Decimal('7.00'), Decimal('7.00'), Decimal('5.00'), Decimal('-3.50'),
+            None, None, None, None, None,
+        ])
+
+    def test_arabic_digits_and_separators(self):
+        values = ['١٬٠٠٠', '١٢٫٥', '1,000', '1 000', '12.5 م²', True]
+        self.assertEqual([parse_amount(normalize_cell(value)) for value in values], [
+            Decimal('1000.00'), Decimal('12.50'), Decimal('1000.00'), Decimal('1000.00'), None, None,
+        ])
+
+    def test_total_estimated_cost_skips_text(self):
+        self.assertEqual(compute_total_estimated_cost(Decimal('100'), '50.5', 'تم الانتهاء'), Decimal('150.50'))
+        self.assertEqual(compute_total_estimated_cost(None, None, None), Decimal('0.00'))
+
+
+class ProjectImportTests(TestCase):
+
+    def test_round_numbers_and_years(self):
+        result = run_import([import_row('P-1', start_year=2020, estimated_duration=10, area=1E3)])
+        self.assertEqual(result.errors, [])
+        project = Project.objects.get(code='P-1')
+        self.assertEqual((project.start_year, project.estimated_duration, project.area), (2020, 10, Decimal('1000')))
+        self.assertEqual(project.implementation_years, ['2024', '2025'])
+
+    def test_error_rows_numbered_as_in_the_spreadsheet(self):
+        # Row 3 is empty and skipped; the bad row is row 4
+        result = run_import([import_row('P-1'), None, import_row('P-2', implementation_years=None)])
+        self.assertEqual(result.total_rows, 2)
+        self.assertEqual(result.created, 1)
+        self.assertEqual([row_number for row_number, _ in result.errors], [4])
+
+    def test_existing_and_repeated_codes_are_skipped(self):
+        make_project('P-1')
+        result = run_import([import_row('P-1'), import_row('P-2'), import_row('P-2')])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.skipped_codes, ['P-1', 'P-2'])
+        self.assertEqual(Project.objects.count(), 2)
+
+
+class ValidateWorkbookTests(TestCase):
+
+    def test_clean_file(self):
+        report = validate_workbook(import_workbook([import_row('P-1'), None, import_row('P-2')]), 'projects.xlsx')
+        self.assertTrue(report.is_valid)
+        self.assertEqual(report.total_rows, 2)
+
+    def test_blank_values_the_import_rejects_are_reported(self):
+        rows = [import_row('P-1', budget_years=None), import_row('P-2', implementation_years=None)]
+        report = validate_workbook(import_workbook(rows), 'projects.xlsx')
+        self.assertEqual(report.first_issues(), [
+            (2, 'budget_years', 'قيمة مطلوبة'), (3, 'implementation_years', 'قيمة مطلوبة'),
+        ])
+        self.assertEqual([row_number for row_number, _ in run_import(rows).errors], [2, 3])
+
+    def test_numbers_are_read_as_the_import_reads_them(self):
+        values = ['١٬٠٠٠', '١٢٫٥', '1,000', '12.5', '1e3', '12.345', 'abc']
+        rows = [import_row(f'P-{index}', estimated_cost=value) for index, value in enumerate(values)]
+        report = validate_workbook(import_workbook(rows), 'projects.xlsx')
+        self.assertEqual(report.first_issues(), [
+            (7, 'estimated_cost', 'أكثر من 2 أرقام بعد الفاصلة'), (8, 'estimated_cost', 'قيمة غير رقمية'),
+        ])
+
+        result = run_import(rows)
+        self.assertEqual([row_number for row_number, _ in result.errors], [7])
+        costs = dict(Project.objects.values_list('code', 'estimated_cost'))
+        self.assertEqual([costs.get(f'P-{index}') for index in range(len(values))], [
+            Decimal('1000'), Decimal('12.5'), Decimal('1000'), Decimal('12.5'), Decimal('1000'), None,
+            # Not a number: replaced by the import's default, hence reported
+            Decimal('0'),
+        ])
+
+    def test_blank_fields_the_import_fills_in_are_accepted(self):
+        rows = [import_row('P-1', program=None, district=None, area=None, start_year=None)]
+        report = validate_workbook(import_workbook(rows), 'projects.xlsx')
+        self.assertTrue(report.is_valid)
+        self.assertEqual(run_import(rows).created, 1)
+
+    def test_missing_year_columns_are_reported(self):
+        fields = [field for field in IMPORT_FIELDS if field not in ('implementation_years', 'budget_years')]
+        report = validate_workbook(import_workbook([import_row('P-1')], fields), 'projects.xlsx')
+        self.assertEqual(report.first_issues(), [
+            (None, 'implementation_years', 'عمود مطلوب غير موجود'), (None, 'budget_years', 'عمود مطلوب غير موجود'),
+        ])
+        result = ProjectImporter().run(iter_workbook_rows(import_workbook([import_row('P-1')], fields), 'projects.xlsx'))
+        self.assertEqual(result.created, 0)
+
+    def test_duplicate_codes_share_one_summary_line(self):
+        make_project('P-9')
+        rows = [import_row('P-1'), import_row('P-1'), import_row('P-2'), import_row('P-2'), import_row('P-9')]
+        report = validate_workbook(import_workbook(rows), 'projects.xlsx')
+        self.assertEqual(report.summary(), [
+            ('code', 'رمز مكرر في الملف', 2), ('code', 'الرمز موجود مسبقاً وسيتم تجاهل السطر', 1),
+        ])
+        self.assertEqual(report.first_issues()[0], (3, 'code', 'رمز مكرر في الملف (السطر 2)'))
+
+        sheet = load_workbook(io.BytesIO(b''.join(report.iter_xlsx()))).active
+        rows = list(sheet.iter_rows(min_row=2, values_only=True))
+        self.assertEqual([(row[0], row[-1]) for row in rows], [
+            (3, 'code: رمز مكرر في الملف (السطر 2)'),
+            (5, 'code: رمز مكرر في الملف (السطر 4)'),
+            (6, 'code: الرمز موجود مسبقاً وسيتم تجاهل السطر'),
+        ])
+        # The faulty cell is highlighted
+        self.assertEqual(sheet.cell(2, 2).fill.fgColor.rgb[-6:], 'F8D7DA')
+
+
+
+class ImportValidationViewTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def validate(self, rows, **headers):
+        upload = import_workbook(rows)
+        upload.name = 'projects.xlsx'
+        return self.client.post(reverse('projects:project_import'), {'file': upload, 'validate': '1'}, **headers)
+
+    def test_clean_file(self):
+        response = self.validate([import_row('P-1')])
+        self.assertTemplateUsed(response, 'projects/import_validation.html')
+        self.assertIsNone(response.context['report_url'])
+        self.assertFalse(Project.objects.exists())
+
+    def test_json_and_report_download(self):
+        response = self.validate([import_row('P-1'), import_row('P-2', area='abc')], HTTP_ACCEPT='application/json')
+        data = response.json()
+        self.assertEqual((data['valid'], data['total_rows'], data['rows_with_issues']), (False, 2, 1))
+        self.assertEqual(data['issues'], [{'row': 3, 'column': 'area', 'message': 'قيمة غير رقمية'}])
+
+        report = self.client.get(data['report_url'])
+        sheet = load_workbook(io.BytesIO(response_bytes(report))).active
+        self.assertEqual([row[0] for row in sheet.iter_rows(min_row=2, values_only=True)], [3])
+
+    def test_unknown_report(self):
+        for token in ('0' * 32, 'not-a-token'):
+            with self.assertRaises(Http404):
+                views.import_report(RequestFactory().get('/'), token)
+
+class ExecutionMetricsTests(TestCase):
+    """compute_execution_metrics must store what ExecutionRate.save() stores."""
+
+    def test_matches_save(self):
+        project = make_project()
+        rng = random.Random(0)
+        # (planned days, delay days): delays of exactly half a cent, e.g. -125.625%
+        cases = [(160, -201), (160, -199), (160, 181), (800, 3)]
+        cases += [(rng.randrange(1, 900), rng.randrange(-300, 300)) for _ in range(300)]
+        start = date(2024, 1, 1)
+        for planned_days, delay_days in cases:
+            expected_end = start + timedelta(days=planned_days)
+            ExecutionRate(
+                project=project,
+                estimated_costs=Decimal(rng.randrange(1, 10 ** 9)) / 100,
+                actual_costs=Decimal(rng.randrange(0, 10 ** 9)) / 100,
+                actual_start_date=start,
+                expected_end_date=expected_end,
+                actual_end_date=expected_end + timedelta(days=delay_days),
+            ).save()
+
+        rates = list(ExecutionRate.objects.order_by('pk'))
+        expected = [[getattr(rate, field) for field in DERIVED_FIELDS] for rate in rates]
+        for rate in rates:
+            for field in DERIVED_FIELDS:
+                setattr(rate, field, None)
+        compute_execution_metrics(rates)
+        self.assertEqual([[getattr(rate, field) for field in DERIVED_FIELDS] for rate in rates], expected)
+
+    def test_missing_inputs_keep_values(self):
+        rate = ExecutionRate(estimated_costs=Decimal('0'), actual_costs=Decimal('10'),
+                             cost_difference_percentage=Decimal('5.00'))
+        compute_execution_metrics([rate])
+        self.assertEqual(rate.cost_difference_percentage, Decimal('5.00'))
+        self.assertIsNone(rate.delay_percentage)
+
+
+class TrackingMetricsTests(TestCase):
+    """compute_tracking_metrics must store what ProjectTracking.save() stores."""
+
+    def test_matches_save(self):
+        rng = random.Random(0)
+        # (planned days, delay days): delays of exactly half a cent, e.g. -125.625%
+        cases = [(160, -201), (160, -199), (160, 181), (800, 3), (10, -10)]
+        cases += [(rng.randrange(1, 900), rng.randrange(-300, 300)) for _ in range(100)]
+        start = date(2024, 1, 1)
+        for index, (planned_days, delay_days) in enumerate(cases):
+            project = make_project(f'P-{index}', estimated_cost=Decimal(rng.randrange(0, 10 ** 9)) / 100)
+            planned_end = start + timedelta(days=planned_days)
+            ProjectTracking(
+                project=project,
+                actual_costs=Decimal(rng.randrange(0, 10 ** 9)) / 100,
+                actual_start_date=start,
+                planned_end_date=planned_end,
+                actual_end_date=planned_end + timedelta(days=delay_days),
+            ).save()
+
+        trackings = list(ProjectTracking.objects.select_related('project').order_by('pk'))
+        expected = [[getattr(tracking, field) for field in TRACKING_DERIVED_FIELDS] for tracking in trackings]
+        for tracking in trackings:
+            for field in TRACKING_DERIVED_FIELDS:
+                setattr(tracking, field, None)
+        compute_tracking_metrics(trackings)
+        self.assertEqual(
+            [[getattr(tracking, field) for field in TRACKING_DERIVED_FIELDS] for tracking in trackings], expected
+        )
+
+
+class DashboardTests(TestCase):
+
+    def add_rate(self, project, progress, actual_end):
+        ExecutionRate(
+            project=project, work_progress_percentage=Decimal(progress), actual_start_date=date(2024, 1, 1),
+            expected_end_date=date(2024, 3, 1), actual_end_date=actual_end,
+        ).save()
+
+    def test_execution_figures_use_the_latest_snapshots(self):
+        caught_up, late = make_project('P-1'), make_project('P-2')
+        # Late in an old snapshot, on time in the latest one
+        self.add_rate(caught_up, 20, date(2024, 4, 1))
+        self.add_rate(caught_up, 80, date(2024, 2, 15))
+        self.add_rate(late, 40, date(2024, 4, 1))
+
+        execution = compute_dashboard()['execution']
+        self.assertEqual((execution['tracked_projects'], execution['delayed_projects']), (2, 1))
+        self.assertEqual(execution['avg_work_progress'], Decimal('60'))
+
+
+class ProgressTests(TestCase):
+
+    def setUp(self):
+        self.first, self.second = make_project('P-1'), make_project('P-2')
+        self.rates = [ExecutionRate.objects.create(project=project, work_progress_percentage=Decimal('10'))
+                      for project in (self.first, self.second)]
+
+    def test_last_modified_revalidation(self):
+        url = reverse('projects:project_progress', kwargs={'pk': self.first.pk})
+        first = self.client.get(url)
+        self.assertEqual(first.json()['points'][0][1], 10.0)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    @mock.patch.object(progress, 'MAX_PROJECTS', 1)
+    def test_set_fingerprint_covers_the_projects_served(self):
+        url = reverse('projects:projects_progress')
+        first = self.client.get(url)
+        self.assertEqual([project['code'] for project in first.json()['projects']], ['P-1'])
+        self.assertTrue(first.json()['truncated'])
+
+        # A snapshot of a project left out of the response
+        self.rates[1].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.rates[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+
+class BackfillTotalEstimatedCostTests(TestCase):
+
+    def test_fills_total_and_bumps_updated_at(self):
+        project = make_project(property_prep_cost=Decimal('100.50'), studies='200', achievements='نص')
+        stale = timezone.now() - timedelta(days=30)
+        Project.objects.filter(pk=project.pk).update(total_estimated_cost=None, updated_at=stale)
+        make_project('P-2')
+
+        self.assertEqual(backfill_total_estimated_cost(Project, chunk_size=1), (2, 1))
+        project.refresh_from_db()
+        self.assertEqual(project.total_estimated_cost, Decimal('300.50'))
+        self.assertGreater(project.updated_at, stale)
+
+
+def response_bytes(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+class ExportTestCase(TestCase):
+    """Keeps the generated exports in a temporary cache directory."""
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        patcher = mock.patch.object(export_cache, 'EXPORT_CACHE_DIR', cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class ProjectExportTests(ExportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for number in range(1, 4):
+            make_project(f'P-{number}', implementation_years=['2024', '2025'])
+
+    def test_xls_uses_the_export_spec_and_caps_rows(self):
+        with mock.patch.object(exports, 'XLS_MAX_ROWS', 2):
+            response = self.client.get(reverse('projects:export_projects'), {'format': 'xls'})
+        self.assertEqual(response.status_code, 200)
+        sheet = xlrd.open_workbook(file_contents=response_bytes(response)).sheet_by_index(0)
+        self.assertEqual(sheet.row_values(0), exports.PROJECT_EXPORT.headers)
+        self.assertEqual(sheet.nrows, 3)
+        years = exports.PROJECT_EXPORT.headers.index('سنوات التنفيذ')
+        self.assertEqual(sheet.cell_value(1, years), '2024, 2025')
+
+    def test_xlsx_and_csv_use_the_export_spec(self):
+        url = reverse('projects:export_projects')
+        workbook = load_workbook(io.BytesIO(response_bytes(self.client.get(url))))
+        self.assertEqual([cell.value for cell in workbook.active[1]], exports.PROJECT_EXPORT.headers)
+        self.assertEqual(workbook.active.max_row, 4)
+
+        lines = response_bytes(self.client.get(url, {'format': 'csv'})).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0].split(','), exports.PROJECT_EXPORT.headers)
+        self.assertEqual(len(lines), 4)
+
+    def test_raw_csv(self):
+        content = response_bytes(self.client.get(reverse('projects:export_projects'), {'format': 'raw_csv'}))
+        self.assertTrue(content.startswith(b'\xef\xbb\xbf'))
+        rows = list(csv.DictReader(io.StringIO(content.decode('utf-8-sig'))))
+        self.assertEqual(list(rows[0]), [exports.column_name(field) for field in exports.PROJECT_RAW_FIELDS])
+        project = Project.objects.get(code='P-1')
+        self.assertEqual(
+            (rows[0]['id'], rows[0]['code'], rows[0]['estimated_cost'], rows[0]['implementation_years']),
+            (str(project.pk), 'P-1', '1000000.00', '["2024", "2025"]'),
+        )
+        self.assertEqual(len(rows), 3)
+
+        response = self.client.get(reverse('projects:execution_rate_export'), {'format': 'raw_csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response_bytes(response).decode('utf-8-sig').splitlines()[0].split(','),
+                         [exports.column_name(field) for field in exports.EXECUTION_RATE_RAW_FIELDS])
+
+    def test_unknown_format_is_rejected(self):
+        for url in (reverse('projects:export_projects'), reverse('projects:execution_rate_export')):
+            self.assertEqual(self.client.get(url, {'format': 'bogus'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('projects:export_projects')).status_code, 200)
+
+
+class ExportCacheTests(ExportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = make_project()
+        self.url = reverse('projects:export_projects')
+
+    def test_etag_revalidation(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        response_bytes(first)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        # Served from the disk cache
+        second = self.client.get(self.url)
+        self.assertTrue(second.streaming)
+        self.assertEqual(response_bytes(second), response_bytes(self.client.get(self.url)))
+
+    def test_last_modified_revalidation(self):
+        first = self.client.get(self.url)
+        response_bytes(first)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate(self):
+        first = self.client.get(self.url)
+        response_bytes(first)
+        self.project.location = 'مكان جديد'
+        self.project.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        # Filters are part of the key
+        filtered = self.client.get(self.url, {'q': self.project.code})
+        self.assertNotEqual(filtered['ETag'], response['ETag'])
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.ids = [make_project(f'P-{index}').pk for index in range(5)][::-1]
+
+    def page_ids(self, **cursor):
+        page = keyset_paginate(Project.objects.all(), per_page=2, **cursor)
+        return [project.pk for project in page], page.next_cursor, page.previous_cursor
+
+    def test_pages(self):
+        ids = self.ids
+        self.assertEqual(self.page_ids(), (ids[:2], ids[1], None))
+        self.assertEqual(self.page_ids(after=ids[1]), (ids[2:4], ids[3], ids[2]))
+        self.assertEqual(self.page_ids(after=ids[3]), (ids[4:], None, ids[4]))
+        self.assertEqual(self.page_ids(before=ids[2]), (ids[:2], ids[1], None))
+        self.assertEqual(self.page_ids(before=ids[4]), (ids[2:4], ids[3], ids[2]))
+        # An invalid cursor shows the first page
+        self.assertEqual(self.page_ids(after='x'), (ids[:2], ids[1], None))
+
+    def test_cursor_querystring_keeps_the_filters(self):
+        params = {'q': 'سوق', 'year': '', 'after': '9'}
+        self.assertEqual(cursor_querystring(params, before=3), 'q=%D8%B3%D9%88%D9%82&before=3')
+        self.assertEqual(cursor_querystring(params, before=None), 'q=%D8%B3%D9%88%D9%82')
+
+    @mock.patch.object(views, 'PROJECTS_PER_PAGE', 2)
+    def test_project_list_links(self):
+        response = self.client.get(reverse('projects:project_list'), {'q': 'مشروع', 'after': self.ids[1]})
+        self.assertEqual([project.pk for project in response.context['projects']], self.ids[2:4])
+        self.assertEqual(response.context['next_query'], cursor_querystring({'q': 'مشروع'}, after=self.ids[3]))
+        self.assertEqual(response.context['previous_query'], cursor_querystring({'q': 'مشروع'}, before=self.ids[2]))
+
+
+class GridTests(TestCase):
+
+    def setUp(self):
+        self.project = make_project('P-1')
+
+    def test_creates_and_updates_with_metrics(self):
+        rate = ExecutionRate.objects.create(project=self.project, estimated_costs=Decimal('100'),
+                                            actual_costs=Decimal('100'), work_progress_percentage=Decimal('10'))
+        result = save_grid([
+            {'code': 'P-1', 'estimated_costs': '200', 'actual_costs': '150'},
+            {'project': str(self.project.pk), 'id': rate.pk, 'actual_costs': '80'},
+        ])
+        self.assertFalse(result.has_errors)
+        created = ExecutionRate.objects.get(pk=result.created[0].pk)
+        rate.refresh_from_db()
+        # Fields left out of an update keep their value
+        self.assertEqual((rate.actual_costs, rate.work_progress_percentage), (Decimal('80.00'), Decimal('10.00')))
+        for saved in (created, rate):
+            metrics = [getattr(saved, field) for field in DERIVED_FIELDS]
+            saved.save()
+            self.assertEqual(metrics, [getattr(saved, field) for field in DERIVED_FIELDS])
+
+    def test_nothing_is_saved_when_a_row_is_invalid(self):
+        other = make_project('P-2')
+        rate = ExecutionRate.objects.create(project=other)
+        result = save_grid([
+            {'code': 'P-1', 'actual_costs': '10'},
+            {'code': 'P-404'},
+            {'code': 'P-1', 'work_progress_percentage': '150'},
+            {'code': 'P-1', 'id': rate.pk},
+        ])
+        self.assertEqual([(index, list(fields)) for index, fields in result.errors],
+                         [(1, ['project']), (2, ['work_progress_percentage']), (3, ['id'])])
+        self.assertEqual(ExecutionRate.objects.count(), 1)
+
+
+class TrackingRowsTests(TestCase):
+
+    def test_saves_trackings_and_completed_projects(self):
+        make_project('P-1', estimated_cost=Decimal('1000'), studies='200')
+        result = save_tracking_rows([{
+            'code': 'P-1', 'actual_costs': '900', 'actual_start_date': '2024-01-01',
+            'planned_end_date': '2024-03-01', 'actual_end_date': '2024-04-01',
+        }])
+        self.assertFalse(result.has_errors)
+        tracking = ProjectTracking.objects.select_related('project').get()
+        self.assertEqual(tracking.cost_variance_percentage, Decimal('10.00'))
+        self.assertEqual(tracking.delay_variance_days, 31)
+        self.assertEqual(tracking.project.achievements, 'تم الانتهاء من المشروع في 2024-04-01')
+        self.assertEqual(tracking.project.total_estimated_cost, Decimal('200.00'))
+
+    def test_nothing_is_saved_when_a_row_is_invalid(self):
+        project = make_project('P-1')
+        make_project('P-2')
+        make_project('P-3')
+        result = save_tracking_rows([
+            {'code': 'P-2', 'actual_costs': '10'},
+            {'project': str(project.pk), 'actual_costs': '10'},
+            {'code': 'P-1'},
+            {'code': 'P-404'},
+            {'code': 'P-3', 'actual_start_date': '2024-02-01', 'actual_end_date': '2024-01-01'},
+        ])
+        self.assertEqual([(index, list(fields)) for index, fields in result.errors],
+                         [(2, ['project']), (3, ['project']), (4, ['actual_end_date'])])
+        self.assertFalse(ProjectTracking.objects.exists())
+
+
+class ExecutionRateListTests(TestCase):
+
+    def test_links_keep_the_filters(self):
+        project = make_project()
+        ExecutionRate.objects.bulk_create([ExecutionRate(project=project) for _ in range(25)])
+        response = self.client.get(reverse('projects:execution_rate_list'), {'code': 'P-1', 'latest': '1'})
+        self.assertContains(response, reverse('projects:execution_rate_export') + '?code=P-1&amp;latest=1')
+        response = self.client.get(reverse('projects:execution_rate_list'), {'code': 'P-1'})
+        self.assertContains(response, '?page=2&code=P-1"')
+
+
+class ProjectPageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.project = make_project()
+        self.rate = ExecutionRate.objects.create(
+            project=self.project, estimated_costs=Decimal('200'), actual_costs=Decimal('150'),
+        )
+        self.url = reverse('projects:project_detail', kwargs={'pk': self.project.pk})
+
+    def test_detail_page_is_cached_until_the_project_changes(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        self.project.save()
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_latest_snapshot_comes_from_the_project_query(self):
+        ExecutionRate.objects.create(project=self.project, work_progress_percentage=Decimal('42.5'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, '42.5%')
+        # Only the project query, through its latest snapshot subqueries
+        table = ExecutionRate._meta.db_table
+        self.assertEqual(len([query for query in queries if table in query['sql']]), 1)
+
+    def test_recomputed_latest_rate_refreshes_the_detail_page(self):
+        ExecutionRate.objects.filter(pk=self.rate.pk).update(cost_difference_percentage=Decimal('99.00'))
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+        # Bulk writes bump only the execution rate's updated_at
+        self.assertEqual(recompute_execution_metrics(ExecutionRate).changed, 1)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+
+class StreamingXlsxWriterTests(TestCase):
+
+    def read_back(self, rows):
+        # Dates only read back as dates with a date number format
+        columns = [('a', 10, exports.DATE_STYLE), ('b', 10, None), ('c', 10, exports.DATE_STYLE)]
+        writer = StreamingXlsxWriter('sheet', columns)
+        workbook = load_workbook(io.BytesIO(b''.join(writer.iter_bytes(rows))))
+        return [list(row) for row in workbook.active.iter_rows(min_row=2, values_only=True)]
+
+    def test_values(self):
+        rows = self.read_back([['نص', Decimal('1234.5'), date(2024, 2, 29)], [None, 7, 'a<b & "c"\x01']])
+        self.assertEqual(rows, [['نص', 1234.5, datetime(2024, 2, 29)], [None, 7, 'a<b & "c"']])
+
+    @override_settings(TIME_ZONE='Asia/Tokyo')
+    def test_aware_datetimes_are_written_in_local_time(self):
+        moment = datetime(2024, 5, 1, 20, 30, tzinfo=dt_timezone.utc)
+        rows = self.read_back([[moment, None, None]])
+        self.assertEqual(rows[0][0], datetime(2024, 5, 2, 5, 30))
+
+    def test_non_finite_numbers_are_written_empty(self):
+        rows = [[float('nan'), Decimal('-Infinity'), None], [Decimal('NaN'), float('inf'), None]]
+        writer = StreamingXlsxWriter('sheet', [('a', 10, exports.DATE_STYLE), ('b', 10, None), ('c', 10, None)])
+        content = b''.join(writer.iter_bytes(rows))
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            sheet_xml = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertNotIn('<v>', sheet_xml)
+        self.assertEqual(self.read_back(rows), [[None, None, None], [None, None, None]])
+
+    def test_text_is_escaped_and_inline(self):
+        texts = [' lead & trail ', '<tag attr="1">', ']]>', "'quote'", 'سطر\nجديد']
+        name = 'تقرير & "ملخص" <' + 'x' * 40
+        writer = StreamingXlsxWriter(name, [(str(index), 10, None) for index in range(len(texts))])
+        content = b''.join(writer.iter_bytes([texts]))
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertNotIn('xl/sharedStrings.xml', archive.namelist())
+            self.assertIn('t="inlineStr"', archive.read('xl/worksheets/sheet1.xml').decode())
+        sheet = load_workbook(io.BytesIO(content)).active
+        self.assertEqual(sheet.title, name[:31])
+        self.assertEqual(list(next(sheet.iter_rows(min_row=2, values_only=True))), texts)
+
+    def test_styles(self):
+        highlight = XlsxStyle(fill_color='F8D7DA', border='thin', border_color='DC3545')
+        writer = StreamingXlsxWriter(
+            'sheet',
+            [('a', 10, XlsxStyle(num_format='#,##0.00 "DH"', horizontal='center')), ('b', 10, None),
+             ('c', 10, XlsxStyle(num_format='0.00'))],
+            header_style=XlsxStyle(bold=True, font_color='FFFFFF', fill_color='808080'),
+            cell_styles=[highlight],
+        )
+        rows = [[1234.5, StyledCell('x', highlight), 2], [StyledCell(None, highlight), 'y', None]]
+        sheet = load_workbook(io.BytesIO(b''.join(writer.iter_bytes(rows)))).active
+        self.assertTrue(sheet['A1'].font.b)
+        self.assertEqual((sheet['A1'].fill.fgColor.rgb, sheet['A1'].font.color.rgb), ('FF808080', 'FFFFFFFF'))
+        self.assertEqual((sheet['A2'].number_format, sheet['A2'].alignment.horizontal), ('#,##0.00 "DH"', 'center'))
+        self.assertEqual(sheet['C2'].number_format, '0.00')
+        self.assertEqual((sheet['B2'].fill.fgColor.rgb, sheet['B2'].border.left.style), ('FFF8D7DA', 'thin'))
+        # A styled cell is written even when empty
+        self.assertEqual((sheet['A3'].value, sheet['A3'].fill.fgColor.rgb), (None, 'FFF8D7DA'))
+        self.assertIsNone(sheet['B3'].fill.patternType)
+
+
+class XlsxReaderTests(TestCase):
+
+    def test_matches_openpyxl(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        rows = {1: ['code', 'area', 'flag'], 2: ['P-1', 12, True], 4: [None, 1.5, False], 5: ['P-1', -3], 6: ['نص', 2020]}
+        for row_number, values in rows.items():
+            for column, value in enumerate(values, 1):
+                sheet.cell(row_number, column, value)
+        file = io.BytesIO()
+        workbook.save(file)
+
+        def trimmed(rows):
+            # With their types, as True == 1
+            rows = [[(value, type(value)) for value in row] for row in rows]
+            for row in rows:
+                while row and row[-1][0] is None:
+                    row.pop()
+            return rows
+
+        file.seek(0)
+        expected = trimmed(load_workbook(file, read_only=True).active.iter_rows(values_only=True))
+        file.seek(0)
+        self.assertEqual(trimmed(iter_xlsx_rows(file, read_size=64)), expected)
+        self.assertEqual(expected[2:4], [[], [(None, type(None)), (1.5, float), (False, bool)]])
+
+    def test_reads_inline_strings(self):
+        writer = StreamingXlsxWriter('sheet', [('a', 10, None), ('b', 10, None), ('c', 10, None)])
+        rows = [['نص', Decimal('1234.50'), True], [None, 7, ' a<b & c '], ['x', None, None]]
+        file = io.BytesIO(b''.join(writer.iter_bytes(rows)))
+        self.assertEqual(list(iter_xlsx_rows(file)), [
+            ['a', 'b', 'c'], ['نص', 1234.5, True], [None, 7, ' a<b & c '], ['x'],
+        ])
+
+    def test_shared_strings(self):
+        # Rich text runs are joined, phonetic runs left out and prefixed
+        # element names accepted; without xl/workbook.xml the first sheet is
+        # read from its usual place
+        main = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+        shared_strings = (
+            f'<sst xmlns="{main}"><si><t>code</t></si>'
+            '<si><r><t>gras</t></r><r><t xml:space="preserve"> et normal</t></r></si>'
+            '<si><t>漢字</t><rPh sb="0" eb="2"><t>かんじ</t></rPh></si><si><t/></si></sst>'
+        )
+        sheet = (
+            f'<x:worksheet xmlns:x="{main}"><x:sheetData>'
+            '<x:row r="1"><x:c r="A1" t="s"><x:v>0</x:v></x:c></x:row>'
+            '<x:row r="3"><x:c r="B3" t="s"><x:v>1</x:v></x:c><x:c r="C3" t="s"><x:v>2</x:v></x:c>'
+            '<x:c r="D3" t="s"><x:v>3</x:v></x:c><x:c r="E3" t="e"><x:v>#N/A</x:v></x:c>'
+            '<x:c r="F3" t="str"><x:v>formula</x:v></x:c></x:row>'
+            '</x:sheetData></x:worksheet>'
+        )
+        file = io.BytesIO()
+        with zipfile.ZipFile(file, 'w') as archive:
+            archive.writestr('xl/sharedStrings.xml', shared_strings)
+            archive.writestr('xl/worksheets/sheet1.xml', sheet)
+        file.seek(0)
+        self.assertEqual(list(iter_xlsx_rows(file)), [
+            ['code'], [], [None, 'gras et normal', '漢字', None, None, 'formula'],
+        ])
+
+
+class ServeStaticTests(TestCase):
+
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        path = os.path.join(static_root.name, 'app.css')
+        with open(path, 'w') as f:
+            f.write('body {}')
+        # A modification time with a fraction of a second
+        os.utime(path, (1700000000.5, 1700000000.5))
+        for suffix in ('.gz', '.br'):
+            with open(path + suffix, 'wb') as f:
+                f.write(b'compressed')
+        settings = override_settings(STATIC_ROOT=static_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_last_modified_revalidation(self):
+        first = serve_static(RequestFactory().get('/static/app.css'), 'app.css')
+        self.assertEqual(first.status_code, 200)
+        first.close()
+        request = RequestFactory().get('/static/app.css', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(serve_static(request, 'app.css').status_code, 304)
+
+    def test_accept_encoding_qualities(self):
+        cases = {
+            '': None, 'gzip, br': 'br', 'GZIP': 'gzip', 'gzip;q=0': None, 'identity, br;q=0': None,
+            'br;q=0, gzip': 'gzip', 'gzip;q=1, br;q=0.5': 'gzip', 'br; q=0.0': None, '*': 'br', '*, br;q=0': 'gzip',
+        }
+        for header, encoding in cases.items():
+            response = serve_static(RequestFactory().get('/static/app.css', HTTP_ACCEPT_ENCODING=header), 'app.css')
+            response.close()
+            self.assertEqual(response.get('Content-Encoding'), encoding, header)
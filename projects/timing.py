@@ -0,0 +1,88 @@
+"""
+Per-request timing.
+
+``ServerTimingMiddleware`` opens a ``RequestTiming`` for each request; the
+database wrapper and the ``TimedDjangoTemplates`` backend add to it. Time
+spent in queries run while a template renders counts as database time, not
+template time, so database, template and application time add up to the
+total.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+        self._template_db_time = 0.0
+
+    def metrics(self):
+        """Return the timings in milliseconds, with the query count."""
+        total = (time.perf_counter() - self.started) * 1000
+        db = self.db_time * 1000
+        template = self.template_time * 1000
+        return {
+            'total_ms': round(total, 2),
+            'db_ms': round(db, 2),
+            'queries': self.queries,
+            'template_ms': round(template, 2),
+            'app_ms': round(max(total - db - template, 0), 2),
+        }
+
+
+def current():
+    """The timing of the request being handled, or None outside a timed request."""
+    return _current.get()
+
+
+@contextmanager
+def timed_request():
+    timing = RequestTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook adding each query to the current timing."""
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        timing.queries += 1
+        timing.db_time += elapsed
+        if timing._template_depth:
+            timing._template_db_time += elapsed
+
+
+@contextmanager
+def template_rendering():
+    """Count the enclosed block as template time (outermost block only)."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    timing._template_depth += 1
+    if timing._template_depth == 1:
+        started = time.perf_counter()
+        db_before = timing._template_db_time
+    try:
+        yield
+    finally:
+        timing._template_depth -= 1
+        if timing._template_depth == 0:
+            elapsed = time.perf_counter() - started
+            timing.template_time += elapsed - (timing._template_db_time - db_before)
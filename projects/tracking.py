@@ -0,0 +1,110 @@
+"""
+Bulk update of project tracking.
+
+``ProjectTracking.save()`` reads its project for the cost variance and may
+save the project a second time for the completion note, so saving N rows
+one by one costs several queries per row. ``save_tracking_rows`` loads the
+projects together with their tracking in one query, validates every row,
+computes the metrics for all rows at once and writes trackings and projects
+with one bulk statement each, in a single transaction.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from .dashboard import invalidate_dashboard
+from .page_cache import clear_project_pages
+from .forms import ProjectTrackingForm
+from .grid import BULK_BATCH_SIZE, MAX_GRID_ROWS, GridResult
+from .metrics import TRACKING_DERIVED_FIELDS, compute_tracking_metrics
+from .models import Project, ProjectTracking, compute_total_estimated_cost
+
+TRACKING_FIELDS = tuple(ProjectTrackingForm.Meta.fields)
+
+
+def _load_projects(rows):
+    ids = {int(row['project']) for row in rows if str(row.get('project') or '').isdigit()}
+    codes = {str(row['code']).strip() for row in rows if row.get('code')}
+    projects = Project.objects.filter(Q(pk__in=ids) | Q(code__in=codes)).select_related('tracking')
+    by_id, by_code = {}, {}
+    for project in projects:
+        by_id[project.pk] = project
+        by_code[project.code] = project
+    return by_id, by_code
+
+
+def save_tracking_rows(rows):
+    """
+    Validate and save tracking rows.
+
+    Each row is a dict with ``project`` (id) or ``code`` and values for any of
+    ``TRACKING_FIELDS``. A project without tracking gets one; fields left out
+    keep their current value. Nothing is written unless every row is valid.
+    """
+    result = GridResult()
+    if len(rows) > MAX_GRID_ROWS:
+        result.errors.append((None, {'__all__': [f'الحد الأقصى {MAX_GRID_ROWS} سطر في كل إرسال']}))
+        return result
+
+    projects_by_id, projects_by_code = _load_projects(rows)
+
+    new_trackings, changed_trackings, seen = [], [], set()
+    for index, row in enumerate(rows):
+        project = None
+        if str(row.get('project') or '').isdigit():
+            project = projects_by_id.get(int(row['project']))
+        elif row.get('code'):
+            project = projects_by_code.get(str(row['code']).strip())
+        if project is None:
+            result.errors.append((index, {'project': ['المشروع غير موجود']}))
+            continue
+        if project.pk in seen:
+            result.errors.append((index, {'project': ['المشروع مكرر في هذا الإرسال']}))
+            continue
+        seen.add(project.pk)
+
+        tracking = getattr(project, 'tracking', None)
+        data = model_to_dict(tracking, fields=TRACKING_FIELDS) if tracking else {}
+        data.update({field: row[field] for field in TRACKING_FIELDS if field in row})
+        data = {field: '' if value is None else value for field, value in data.items()}
+
+        form = ProjectTrackingForm(data=data, instance=tracking or ProjectTracking(project=project))
+        if not form.is_valid():
+            result.errors.append((index, {field: list(messages) for field, messages in form.errors.items()}))
+            continue
+        (changed_trackings if tracking else new_trackings).append(form.instance)
+
+    if result.has_errors:
+        return result
+
+    trackings = new_trackings + changed_trackings
+    compute_tracking_metrics(trackings)
+    now = timezone.now()
+    changed_projects = []
+    for tracking in trackings:
+        if tracking.apply_project_status():
+            project = tracking.project
+            project.total_estimated_cost = compute_total_estimated_cost(
+                project.property_prep_cost, project.studies, project.achievements
+            )
+            # bulk_update does not apply auto_now
+            project.updated_at = now
+            changed_projects.append(project)
+
+    with transaction.atomic():
+        result.created = ProjectTracking.objects.bulk_create(new_trackings, batch_size=BULK_BATCH_SIZE)
+        if changed_trackings:
+            ProjectTracking.objects.bulk_update(
+                changed_trackings, TRACKING_FIELDS + TRACKING_DERIVED_FIELDS, batch_size=BULK_BATCH_SIZE
+            )
+        if changed_projects:
+            Project.objects.bulk_update(
+                changed_projects, ['achievements', 'total_estimated_cost', 'updated_at'],
+                batch_size=BULK_BATCH_SIZE
+            )
+        result.updated = changed_trackings
+        # Bulk writes send no post_save signal
+        transaction.on_commit(invalidate_dashboard)
+        transaction.on_commit(clear_project_pages)
+    return result
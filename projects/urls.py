@@ -18,14 +18,33 @@ urlpatterns = [
     path('projects/<int:pk>/', views.project_detail, name='project_detail'),
     path('projects/<int:pk>/edit/', views.project_edit, name='project_edit'),
     path('projects/<int:pk>/delete/', views.project_delete, name='project_delete'),
+    path('projects/<int:pk>/progress/', views.project_progress, name='project_progress'),
+    path('projects/progress/', views.projects_progress, name='projects_progress'),
     path('projects/export/', views.export_projects, name='export_projects'),
     path('projects/import/', views.import_projects, name='project_import'),
+    path('projects/import/reports/<str:token>/', views.import_report, name='import_report'),
+    path('projects/import/jobs/<int:pk>/', views.import_job_detail, name='import_job_detail'),
+    path('projects/import/jobs/<int:pk>/status/', views.import_job_status, name='import_job_status'),
+    path('projects/import/jobs/<int:pk>/cancel/', views.import_job_cancel, name='import_job_cancel'),
     
     # Execution Rate URLs
     path('execution-rates/', ExecutionRateListView.as_view(), name='execution_rate_list'),
     path('execution-rates/export/', views.export_execution_rates, name='execution_rate_export'),
     path('execution-rates/add/', ExecutionRateCreateView.as_view(), name='execution_rate_create'),
+    path('execution-rates/grid/', views.execution_rate_grid, name='execution_rate_grid'),
     path('execution-rates/<int:pk>/', ExecutionRateDetailView.as_view(), name='execution_rate_detail'),
     path('execution-rates/<int:pk>/edit/', ExecutionRateUpdateView.as_view(), name='execution_rate_edit'),
     path('execution-rates/<int:pk>/delete/', ExecutionRateDeleteView.as_view(), name='execution_rate_delete'),
+    
+    # Project Tracking URLs
+    path('tracking/', views.project_tracking_list, name='project_tracking_list'),
+    path('tracking/bulk/', views.project_tracking_bulk, name='project_tracking_bulk'),
+    path('projects/<int:pk>/tracking/', views.project_tracking_edit, name='project_tracking_edit'),
+    
+    # JSON API
+    path('api/', views.api_index, name='api_index'),
+    path('api/cache-stats/', views.api_cache_stats, name='api_cache_stats'),
+    path('api/projects/', views.api_list, {'resource': 'projects'}, name='api_projects'),
+    path('api/execution-rates/', views.api_list, {'resource': 'execution-rates'}, name='api_execution_rates'),
+    path('api/project-trackings/', views.api_list, {'resource': 'project-trackings'}, name='api_project_trackings'),
 ]
@@ -0,0 +1,293 @@
+"""
+Dry-run validation of import workbooks.
+
+The whole sheet is loaded into a pandas DataFrame and each check runs on
+entire columns at once: required values, numbers (digits, sign, size, decimal
+places), year lists, text lengths and duplicate codes, in the file and in the
+database. Numbers are read with ``parse_number``, as the importer reads them.
+Nothing is written. Each problem is one ``(row, field, message, detail)``
+issue; ``ValidationReport.iter_xlsx`` writes the rows that have problems with
+the faulty cells highlighted and the messages in a last column.
+"""
+import re
+import secrets
+
+import numpy as np
+import pandas as pd
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models
+from django.utils import timezone
+
+from .importing import IMPORT_FIELDS, YEAR_LIST_FIELDS, iter_sheet_rows
+from .models import Project, parse_number
+from .resources import IMPORT_COLUMN_NAMES, IMPORT_NUMBER_DEFAULTS, IMPORT_TEXT_PLACEHOLDERS
+from .xlsx import StreamingXlsxWriter, StyledCell, XlsxStyle, iter_xlsx_rows
+
+# The fields the model requires that the import cannot fill in: a missing
+# code is generated, blank text gets a placeholder ('غير محدد') and blank
+# numbers a default
+REQUIRED_FIELDS = tuple(
+    field for field in IMPORT_FIELDS
+    if not Project._meta.get_field(field).blank
+    and field != 'code' and field not in IMPORT_TEXT_PLACEHOLDERS and field not in IMPORT_NUMBER_DEFAULTS
+)
+DECIMAL_FIELDS = ('area', 'property_prep_cost', 'estimated_cost')
+INTEGER_FIELDS = ('start_year', 'estimated_duration')
+MIN_YEAR = 1900
+MAX_YEAR = 2100
+
+# Year lists may be typed with Eastern Arabic digits
+_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+_YEAR_LIST_RE = r'\[?\s*\d{4}(?:\s*,\s*\d{4})*\s*\]?'
+
+# Codes looked up in the database per query
+CODE_LOOKUP_BATCH = 500
+
+IMPORT_REPORT_DIR = 'import_reports'
+_TOKEN_RE = re.compile(r'[0-9a-f]{32}')
+# Reports older than this are deleted when a new one is saved
+IMPORT_REPORT_MAX_AGE = 24 * 60 * 60
+
+ERROR_STYLE = XlsxStyle(fill_color='F8D7DA', font_color='842029', border='thin', border_color='DC3545')
+HEADER_STYLE = XlsxStyle(bold=True, font_color='FFFFFF', fill_color='808080')
+MESSAGES_STYLE = XlsxStyle(font_color='842029', wrap=True)
+
+
+class ValidationReport:
+    """
+    Outcome of a dry run. ``issues`` is a DataFrame with ``row`` (spreadsheet
+    row number, None for problems with the whole file), ``field``, ``message``
+    and ``detail`` (what is specific to the row, or None) columns, sorted by
+    row. The summary counts issues by message only.
+    """
+
+    def __init__(self, headers, frame, issues):
+        self.headers = headers
+        self.frame = frame
+        self.issues = issues
+
+    @property
+    def total_rows(self):
+        return len(self.frame)
+
+    @property
+    def is_valid(self):
+        return self.issues.empty
+
+    @property
+    def rows_with_issues(self):
+        return self.issues['row'].dropna().nunique()
+
+    def summary(self):
+        """Return ``[(column, message, count)]``, most frequent first."""
+        counts = self.issues.groupby(['field', 'message'], sort=False).size().sort_values(ascending=False)
+        return [(self.column_name(field), message, count) for (field, message), count in counts.items()]
+
+    def first_issues(self, limit=50):
+        """Return up to ``limit`` issues as ``(row, column, message)`` tuples, details included."""
+        return [
+            (None if pd.isna(row) else int(row), self.column_name(field), _with_detail(message, detail))
+            for row, field, message, detail in self.issues.head(limit).itertuples(index=False)
+        ]
+
+    def column_name(self, field):
+        """The header the file uses for ``field``."""
+        return self.headers.get(field, field)
+
+    def iter_xlsx(self):
+        """
+        Yield the .xlsx report: the rows with problems, their spreadsheet row
+        number first, one highlighted cell per problem and the messages last.
+        """
+        columns = list(self.frame.columns)
+        position = {field: index for index, field in enumerate(columns)}
+        writer = StreamingXlsxWriter(
+            'الأخطاء',
+            [('السطر', 8, None)]
+            + [(self.column_name(field), 18, None) for field in columns]
+            + [('الأخطاء', 60, MESSAGES_STYLE)],
+            header_style=HEADER_STYLE,
+            cell_styles=[ERROR_STYLE],
+        )
+        return writer.iter_bytes(self._report_rows(position))
+
+    def _report_rows(self, position):
+        file_issues = self.issues[self.issues['row'].isna()]
+        if not file_issues.empty:
+            yield [None] * (len(position) + 1) + ['؛ '.join(
+                _with_detail(message, detail) for message, detail in zip(file_issues['message'], file_issues['detail'])
+            )]
+
+        row_issues = self.issues.dropna(subset=['row'])
+        values = self.frame.to_numpy(dtype=object)
+        positions = {row: index for index, row in enumerate(self.frame.index)}
+        for row, group in row_issues.groupby('row', sort=True):
+            cells = [None if pd.isna(value) else value for value in values[positions[int(row)]]]
+            for field in group['field']:
+                if field in position:
+                    index = position[field]
+                    cells[index] = StyledCell(cells[index], ERROR_STYLE)
+            yield [int(row)] + cells + ['؛ '.join(
+                f'{self.column_name(field)}: {_with_detail(message, detail)}'
+                for field, message, detail in zip(group['field'], group['message'], group['detail'])
+            )]
+
+
+def _with_detail(message, detail):
+    return message if pd.isna(detail) else f'{message} ({detail})'
+
+
+def _decimal_places(number):
+    """Decimal places of a parsed number once trailing zeros are dropped (0 for None)."""
+    if number is None:
+        return 0
+    return max(-number.normalize().as_tuple().exponent, 0)
+
+
+def _text(column):
+    """Cell values as stripped strings, blanks as ''."""
+    text = column.astype(object).where(column.notna(), '').astype(str).str.strip()
+    # Whole numbers read as floats (from .xls files) lose their '.0'
+    return text.str.replace(r'^(-?\d+)\.0$', r'\1', regex=True)
+
+
+class _Issues:
+    def __init__(self, row_numbers):
+        self.row_numbers = row_numbers
+        self.parts = []
+
+    def add(self, mask, field, message, detail=None):
+        """Add one issue for every row where ``mask`` is true (``detail`` may be a Series)."""
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return
+        if isinstance(detail, pd.Series):
+            detail = detail.to_numpy(dtype=object)[mask]
+        self.parts.append(pd.DataFrame({
+            'row': self.row_numbers[mask], 'field': field, 'message': message, 'detail': detail,
+        }))
+
+    def add_file_issue(self, field, message):
+        self.parts.append(pd.DataFrame({'row': [np.nan], 'field': [field], 'message': [message], 'detail': [None]}))
+
+    def frame(self):
+        if not self.parts:
+            return pd.DataFrame({'row': pd.Series(dtype=float), 'field': [], 'message': [], 'detail': []})
+        issues = pd.concat(self.parts, ignore_index=True)
+        return issues.sort_values('row', kind='stable', na_position='first').reset_index(drop=True)
+
+
+def _existing_codes(codes):
+    existing = set()
+    for start in range(0, len(codes), CODE_LOOKUP_BATCH):
+        existing.update(
+            Project.objects.filter(code__in=codes[start:start + CODE_LOOKUP_BATCH]).values_list('code', flat=True)
+        )
+    return existing
+
+
+def validate_workbook(file, file_name=None):
+    """Check every row of an import workbook without importing it. Returns a ValidationReport."""
+    # The whole sheet is read up front; the expat reader is several times faster than openpyxl
+    rows = iter_sheet_rows(file, file_name, xlsx_reader=iter_xlsx_rows)
+    header_row = [str(header).strip() if header is not None else '' for header in next(rows, None) or []]
+    fields = [IMPORT_COLUMN_NAMES.get(header, header) for header in header_row]
+    # Columns the importer uses: known fields, first occurrence only
+    keep = [index for index, field in enumerate(fields) if field in IMPORT_FIELDS and field not in fields[:index]]
+
+    frame = pd.DataFrame(list(rows), dtype=object).reindex(columns=range(len(fields)))
+    frame = frame.iloc[:, keep]
+    frame.columns = [fields[index] for index in keep]
+    frame.index = pd.RangeIndex(2, len(frame) + 2)  # Spreadsheet row numbers
+    text = {field: _text(frame[field]) for field in frame.columns}
+    # The importer skips completely empty rows
+    if text:
+        present = ~np.logical_and.reduce([value == '' for value in text.values()])
+        frame = frame[present]
+        text = {field: value[present] for field, value in text.items()}
+
+    headers = {fields[index]: header_row[index] for index in keep}
+    issues = _Issues(frame.index.to_numpy())
+    if not keep:
+        issues.add_file_issue('code', 'لا يحتوي الملف على أي عمود معروف')
+    for field in REQUIRED_FIELDS:
+        if field not in frame.columns:
+            issues.add_file_issue(field, 'عمود مطلوب غير موجود')
+
+    for field in frame.columns:
+        value = text[field]
+        model_field = Project._meta.get_field(field)
+        if field in REQUIRED_FIELDS:
+            issues.add(value == '', field, 'قيمة مطلوبة')
+
+        if field in DECIMAL_FIELDS or field in INTEGER_FIELDS:
+            # Read exactly as the importer reads them
+            decimals = value.map(parse_number)
+            valid = decimals.notna().to_numpy()
+            issues.add((value != '') & ~valid, field, 'قيمة غير رقمية')
+            number = pd.to_numeric(decimals.where(valid), errors='coerce')
+            places = decimals.map(_decimal_places)
+            issues.add(valid & (number < 0), field, 'قيمة سالبة')
+            if field in DECIMAL_FIELDS:
+                digits = model_field.max_digits - model_field.decimal_places
+                issues.add(valid & (number.abs() >= 10 ** digits), field, f'أكثر من {digits} أرقام قبل الفاصلة')
+                issues.add(valid & (places > model_field.decimal_places), field,
+                           f'أكثر من {model_field.decimal_places} أرقام بعد الفاصلة')
+            else:
+                issues.add(valid & (places > 0), field, 'يجب أن تكون القيمة عدداً صحيحاً')
+            if field == 'start_year':
+                issues.add(valid & (number >= 0) & ((number < MIN_YEAR) | (number > MAX_YEAR)), field,
+                           f'سنة غير صالحة (بين {MIN_YEAR} و{MAX_YEAR})')
+
+        elif field in YEAR_LIST_FIELDS:
+            years_text = value.str.translate(_DIGITS)
+            filled = years_text != ''
+            well_formed = years_text.str.fullmatch(_YEAR_LIST_RE)
+            issues.add(filled & ~well_formed, field, 'قائمة سنوات غير صالحة (مثال: 2025,2026)')
+            years = years_text[filled & well_formed].str.extractall(r'(\d{4})')[0].astype(int)
+            bad_rows = years[(years < MIN_YEAR) | (years > MAX_YEAR)].index.get_level_values(0)
+            issues.add(frame.index.isin(bad_rows), field, f'سنة غير صالحة (بين {MIN_YEAR} و{MAX_YEAR})')
+
+        elif isinstance(model_field, models.CharField) and model_field.max_length:
+            issues.add(value.str.len() > model_field.max_length, field,
+                       f'النص أطول من {model_field.max_length} حرف')
+
+    if 'code' in frame.columns:
+        code = text['code']
+        has_code = code != ''
+        first_row = pd.Series(frame.index, index=frame.index).where(has_code).groupby(code).transform('min')
+        duplicated = has_code & code.duplicated(keep='first')
+        issues.add(duplicated, 'code', 'رمز مكرر في الملف',
+                   detail='السطر ' + first_row.fillna(0).astype(int).astype(str))
+        existing = _existing_codes(code[has_code & ~duplicated].tolist())
+        issues.add(has_code & code.isin(existing), 'code', 'الرمز موجود مسبقاً وسيتم تجاهل السطر')
+
+    return ValidationReport(headers, frame, issues.frame())
+
+
+def save_report(report):
+    """Store the .xlsx report of ``report``; returns its token for ``report_path``."""
+    _delete_old_reports()
+    token = secrets.token_hex(16)
+    default_storage.save(report_path(token), ContentFile(b''.join(report.iter_xlsx())))
+    return token
+
+
+def report_path(token):
+    """Storage path of a saved report. Raises ValueError for a malformed token."""
+    if not _TOKEN_RE.fullmatch(token):
+        raise ValueError(token)
+    return f'{IMPORT_REPORT_DIR}/{token}.xlsx'
+
+
+def _delete_old_reports():
+    try:
+        _, files = default_storage.listdir(IMPORT_REPORT_DIR)
+    except FileNotFoundError:
+        return
+    cutoff = timezone.now().timestamp() - IMPORT_REPORT_MAX_AGE
+    for file_name in files:
+        path = f'{IMPORT_REPORT_DIR}/{file_name}'
+        if default_storage.get_modified_time(path).timestamp() < cutoff:
+            default_storage.delete(path)
@@ -3,36 +3,60 @@ from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
 from django.http import HttpResponse, HttpResponseNotFound, HttpResponseServerError, HttpResponseRedirect
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, CreateView, UpdateView, DetailView, TemplateView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, TemplateView
 from django.db.models import Q, Sum, F, Case, When, Value, IntegerField, CharField
 from django.db.models.functions import Concat, Coalesce
 from django.utils import timezone
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy, reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt, requires_csrf_token
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404
+from django.core.files.storage import default_storage
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.views.decorators.http import require_POST
 from django.db import transaction
 import json
-import pandas as pd
+import logging
 import tablib
 from tablib import Dataset
 from django.conf import settings
 import os
-from .models import Project, ExecutionRate
-from .forms import ProjectForm, ProjectImportForm, ExecutionRateForm
-from .resources import ProjectResource
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.auth.decorators import login_required
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
+from .models import Project, ExecutionRate, ImportJob, ProjectTracking, with_latest_execution
+from .forms import ProjectForm, ProjectImportForm, ExecutionRateForm, ProjectTrackingForm, MAX_IMPORT_FILE_SIZE
+from .jobs import enqueue_import, cancel_job
+from .validation import validate_workbook, save_report, report_path
+from .xlsx import XLSX_CONTENT_TYPE
+from .filters import (
+    filter_projects, filter_execution_rates, filter_project_trackings,
+    PROJECT_FILTER_PARAMS, EXECUTION_RATE_FILTER_PARAMS,
+)
+from .export_cache import cached_export, normalize_filters
+from .dashboard import get_dashboard
+from .progress import progress_response, parse_points
+from .grid import save_grid, GRID_FIELDS
+from .tracking import save_tracking_rows
+from .page_cache import cached_project_detail, cached_project_rows, cache_stats
+from . import api
+from .pagination import keyset_paginate, estimate_count, cursor_querystring
+from .exports import (
+    raw_export_response, RAW_EXPORT_FORMATS, ExportFormatUnavailable,
+    PROJECT_RAW_FIELDS, EXECUTION_RATE_RAW_FIELDS, PROJECT_EXPORT, EXECUTION_RATE_EXPORT, SPEC_EXPORT_FORMATS,
+)
+
+logger = logging.getLogger(__name__)
+
+PROJECTS_PER_PAGE = 50
 
 # Home View
 def home(request):
     context = {
         'title': _('نظام إدارة المشاريع'),
+        'dashboard': get_dashboard(),
     }
     return render(request, 'projects/home.html', context)
 
@@ -48,60 +72,86 @@ def server_error(request, template_name='500.html'):
 # Project List View
 def project_detail(request, pk):
     """Display a single project's details."""
-    project = get_object_or_404(Project, pk=pk)
-    context = {
-        'title': _('تفاصيل المشروع') + f' - {project.code}',
-        'project': project,
-    }
-    return render(request, 'projects/project_detail.html', context)
+    project = get_object_or_404(with_latest_execution(Project.objects.all()), pk=pk)
+
+    def render_detail():
+        context = {
+            'title': _('تفاصيل المشروع') + f' - {project.code}',
+            'project': project,
+        }
+        return render_to_string('projects/project_detail.html', context, request)
+
+    # Pending flash messages are part of the page, so it cannot be shared
+    if len(messages.get_messages(request)):
+        return HttpResponse(render_detail())
+    content, hit = cached_project_detail(project, render_detail)
+    response = HttpResponse(content)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+def project_progress(request, pk):
+    """Progress series of one project as compact JSON (``?points=`` samples at most)."""
+    get_object_or_404(Project, pk=pk)
+    return progress_response(
+        request, Project.objects.filter(pk=pk), parse_points(request.GET.get('points')), single=True
+    )
+
+def projects_progress(request):
+    """Progress series of the projects matching the project list filters."""
+    projects = filter_projects(Project.objects.all(), request.GET)
+    return progress_response(request, projects, parse_points(request.GET.get('points')))
 
 def project_list(request):
     # Prevent browser from caching this page
     if hasattr(request, 'session'):
         request.session['django_timezone'] = timezone.get_current_timezone_name()
     
-    # Force a fresh database query
-    from django.db import connection
-    connection.close()
-    
     query = request.GET.get('q', '')
     year = request.GET.get('year', '')
     
-    # Use select_related or prefetch_related if there are related fields
-    projects = Project.objects.all().order_by('-id')
+    # Only load the columns the table shows; long text fields stay in the database
+    projects = filter_projects(Project.objects.all(), request.GET).only(
+        'id', 'code', 'program', 'projects', 'location', 'district',
+        'start_year', 'total_estimated_cost', 'updated_at',
+    )
     
     # Generate years from 2022 to 2028 for the year filter dropdown
     years = list(range(2022, 2029))  # 2028 is included
     years = [str(year) for year in years]
     
-    if query:
-        projects = projects.filter(
-            Q(code__icontains=query) |
-            Q(program__icontains=query) |
-            Q(location__icontains=query) |
-            Q(district__icontains=query)
-        )
+    # Keyset pagination on -id: each page is one indexed query, however deep
+    # Current progress comes from per-row subqueries on the 50 projects shown
+    page = keyset_paginate(
+        with_latest_execution(projects),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=PROJECTS_PER_PAGE,
+    )
+    total_count, total_is_capped = estimate_count(projects)
     
-    if year:
-        projects = projects.filter(start_year=year)
-    
-    # Add debug information
-    debug_info = {
-        'project_count': projects.count(),
-        'query': query,
-        'year': year,
-        'timestamp': timezone.now().isoformat(),
-    }
-    print(f"Debug - Project List: {debug_info}")
+    # The cells that only change with the project or its latest execution
+    # rate come from the cache
+    rows = cached_project_rows(page, lambda project: {
+        'cells': render_to_string('projects/includes/project_row_cells.html', {'project': project}),
+        'progress': render_to_string('projects/includes/project_row_progress.html', {'project': project}),
+    })
+    for project in page:
+        project.cached_row = {name: mark_safe(html) for name, html in rows[project.pk].items()}
     
     context = {
         'title': _('قائمة المشاريع'),
-        'projects': projects,
+        'projects': page,
+        'page': page,
+        'next_query': cursor_querystring(request.GET, after=page.next_cursor),
+        'previous_query': cursor_querystring(request.GET, before=page.previous_cursor),
+        'total_count': total_count,
+        'total_is_capped': total_is_capped,
         'search_query': query,
         'years': years,
         'selected_year': year,
-        'cache_buster': int(timezone.now().timestamp()),  # Add timestamp to prevent caching
-        'debug_info': debug_info,  # For debugging
+        'selected_implementation_year': request.GET.get('implementation_year', ''),
+        'selected_budget_year': request.GET.get('budget_year', ''),
+        'export_query': urlencode(normalize_filters(request.GET, PROJECT_FILTER_PARAMS)),
     }
     
     response = render(request, 'projects/project_list.html', context)
@@ -137,21 +187,14 @@ def project_edit(request, pk):
     project = get_object_or_404(Project, pk=pk)
     
     if request.method == 'POST':
-        print("Form data received:", request.POST)  # Log form data
+        logger.debug('Project %s edit data: %s', pk, request.POST)
         form = ProjectForm(request.POST, instance=project)
         
         if not form.is_valid():
             # Log all form errors in detail
-            print("Form validation failed. Errors:")
-            for field, errors in form.errors.items():
-                field_label = form.fields[field].label if field in form.fields else field
-                print(f"- {field_label}: {', '.join(errors)}")
-                
-            # Log cleaned data that did pass validation
-            try:
-                print("Cleaned data:", form.cleaned_data)
-            except Exception as e:
-                print("Could not get cleaned_data:", str(e))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Project %s edit invalid: %s; cleaned data: %s',
+                             pk, form.errors.as_json(), form.cleaned_data)
                 
             messages.error(request, _('حدث خطأ في التحقق من صحة البيانات. يرجى تصحيح الأخطاء أدناه.'))
         else:
@@ -165,7 +208,7 @@ def project_edit(request, pk):
                 connection.close()
                 
                 messages.success(request, _('تم تحديث المشروع بنجاح'))
-                print(f"Project {project.id} saved successfully")
+                logger.info('Project %s updated', project.id)
                 
                 # Use HttpResponseRedirect to force a fresh GET request
                 from django.http import HttpResponseRedirect
@@ -174,10 +217,7 @@ def project_edit(request, pk):
             except Exception as e:
                 error_msg = f'حدث خطأ أثناء حفظ التغييرات: {str(e)}'
                 messages.error(request, error_msg)
-                print(f"Error saving project: {str(e)}")
-                if hasattr(e, '__traceback__'):
-                    import traceback
-                    traceback.print_exc()
+                logger.exception('Error saving project %s', pk)
     else:
         form = ProjectForm(instance=project)
     
@@ -185,7 +225,6 @@ def project_edit(request, pk):
         'title': _('تعديل المشروع'),
         'form': form,
         'project': project,
-        'cache_buster': int(timezone.now().timestamp()),
     }
     return render(request, 'projects/project_form.html', context)
 
@@ -206,17 +245,7 @@ class ExecutionRateListView(ListView):
     
     def get_queryset(self):
         queryset = super().get_queryset().select_related('project')
-        
-        # Get filter parameters
-        code = self.request.GET.get('code')
-        project_name = self.request.GET.get('project')
-        
-        # Apply filters
-        if code:
-            queryset = queryset.filter(project__code__icontains=code)
-        if project_name:
-            queryset = queryset.filter(Q(project__program__icontains=project_name) | 
-                                     Q(project__projects__icontains=project_name))
+        queryset = filter_execution_rates(queryset, self.request.GET)
             
         # Order by most recent first
         return queryset.order_by('-created_at')
@@ -226,85 +255,80 @@ class ExecutionRateListView(ListView):
         context['title'] = _('معدلات التنفيذ')
         context['code_filter'] = self.request.GET.get('code', '')
         context['project_filter'] = self.request.GET.get('project', '')
+        context['latest_filter'] = self.request.GET.get('latest', '')
+        # Kept by the export link and the page links
+        context['filter_query'] = urlencode(normalize_filters(self.request.GET, EXECUTION_RATE_FILTER_PARAMS))
         return context
 
 
-def export_execution_rates(request):
-    """Export execution rates to Excel with Arabic headers"""
-    from django.http import HttpResponse
-    import xlwt
-    from django.utils import timezone
-    from django.utils.encoding import smart_str
-    from django.db.models import Q
-    
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = 'attachment; filename="execution_rates_%s.xls"' % timezone.now().strftime('%Y-%m-%d')
-    
-    wb = xlwt.Workbook(encoding='utf-8')
-    ws = wb.add_sheet('معدلات التنفيذ')
-    
-    # Set RTL direction
-    ws.set_right_to_left()
-    
-    # Set font for Arabic text
-    font_style = xlwt.XFStyle()
-    font_style.font.bold = True
-    
-    # Define columns
+def execution_rate_grid(request):
+    """
+    Spreadsheet-like entry of execution rates for many projects at once.
+
+    GET shows the projects matching the project list filters with their latest
+    figures. POST takes ``{"rows": [...]}`` as JSON (see ``grid.save_grid``)
+    and saves every row or none.
+    """
+    if request.method == 'POST':
+        try:
+            rows = json.loads(request.body).get('rows')
+        except (ValueError, AttributeError):
+            rows = None
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return JsonResponse({'error': _('صيغة البيانات غير صحيحة')}, status=400)
+
+        result = save_grid(rows)
+        if result.has_errors:
+            return JsonResponse({
+                'errors': [{'row': index, 'fields': fields} for index, fields in result.errors],
+            }, status=400)
+        return JsonResponse({
+            'created': len(result.created),
+            'updated': len(result.updated),
+            'ids': [rate.pk for rate in result.created],
+        })
+
+    projects = filter_projects(Project.objects.all(), request.GET).only('id', 'code', 'program')
+    page = keyset_paginate(
+        with_latest_execution(projects),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=PROJECTS_PER_PAGE,
+    )
+    latest = ExecutionRate.objects.in_bulk(
+        [project.latest_execution_id for project in page if project.latest_execution_id]
+    )
     columns = [
-        ('الرمز', 20),
-        ('المشروع', 40),
-        ('المبلغ المبرمج', 20),
-        ('مساهمة الشركاء', 20),
-        ('التكاليف الفعلية', 20),
-        ('التكاليف التقديرية', 20),
-        ('نسبة الإنجاز المالي', 20),
-        ('تاريخ الإضافة', 20),
+        {
+            'name': name,
+            'label': ExecutionRate._meta.get_field(name).verbose_name,
+            'type': 'date' if name.endswith('_date') else 'number',
+        }
+        for name in GRID_FIELDS
     ]
-    
-    # Write headers
-    for col_num, (header, width) in enumerate(columns):
-        ws.col(col_num).width = 256 * width  # Set column width
-        ws.write(0, col_num, header, font_style)
-    
-    # Get filtered data
-    execution_rates = ExecutionRate.objects.select_related('project').order_by('-created_at')
-    
-    # Apply filters if any
-    code = request.GET.get('code')
-    project_name = request.GET.get('project')
-    
-    if code:
-        execution_rates = execution_rates.filter(project__code__icontains=code)
-    if project_name:
-        execution_rates = execution_rates.filter(
-            Q(project__program__icontains=project_name) | 
-            Q(project__projects__icontains=project_name)
-        )
-    
-    # Write data rows
-    for row_num, rate in enumerate(execution_rates, 1):
-        ws.write(row_num, 0, smart_str(rate.project.code if rate.project else ''))
-        ws.write(row_num, 1, smart_str(rate.project.program if rate.project else ''))
-        ws.write(row_num, 2, str(rate.programmed_amount) if rate.programmed_amount else '')
-        ws.write(row_num, 3, str(rate.partner_contribution) if rate.partner_contribution else '')
-        ws.write(row_num, 4, str(rate.actual_costs) if rate.actual_costs else '')
-        ws.write(row_num, 5, str(rate.estimated_costs) if rate.estimated_costs else '')
-        ws.write(row_num, 6, f"{rate.financial_achievement_percentage}%" if rate.financial_achievement_percentage else '')
-        
-        # Handle date field - convert to string to avoid timezone issues
-        if rate.created_at:
-            if timezone.is_aware(rate.created_at):
-                # Convert to local timezone and format as string
-                local_dt = timezone.localtime(rate.created_at)
-                ws.write(row_num, 7, local_dt.strftime('%Y-%m-%d'))
-            else:
-                ws.write(row_num, 7, rate.created_at.strftime('%Y-%m-%d'))
-        else:
-            ws.write(row_num, 7, '')
-    
-    wb.save(response)
-    return response
+    rows = []
+    for project in page:
+        rate = latest.get(project.latest_execution_id)
+        values = [getattr(rate, column['name']) if rate else None for column in columns]
+        rows.append({
+            'project': project,
+            'latest': rate,
+            'cells': [
+                (column, '' if value is None else (value.isoformat() if hasattr(value, 'isoformat') else str(value)))
+                for column, value in zip(columns, values)
+            ],
+        })
+
+    context = {
+        'title': _('إدخال معدلات التنفيذ'),
+        'columns': columns,
+        'rows': rows,
+        'page': page,
+        'next_query': cursor_querystring(request.GET, after=page.next_cursor),
+        'previous_query': cursor_querystring(request.GET, before=page.previous_cursor),
+        'search_query': request.GET.get('q', ''),
+    }
+    return render(request, 'projects/execution_rate_grid.html', context)
 
 
 class ExecutionRateCreateView(CreateView):
@@ -325,7 +349,8 @@ class ExecutionRateCreateView(CreateView):
     
     def form_invalid(self, form):
         # Log form errors for debugging
-        print("Form errors:", form.errors)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Execution rate form invalid: %s', form.errors.as_json())
         return super().form_invalid(form)
     
     def get_success_url(self):
@@ -373,147 +398,120 @@ class ExecutionRateDeleteView(DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+# Project Tracking Views
+def project_tracking_list(request):
+    trackings = filter_project_trackings(ProjectTracking.objects.select_related('project'), request.GET)
+    page = keyset_paginate(
+        trackings,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=PROJECTS_PER_PAGE,
+    )
+    context = {
+        'title': _('تتبع المشاريع'),
+        'trackings': page,
+        'page': page,
+        'search_query': request.GET.get('q', ''),
+        'next_query': cursor_querystring(request.GET, after=page.next_cursor),
+        'previous_query': cursor_querystring(request.GET, before=page.previous_cursor),
+    }
+    return render(request, 'projects/project_tracking_list.html', context)
+
+
+def project_tracking_edit(request, pk):
+    """Create or edit the tracking of project ``pk``."""
+    # The tracking and its project come from one query, and save() reuses them
+    project = get_object_or_404(Project.objects.select_related('tracking'), pk=pk)
+    tracking = getattr(project, 'tracking', None) or ProjectTracking(project=project)
+
+    if request.method == 'POST':
+        form = ProjectTrackingForm(request.POST, instance=tracking)
+        if form.is_valid():
+            form.save()
+            messages.success(request, _('تم حفظ تتبع المشروع بنجاح'))
+            return redirect('projects:project_tracking_list')
+        messages.error(request, _('حدث خطأ في التحقق من صحة البيانات. يرجى تصحيح الأخطاء أدناه.'))
+    else:
+        form = ProjectTrackingForm(instance=tracking)
+
+    context = {
+        'title': _('تتبع المشروع'),
+        'form': form,
+        'project': project,
+        'tracking': tracking,
+    }
+    return render(request, 'projects/project_tracking_form.html', context)
+
+
+@require_POST
+def project_tracking_bulk(request):
+    """
+    Update the tracking of many projects at once. Takes ``{"rows": [...]}`` as
+    JSON (see ``tracking.save_tracking_rows``) and saves every row or none.
+    """
+    try:
+        rows = json.loads(request.body).get('rows')
+    except (ValueError, AttributeError):
+        rows = None
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return JsonResponse({'error': _('صيغة البيانات غير صحيحة')}, status=400)
+
+    result = save_tracking_rows(rows)
+    if result.has_errors:
+        return JsonResponse({
+            'errors': [{'row': index, 'fields': fields} for index, fields in result.errors],
+        }, status=400)
+    return JsonResponse({
+        'created': len(result.created),
+        'updated': len(result.updated),
+        'ids': [tracking.pk for tracking in result.created],
+    })
+
+
+# JSON API
+@require_http_methods(['GET', 'HEAD'])
+def api_index(request):
+    return api.api_index(request)
+
+
+@require_http_methods(['GET', 'HEAD'])
+def api_cache_stats(request):
+    """Hit/miss counters of the project page caches."""
+    return JsonResponse(cache_stats())
+
+
+@require_http_methods(['GET', 'HEAD'])
+def api_list(request, resource):
+    """Read-only JSON list of ``resource`` (see ``api.API_RESOURCES``)."""
+    return api.api_response(request, api.API_RESOURCES[resource])
+
+
 # Export Views
 from django.http import HttpResponse, HttpResponseBadRequest
-import xlwt
-from xlwt import XFStyle, easyxf
-from datetime import datetime
-import io
 
 def export_execution_rates(request):
     """
-    Export execution rates data to Excel file
+    Export the (filtered) execution rates. Streams .xlsx by default; ``?format=``
+    asks for the legacy xls, for csv with the same columns, or for raw_csv,
+    ndjson or parquet raw data. Generated files are cached on disk until the rows change.
     """
-    # Get filter parameters
-    search_query = request.GET.get('q', '')
-    
-    # Filter execution rates based on search query
-    execution_rates = ExecutionRate.objects.select_related('project').all()
-    
-    if search_query:
-        execution_rates = execution_rates.filter(
-            Q(project__code__icontains=search_query) |
-            Q(project__program__icontains=search_query) |
-            Q(project__projects__icontains=search_query)
+    execution_rates = filter_execution_rates(ExecutionRate.objects.all(), request.GET)
+    export_format = request.GET.get('format') or 'xlsx'
+
+    def build_response():
+        if export_format in SPEC_EXPORT_FORMATS:
+            return EXECUTION_RATE_EXPORT.response(execution_rates, export_format)
+        return raw_export_view_response(
+            execution_rates, EXECUTION_RATE_RAW_FIELDS, export_format, 'execution_rates_export'
         )
-    
-    # Create the workbook and add a worksheet
-    output = io.BytesIO()
-    wb = xlwt.Workbook(encoding='utf-8')
-    ws = wb.add_sheet('معدلات التنفيذ')
-    
-    # Create a font that supports Arabic
-    font = xlwt.Font()
-    font.name = 'Arial'
-    font.height = 220  # 11pt
-    
-    # Set RTL alignment for all cells
-    alignment = xlwt.Alignment()
-    alignment.horz = xlwt.Alignment.HORZ_RIGHT
-    alignment.vert = xlwt.Alignment.VERT_CENTER
-    
-    # Create styles for header cells
-    header_style = xlwt.XFStyle()
-    header_font = xlwt.Font()
-    header_font.bold = True
-    header_font.height = 220  # 11pt
-    header_font.colour_index = xlwt.Style.colour_map['white']  # White text
-    header_style.font = header_font
-    header_style.alignment.horz = xlwt.Alignment.HORZ_CENTER
-    header_style.alignment.vert = xlwt.Alignment.VERT_CENTER
-    header_style.pattern.pattern = xlwt.Pattern.SOLID_PATTERN
-    header_style.pattern.pattern_fore_colour = xlwt.Style.colour_map['dark_blue']  # Dark blue background
-    
-    # Define number format
-    number_style = xlwt.XFStyle()
-    number_style.num_format_str = '#,##0.00'
-    
-    # Define percent format
-    percent_style = xlwt.XFStyle()
-    percent_style.num_format_str = '0.00%'
-    
-    # Define date format
-    date_style = xlwt.XFStyle()
-    date_style.num_format_str = 'yyyy-mm-dd'
-    
-    # Write headers
-    headers = [
-        'رمز المشروع',
-        'البرنامج',
-        'المشاريع',
-        'المبلغ المبرمج',
-        'تعبئة الشركاء',
-        'تاريخ البرمجة',
-        'تاريخ إطلاق الصفقات',
-        'التكاليف الفعلية (أ)',
-        'التكاليف التقديرية (ب)',
-        'فرق التكلفة (%)',
-        'تاريخ الانتهاء المتوقع',
-        'تاريخ البداية الفعلية',
-        'تاريخ الانتهاء الفعلي',
-        'فرق المدة (بالأيام)',
-        'معدل التأخير (%)',
-        'معدل التقدم (%) للأشغال',
-        'معدل الإنجاز (%) (مالي)',
-        'تاريخ الإنشاء',
-        'آخر تحديث'
-    ]
-    
-    for col_num, header in enumerate(headers):
-        ws.write(0, col_num, header, header_style)
-    
-    # Write data rows
-    for row_num, rate in enumerate(execution_rates, 1):
-        ws.write(row_num, 0, rate.project.code)
-        ws.write(row_num, 1, rate.project.program)
-        ws.write(row_num, 2, rate.project.projects)
-        # Helper function to format date safely
-        def format_date(dt):
-            if dt is None:
-                return ''
-            if hasattr(dt, 'utcoffset'):  # Check if it's a datetime object
-                if timezone.is_aware(dt):
-                    dt = timezone.localtime(dt)
-                return dt.strftime('%Y-%m-%d')
-            # It's a date object
-            return dt.strftime('%Y-%m-%d')
-            
-        ws.write(row_num, 3, float(rate.programmed_amount or 0), number_style)
-        ws.write(row_num, 4, float(rate.partner_contribution or 0), number_style)
-        ws.write(row_num, 5, format_date(rate.programming_date))
-        ws.write(row_num, 6, format_date(rate.market_launch_date))
-        ws.write(row_num, 7, float(rate.actual_costs or 0), number_style)
-        ws.write(row_num, 8, float(rate.estimated_costs or 0), number_style)
-        ws.write(row_num, 9, float(rate.cost_difference_percentage or 0) / 100, percent_style)
-        ws.write(row_num, 10, format_date(rate.expected_end_date))
-        ws.write(row_num, 11, format_date(rate.actual_start_date))
-        ws.write(row_num, 12, format_date(rate.actual_end_date))
-        ws.write(row_num, 13, rate.duration_difference_days or 0, number_style)
-        ws.write(row_num, 14, float(rate.delay_percentage or 0) / 100, percent_style)
-        ws.write(row_num, 15, float(rate.work_progress_percentage or 0) / 100, percent_style)
-        ws.write(row_num, 16, float(rate.financial_achievement_percentage or 0) / 100, percent_style)
-        ws.write(row_num, 17, format_date(rate.created_at))
-        ws.write(row_num, 18, format_date(rate.updated_at))
-    
-    # Set column widths
-    for i in range(len(headers)):
-        ws.col(i).width = 4000  # 4000 = 40 * 256 (units of 1/256 of a character width)
-    
-    # Save the workbook to the output buffer
-    wb.save(output)
-    output.seek(0)
-    
-    # Prepare the response
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'execution_rates_export_{timestamp}.xls'
-    
-    response = HttpResponse(
-        output.getvalue(),
-        content_type='application/vnd.ms-excel'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
+
+    if export_format in SPEC_EXPORT_FORMATS or export_format in RAW_EXPORT_FORMATS:
+        filters = normalize_filters(request.GET, EXECUTION_RATE_FILTER_PARAMS)
+        # The export also shows project codes and names
+        return cached_export(request, 'execution_rates', export_format, execution_rates, filters,
+                             build_response, timestamp_fields=('updated_at', 'project__updated_at'))
+    return HttpResponseBadRequest(_('صيغة التصدير غير معروفة'))
+
 from datetime import datetime
 
 def project_import_preview(request):
@@ -582,112 +580,25 @@ def import_projects(request):
                 messages.error(request, _('الرجاء تحميل ملف Excel صالح (ملفات xls أو xlsx فقط)'))
                 return redirect('projects:project_import')
             
-            try:
-                # First try with pandas for better error handling
-                if new_projects.name.lower().endswith('.xlsx'):
-                    df = pd.read_excel(new_projects, engine='openpyxl')
-                else:
-                    df = pd.read_excel(new_projects, engine='xlrd')
-                
-                # Replace NaN with None and convert to list of dictionaries
-                records = df.replace({pd.NA: None}).to_dict('records')
-                imported_data = tablib.Dataset()
-                
-                if len(records) > 0:
-                    # Get headers from the first record
-                    headers = list(records[0].keys())
-                    imported_data.headers = headers
-                    
-                    # Process each row
-                    for record in records:
-                        row = []
-                        for header in headers:
-                            value = record.get(header)
-                            # Handle JSON fields
-                            if header in ['implementation_years', 'budget_years'] and value is not None:
-                                if isinstance(value, str):
-                                    try:
-                                        value = json.loads(value)
-                                    except (ValueError, TypeError):
-                                        value = [str(value)] if value else []
-                                elif not isinstance(value, (list, tuple)):
-                                    value = [str(value)]
-                            row.append(json.dumps(value) if isinstance(value, (list, dict)) else value)
-                        imported_data.append(row)
-                
-            except Exception as e:
-                # If pandas fails, try with tablib directly
-                try:
-                    new_projects.seek(0)  # Reset file pointer
-                    file_format = 'xlsx' if new_projects.name.lower().endswith('.xlsx') else 'xls'
-                    dataset = tablib.Dataset()
-                    imported_data = dataset.load(new_projects.read(), format=file_format)
-                except Exception as e2:
-                    error_msg = f'خطأ في قراءة الملف: {str(e2)}'
-                    if 'Unsupported format' in str(e2) or 'not a zip file' in str(e2).lower():
-                        error_msg = 'تنسيق الملف غير مدعوم. يرجى التأكد من أن الملف صحيح وغير تالف.'
-                    messages.error(request, error_msg)
-                    return redirect('projects:project_import')
-            
-            if not imported_data or len(imported_data) == 0:
-                messages.error(request, _('الملف فارغ أو لا يحتوي على بيانات'))
+            if new_projects.size > MAX_IMPORT_FILE_SIZE:
+                messages.error(request, _('حجم الملف كبير جداً. الحد الأقصى المسموح به هو 50 ميجابايت'))
                 return redirect('projects:project_import')
             
-            # Import the data using the resource with update strategy
-            project_resource = ProjectResource()
+            if 'validate' in request.POST:
+                return validate_import(request, new_projects)
             
-            # First, get all existing project codes for duplicate checking
-            existing_codes = set(Project.objects.values_list('code', flat=True))
+            # Queue the import and answer at once; a background worker
+            # streams the rows into the database in chunks
+            job = enqueue_import(new_projects)
             
-            # Process each row individually to handle duplicates
-            result = None
-            for row in imported_data.dict:
-                try:
-                    # Skip if this is a duplicate code and we're not updating
-                    if row.get('code') in existing_codes:
-                        messages.warning(request, 
-                            f'تم تخطي المشروع بالرمز {row.get("code")} لأنه موجود مسبقاً')
-                        continue
-                        
-                    # Import the row
-                    row_dataset = tablib.Dataset()
-                    row_dataset.headers = imported_data.headers
-                    row_dataset.append([row.get(h) for h in imported_data.headers])
-                    
-                    result = project_resource.import_data(
-                        row_dataset, 
-                        dry_run=False, 
-                        raise_errors=True,
-                        collect_failed_rows=True
-                    )
-                    
-                    # Add the new code to our set to prevent duplicates in the same import
-                    if row.get('code'):
-                        existing_codes.add(row.get('code'))
-                        
-                except Exception as e:
-                    messages.error(request, 
-                        f'خطأ في استيراد السطر: {str(e)}')
+            if 'application/json' in request.headers.get('Accept', ''):
+                return JsonResponse({
+                    'job_id': job.pk,
+                    'status_url': reverse('projects:import_job_status', kwargs={'pk': job.pk}),
+                }, status=202)
             
-            # Show success message if we processed any rows
-            if result and (result.has_errors() or result.has_validation_errors()):
-                error_messages = []
-                for error in result.base_errors:
-                    error_messages.append(f'خطأ: {error.error}')
-                for row_num, errors in result.row_errors():
-                    for error in errors:
-                        error_messages.append(f'خطأ في السطر {row_num + 2}: {error.error}')
-                
-                for msg in error_messages[:5]:  # Show first 5 errors to avoid message flooding
-                    messages.error(request, msg)
-                if len(error_messages) > 5:
-                    messages.warning(request, f'و {len(error_messages) - 5} أخطاء إضافية...')
-                
-                return redirect('projects:project_import')
-            
-            # If we get here, import was successful
-            messages.success(request, _(f'تم استيراد {len(imported_data)} سجل بنجاح'))
-            return redirect('projects:project_list')
+            messages.info(request, _('تم استلام الملف وبدأت عملية الاستيراد'))
+            return redirect(job)
             
         except Exception as e:
             import traceback
@@ -697,269 +608,113 @@ def import_projects(request):
     
     return render(request, 'projects/import.html', {'title': _('استيراد مشاريع')})
 
-def export_projects(request):
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = f'attachment; filename="projects_export_{datetime.now().strftime("%Y%m%d_%H%M")}.xls"'
-    
-    wb = xlwt.Workbook(encoding='utf-8')
-    ws = wb.add_sheet('المشاريع')
-    
-    # Define styles
-    # ==============
-    # 1. Header Style
-    header_style = xlwt.XFStyle()
-    
-    # Font
-    font = xlwt.Font()
-    font.bold = True
-    font.colour_index = xlwt.Style.colour_map['white']
-    font.height = 220  # Slightly larger font for headers
-    header_style.font = font
-    
-    # Set RTL direction for the sheet
-    ws.set_panes_frozen(True)
-    ws.set_show_grid(False)
-    ws.right_to_left = True  # Enable RTL for the entire sheet
-    
-    # Alignment
-    alignment = xlwt.Alignment()
-    alignment.horz = xlwt.Alignment.HORZ_CENTER
-    alignment.vert = xlwt.Alignment.VERT_CENTER
-    alignment.wrap = 1  # Wrap text
-    alignment.rtl = 1  # Right-to-left
-    header_style.alignment = alignment
-    
-    # Border
-    borders = xlwt.Borders()
-    borders.left = xlwt.Borders.THIN
-    borders.right = xlwt.Borders.THIN
-    borders.top = xlwt.Borders.THIN
-    borders.bottom = xlwt.Borders.THIN
-    borders.left_colour = xlwt.Style.colour_map['white']
-    borders.right_colour = xlwt.Style.colour_map['white']
-    borders.top_colour = xlwt.Style.colour_map['white']
-    borders.bottom_colour = xlwt.Style.colour_map['white']
-    header_style.borders = borders
-    
-    # Background - Dark gray for professional look
-    pattern = xlwt.Pattern()
-    pattern.pattern = xlwt.Pattern.SOLID_PATTERN
-    pattern.pattern_fore_colour = xlwt.Style.colour_map['gray50']  # Dark gray background
-    header_style.pattern = pattern
-    
-    # Font - White and bold for better contrast
-    font = xlwt.Font()
-    font.bold = True
-    font.colour_index = xlwt.Style.colour_map['white']
-    font.height = 220  # Slightly larger font for headers
-    header_style.font = font
+def validate_import(request, upload):
+    """Dry run of an uploaded import file: check every row, import nothing."""
+    try:
+        report = validate_workbook(upload, upload.name)
+    except Exception:
+        logger.exception('Validation of %s failed', upload.name)
+        messages.error(request, _('تعذرت قراءة الملف. يرجى التأكد من أنه ملف Excel صالح.'))
+        return redirect('projects:project_import')
+    
+    report_url = None
+    if not report.is_valid:
+        report_url = reverse('projects:import_report', kwargs={'token': save_report(report)})
+    
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'valid': report.is_valid,
+            'total_rows': report.total_rows,
+            'rows_with_issues': report.rows_with_issues,
+            'issue_count': len(report.issues),
+            'issues': [
+                {'row': row, 'column': column, 'message': message}
+                for row, column, message in report.first_issues()
+            ],
+            'report_url': report_url,
+        })
     
-    # ==============
-    # 2. Data Row Style - White background for all data rows
-    data_style = xlwt.XFStyle()
-    
-    # Font
-    font = xlwt.Font()
-    font.height = 200
-    data_style.font = font
-    
-    # Alignment
-    alignment = xlwt.Alignment()
-    alignment.horz = xlwt.Alignment.HORZ_RIGHT
-    alignment.vert = xlwt.Alignment.VERT_CENTER
-    alignment.wrap = 1  # Wrap text
-    alignment.rtl = 1  # Right-to-left
-    data_style.alignment = alignment
-    
-    # Border
-    borders = xlwt.Borders()
-    borders.left = xlwt.Borders.THIN
-    borders.right = xlwt.Borders.THIN
-    borders.top = xlwt.Borders.THIN
-    borders.bottom = xlwt.Borders.THIN
-    data_style.borders = borders
-    
-    # Set white background for all data rows
-    pattern = xlwt.Pattern()
-    pattern.pattern = xlwt.Pattern.SOLID_PATTERN
-    pattern.pattern_fore_colour = xlwt.Style.colour_map['white']
-    data_style.pattern = pattern
-    
-    # ==============
-    # 3. Alternate Row Style (for better readability)
-    alt_data_style = xlwt.XFStyle()
-    
-    # Font
-    font = xlwt.Font()
-    font.height = 200
-    alt_data_style.font = font
-    
-    # Alignment
-    alignment = xlwt.Alignment()
-    alignment.horz = xlwt.Alignment.HORZ_RIGHT
-    alignment.vert = xlwt.Alignment.VERT_CENTER
-    alignment.wrap = 1  # Wrap text
-    alignment.rtl = 1  # Right-to-left
-    alt_data_style.alignment = alignment
-    
-    # Border
-    borders = xlwt.Borders()
-    borders.left = xlwt.Borders.THIN
-    borders.right = xlwt.Borders.THIN
-    borders.top = xlwt.Borders.THIN
-    borders.bottom = xlwt.Borders.THIN
-    alt_data_style.borders = borders
-    
-    # Light gray background for alternate rows
-    pattern = xlwt.Pattern()
-    pattern.pattern = xlwt.Pattern.SOLID_PATTERN
-    pattern.pattern_fore_colour = xlwt.Style.colour_map['gray25']  # Changed from 'light_gray' to 'gray25'
-    alt_data_style.pattern = pattern
-    
-    # Set RTL direction for the sheet
-    ws.set_panes_frozen(True)
-    ws.set_show_grid(False)
-    ws.right_to_left = 1  # This makes the sheet RTL
-    
-    # Create resource and get all data
-    project_resource = ProjectResource()
-    queryset = Project.objects.all().select_related()
-    dataset = project_resource.export(queryset)
-    
-    # Custom Arabic headers in right-to-left order (rightmost column first)
-    arabic_headers = [
-        'مصادر التمويل المحتملة',
-        'الشركاء المحتملين',
-        'المؤشر 3',
-        'المؤشر 2',
-        'المؤشر 1',
-        'سنوات الميزانية',
-        'سنوات التنفيذ',
-        'المدة التقديرية(أشهر)',
-        'سنة الانطلاق',
-        'التكلفة التقديرية',
-        'الإنجازات',
-        'الدراسات',
-        'كلفة تعبئة العقار',
-        'المساحة',
-        'الرسم العقاري',
-        'وضعية العقار',
-        'الفئة المستهدفة',
-        'مكونات المشروع',
-        'الرمز في تصميم التهيئة',
-        'المقاطعة/الجماعة',
-        'المكان',
-        'المشاريع',
-        'البرنامج',
-        'الرمز',
-        'الاهداف التنموية'
-    ]
-    
-    # Set column widths and write headers with right alignment
-    column_widths = {
-        'الرمز': 2000,
-        'البرنامج': 4000,
-        'المشاريع': 6000,
-        'المكان': 4000,
-        'المقاطعة/الجماعة': 4000,
-        'الرمز في تصميم التهيئة': 4000,
-        'مكونات المشروع': 6000,
-        'الفئة المستهدفة': 4000,
-        'وضعية العقار': 4000,
-        'الرسم العقاري': 4000,
-        'المساحة': 3000,
-        'كلفة تعبئة العقار': 4000,
-        'الدراسات': 5000,
-        'الإنجازات': 6000,
-        'التكلفة التقديرية': 4000,
-        'سنة الانطلاق': 3000,
-        'المدة التقديرية(أشهر)': 4000,
-        'سنوات التنفيذ': 4000,
-        'سنوات الميزانية': 4000,
-        'المؤشر 1': 4000,
-        'المؤشر 2': 4000,
-        'المؤشر 3': 4000,
-        'الشركاء المحتملين': 5000,
-        'مصادر التمويل المحتملة': 5000,
-        'الاهداف التنموية': 6000
+    context = {
+        'title': _('التحقق من ملف الاستيراد'),
+        'file_name': upload.name,
+        'report': report,
+        'summary': report.summary(),
+        'issues': report.first_issues(),
+        'report_url': report_url,
     }
-    
-    # Write headers with styling
-    for col_num, header in enumerate(arabic_headers):
-        # Set column width
-        ws.col(col_num).width = column_widths.get(header, 4000)  # Default width 4000
-        
-        # Write header with style
-        ws.write(0, col_num, header, header_style)
-        
-        # Set row height for header
-        ws.row(0).height_mismatch = True
-        ws.row(0).height = 500  # Slightly taller row for headers
-    
-    # Map between Arabic headers and model field names (order matches the arabic_headers list)
-    field_map = {
-        'مصادر التمويل المحتملة': 'funding_sources',
-        'الشركاء المحتملين': 'potential_partners',
-        'المؤشر 3': 'indicator_3',
-        'المؤشر 2': 'indicator_2',
-        'المؤشر 1': 'indicator_1',
-        'سنوات الميزانية': 'budget_years',
-        'سنوات التنفيذ': 'implementation_years',
-        'المدة التقديرية(أشهر)': 'estimated_duration',
-        'سنة الانطلاق': 'start_year',
-        'التكلفة التقديرية': 'estimated_cost',
-        'الإنجازات': 'achievements',
-        'الدراسات': 'studies',
-        'كلفة تعبئة العقار': 'property_prep_cost',
-        'المساحة': 'area',
-        'الرسم العقاري': 'property_drawing',
-        'وضعية العقار': 'property_status',
-        'الفئة المستهدفة': 'target_group',
-        'مكونات المشروع': 'components',
-        'الرمز في تصميم التهيئة': 'planning_code',
-        'المقاطعة/الجماعة': 'district',
-        'المكان': 'location',
-        'المشاريع': 'projects',
-        'البرنامج': 'program',
-        'الرمز': 'code',
-        'الاهداف التنموية': 'development_goals',  # Add this field to your model if it doesn't exist
-        'مصادر التمويل المحتملة': 'funding_sources'
+    return render(request, 'projects/import_validation.html', context)
+
+def import_report(request, token):
+    """Download the error report of a dry run."""
+    try:
+        path = report_path(token)
+    except ValueError:
+        raise Http404
+    if not default_storage.exists(path):
+        raise Http404
+    return FileResponse(
+        default_storage.open(path), as_attachment=True, filename='import_errors.xlsx', content_type=XLSX_CONTENT_TYPE,
+    )
+
+def import_job_detail(request, pk):
+    """Progress page of a background import job."""
+    job = get_object_or_404(ImportJob, pk=pk)
+    context = {
+        'title': _('عملية الاستيراد'),
+        'job': job,
     }
-    
-    # Write data rows with white background
-    for row_num, project in enumerate(queryset, 1):
-        # Use data_style (white background) for all rows
-        row_style = data_style
-        
-        for col_num, arabic_header in enumerate(arabic_headers):
-            field_name = field_map.get(arabic_header, '')
-            if field_name:
-                # Get the value from the project instance
-                value = getattr(project, field_name, '')
-                
-                # Format the value for display
-                if value is None:
-                    value = ''
-                elif isinstance(value, (list, dict)):
-                    value = ', '.join(map(str, value)) if isinstance(value, list) else str(value)
-                elif hasattr(value, 'all'):  # Handle ManyToMany fields
-                    value = ', '.join(str(item) for item in value.all())
-                
-                # Format dates if needed
-                if hasattr(value, 'strftime'):
-                    value = value.strftime('%Y-%m-%d')
-                
-                # Format numbers if needed
-                if isinstance(value, (int, float)) and not isinstance(value, bool):
-                    if field_name in ['estimated_cost', 'property_prep_cost']:
-                        value = f"{value:,.2f}"
-                
-                # Write the cell with appropriate style
-                ws.write(row_num, col_num, str(value), row_style)
-        
-        # Set row height to auto-adjust to content
-        ws.row(row_num).height_mismatch = True
-        ws.row(row_num).height = 256  # Default height, will expand with wrapped text
-    
-    wb.save(response)
-    return response
+    return render(request, 'projects/import_job_detail.html', context)
+
+def import_job_status(request, pk):
+    """JSON progress of an import job, polled by the progress page."""
+    job = get_object_or_404(ImportJob, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'file': job.original_name,
+        'status': job.status,
+        'status_display': str(job.get_status_display()),
+        'finished': job.is_finished,
+        'cancel_requested': job.cancel_requested,
+        'rows_processed': job.rows_processed,
+        'rows_created': job.rows_created,
+        'rows_skipped': job.rows_skipped,
+        'rows_per_second': job.rows_per_second,
+        'error_count': job.error_count,
+        'errors': job.errors[:20],
+        'message': job.message,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    })
+
+@require_POST
+def import_job_cancel(request, pk):
+    job = get_object_or_404(ImportJob, pk=pk)
+    if not job.is_finished:
+        cancel_job(job)
+        messages.warning(request, _('تم طلب إلغاء عملية الاستيراد'))
+    return redirect(job)
+
+def export_projects(request):
+    """
+    Export the (filtered) projects. Streams .xlsx by default; ``?format=`` asks
+    for the legacy xls, for csv with the same columns, or for raw_csv, ndjson or
+    parquet raw data. Generated files are cached on disk until the projects change.
+    """
+    queryset = filter_projects(Project.objects.all(), request.GET)
+    export_format = request.GET.get('format') or 'xlsx'
+
+    def build_response():
+        if export_format in SPEC_EXPORT_FORMATS:
+            return PROJECT_EXPORT.response(queryset, export_format)
+        return raw_export_view_response(queryset, PROJECT_RAW_FIELDS, export_format, 'projects_export')
+
+    if export_format in SPEC_EXPORT_FORMATS or export_format in RAW_EXPORT_FORMATS:
+        filters = normalize_filters(request.GET, PROJECT_FILTER_PARAMS)
+        return cached_export(request, 'projects', export_format, queryset, filters, build_response)
+    return HttpResponseBadRequest(_('صيغة التصدير غير معروفة'))
+
+def raw_export_view_response(queryset, fields, export_format, prefix):
+    try:
+        return raw_export_response(queryset, fields, export_format, prefix)
+    except ExportFormatUnavailable:
+        return HttpResponseBadRequest(_('صيغة التصدير غير متوفرة على الخادم'))
@@ -0,0 +1,534 @@
+"""
+Streaming XLSX writer and reader.
+
+Writes a single-sheet workbook straight into a zip stream and yields the
+bytes as rows are added, so an export can start sending data before the last
+row is read and memory use does not depend on the number of rows. Cells are
+written as inline strings or numbers, and styles are declared up front.
+openpyxl's write-only mode is not used: it only produces bytes once the whole
+workbook has been saved, and it was about four times slower on a 100k-row
+export. Timezone-aware datetimes are written in local time, as Excel has no
+notion of time zones.
+
+``iter_xlsx_rows`` reads the first sheet of a workbook back as plain values,
+parsing the sheet XML as it is decompressed.
+"""
+import datetime
+import math
+import posixpath
+import re
+import zipfile
+from decimal import Decimal
+from xml.parsers import expat
+from xml.sax.saxutils import escape, quoteattr
+
+from django.utils import timezone
+
+# Characters that are not allowed in XML 1.0 documents
+_ILLEGAL_XML_CHARS_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+# Built-in number formats do not need a <numFmt> entry
+_BUILTIN_NUM_FORMATS = {'General': 0, '0': 1, '0.00': 2, '#,##0': 3, '#,##0.00': 4,
+                        '0%': 9, '0.00%': 10}
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def column_letter(index):
+    """Return the spreadsheet letter of a 0-based column index (0 -> A, 26 -> AA)."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class XlsxStyle:
+    """Cell formatting: font, fill, border, alignment and number format."""
+
+    def __init__(self, bold=False, font_color=None, font_size=10, fill_color=None,
+                 border=None, border_color=None, horizontal=None, vertical=None,
+                 wrap=False, right_to_left=False, num_format=None):
+        self.bold = bold
+        self.font_color = font_color
+        self.font_size = font_size
+        self.fill_color = fill_color
+        self.border = border
+        self.border_color = border_color
+        self.horizontal = horizontal
+        self.vertical = vertical
+        self.wrap = wrap
+        self.right_to_left = right_to_left
+        self.num_format = num_format
+
+    def font_xml(self):
+        parts = ['<font>']
+        if self.bold:
+            parts.append('<b/>')
+        parts.append(f'<sz val="{self.font_size}"/>')
+        if self.font_color:
+            parts.append(f'<color rgb="FF{self.font_color}"/>')
+        parts.append('<name val="Arial"/><family val="2"/></font>')
+        return ''.join(parts)
+
+    def fill_xml(self):
+        if not self.fill_color:
+            return None
+        return (f'<fill><patternFill patternType="solid"><fgColor rgb="FF{self.fill_color}"/>'
+                f'<bgColor indexed="64"/></patternFill></fill>')
+
+    def border_xml(self):
+        if not self.border:
+            return None
+        color = f'<color rgb="FF{self.border_color}"/>' if self.border_color else '<color auto="1"/>'
+        sides = ''.join(f'<{side} style="{self.border}">{color}</{side}>'
+                        for side in ('left', 'right', 'top', 'bottom'))
+        return f'<border>{sides}<diagonal/></border>'
+
+    def alignment_xml(self):
+        attrs = []
+        if self.horizontal:
+            attrs.append(f'horizontal="{self.horizontal}"')
+        if self.vertical:
+            attrs.append(f'vertical="{self.vertical}"')
+        if self.wrap:
+            attrs.append('wrapText="1"')
+        if self.right_to_left:
+            attrs.append('readingOrder="2"')
+        return f'<alignment {" ".join(attrs)}/>' if attrs else None
+
+
+def build_styles_xml(styles):
+    """Build xl/styles.xml; style N of ``styles`` becomes cell format N + 1."""
+    fonts = ['<font><sz val="10"/><name val="Arial"/><family val="2"/></font>']
+    fills = ['<fill><patternFill patternType="none"/></fill>',
+             '<fill><patternFill patternType="gray125"/></fill>']
+    borders = ['<border><left/><right/><top/><bottom/><diagonal/></border>']
+    num_formats = {}
+    xfs = ['<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>']
+
+    def index_of(items, xml):
+        if xml is None:
+            return 0
+        if xml not in items:
+            items.append(xml)
+        return items.index(xml)
+
+    for style in styles:
+        font_id = index_of(fonts, style.font_xml())
+        fill_id = index_of(fills, style.fill_xml())
+        border_id = index_of(borders, style.border_xml())
+        num_fmt_id = 0
+        if style.num_format:
+            num_fmt_id = _BUILTIN_NUM_FORMATS.get(style.num_format)
+            if num_fmt_id is None:
+                num_fmt_id = num_formats.setdefault(style.num_format, 164 + len(num_formats))
+        alignment = style.alignment_xml()
+        attrs = (f'numFmtId="{num_fmt_id}" fontId="{font_id}" fillId="{fill_id}" '
+                 f'borderId="{border_id}" xfId="0"')
+        if num_fmt_id:
+            attrs += ' applyNumberFormat="1"'
+        if font_id:
+            attrs += ' applyFont="1"'
+        if fill_id:
+            attrs += ' applyFill="1"'
+        if border_id:
+            attrs += ' applyBorder="1"'
+        if alignment:
+            xfs.append(f'<xf {attrs} applyAlignment="1">{alignment}</xf>')
+        else:
+            xfs.append(f'<xf {attrs}/>')
+
+    num_fmts_xml = ''
+    if num_formats:
+        entries = ''.join(f'<numFmt numFmtId="{fmt_id}" formatCode={quoteattr(code)}/>'
+                          for code, fmt_id in num_formats.items())
+        num_fmts_xml = f'<numFmts count="{len(num_formats)}">{entries}</numFmts>'
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'{num_fmts_xml}'
+        f'<fonts count="{len(fonts)}">{"".join(fonts)}</fonts>'
+        f'<fills count="{len(fills)}">{"".join(fills)}</fills>'
+        f'<borders count="{len(borders)}">{"".join(borders)}</borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        f'<cellXfs count="{len(xfs)}">{"".join(xfs)}</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    )
+
+
+class StyledCell:
+    """A row value written with its own style instead of its column's."""
+
+    __slots__ = ('value', 'style')
+
+    def __init__(self, value, style):
+        self.value = value
+        self.style = style
+
+
+class StreamSink:
+    """Write-only file object that hands its buffered bytes over on demand."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    @property
+    def closed(self):
+        return False
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class StreamingXlsxWriter:
+    """
+    Stream a one-sheet workbook.
+
+    ``columns`` is a list of ``(header, width, style)`` tuples, ``style``
+    being the XlsxStyle of the column's data cells (or None). A row value can
+    be a ``StyledCell`` whose style, one of ``cell_styles``, replaces the
+    column's style for that cell.
+    """
+
+    def __init__(self, sheet_name, columns, header_style=None, right_to_left=True,
+                 freeze_header=True, show_grid=True, header_height=None,
+                 flush_every=500, cell_styles=()):
+        self.sheet_name = sheet_name
+        self.columns = columns
+        self.header_style = header_style
+        self.right_to_left = right_to_left
+        self.freeze_header = freeze_header
+        self.show_grid = show_grid
+        self.header_height = header_height
+        self.flush_every = flush_every
+
+        styles = []
+        self._header_xf = self._register(styles, header_style)
+        self._column_xfs = [self._register(styles, style) for _, _, style in columns]
+        self._cell_xfs = {id(style): self._register(styles, style) for style in cell_styles}
+        self._styles_xml = build_styles_xml(styles)
+        self._letters = [column_letter(index) for index in range(len(columns))]
+
+    @staticmethod
+    def _register(styles, style):
+        if style is None:
+            return 0
+        if style not in styles:
+            styles.append(style)
+        return styles.index(style) + 1
+
+    def _workbook_xml(self):
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name={quoteattr(self.sheet_name[:31])} sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        )
+
+    def _sheet_header_xml(self):
+        view_attrs = 'workbookViewId="0"'
+        if self.right_to_left:
+            view_attrs += ' rightToLeft="1"'
+        if not self.show_grid:
+            view_attrs += ' showGridLines="0"'
+        pane = ''
+        if self.freeze_header:
+            pane = '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+        cols = ''.join(
+            f'<col min="{index}" max="{index}" width="{width}" customWidth="1"/>'
+            for index, (_, width, _) in enumerate(self.columns, 1)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<sheetViews><sheetView {view_attrs}>{pane}</sheetView></sheetViews>'
+            '<sheetFormatPr defaultRowHeight="15"/>'
+            f'<cols>{cols}</cols>'
+            '<sheetData>'
+        )
+
+    def _cell_xml(self, ref, value, xf):
+        style = f' s="{xf}"' if xf else ''
+        if value is None or value == '':
+            return f'<c r="{ref}"{style}/>' if xf else ''
+        if isinstance(value, bool):
+            return f'<c r="{ref}"{style} t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float, Decimal)):
+            if (isinstance(value, Decimal) and not value.is_finite()
+                    or isinstance(value, float) and not math.isfinite(value)):
+                # Excel has no NaN or infinity and rejects the file
+                return f'<c r="{ref}"{style}/>' if xf else ''
+            return f'<c r="{ref}"{style}><v>{value}</v></c>'
+        if isinstance(value, datetime.datetime):
+            if timezone.is_aware(value):
+                value = timezone.make_naive(value)
+            return f'<c r="{ref}"{style}><v>{(value - _EXCEL_EPOCH).total_seconds() / 86400}</v></c>'
+        if isinstance(value, datetime.date):
+            return f'<c r="{ref}"{style}><v>{(value - _EXCEL_EPOCH.date()).days}</v></c>'
+        text = escape(_ILLEGAL_XML_CHARS_RE.sub('', str(value)))
+        return f'<c r="{ref}"{style} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def _row_xml(self, row_number, values, xfs, height=None):
+        cells = ''.join(
+            self._cell_xml(f'{letter}{row_number}', value, xf)
+            for letter, value, xf in zip(self._letters, values, xfs)
+        )
+        height_attrs = f' ht="{height}" customHeight="1"' if height else ''
+        return f'<row r="{row_number}"{height_attrs}>{cells}</row>'
+
+    def _styled_row_xml(self, row_number, values, xfs):
+        cells = []
+        for letter, value, xf in zip(self._letters, values, xfs):
+            if isinstance(value, StyledCell):
+                value, xf = value.value, self._cell_xfs[id(value.style)]
+            cells.append(self._cell_xml(f'{letter}{row_number}', value, xf))
+        return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+    def iter_bytes(self, rows):
+        """Yield the workbook file, piece by piece, for an iterable of row value lists."""
+        sink = StreamSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+            archive.writestr('_rels/.rels', _ROOT_RELS)
+            archive.writestr('xl/workbook.xml', self._workbook_xml())
+            archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+            archive.writestr('xl/styles.xml', self._styles_xml)
+
+            with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+                headers = [header for header, _, _ in self.columns]
+                header_xfs = [self._header_xf] * len(headers)
+                sheet.write(self._sheet_header_xml().encode('utf-8'))
+                sheet.write(self._row_xml(1, headers, header_xfs, self.header_height).encode('utf-8'))
+                yield sink.drain()
+
+                buffer = []
+                row_xml = self._styled_row_xml if self._cell_xfs else self._row_xml
+                for row_number, values in enumerate(rows, 2):
+                    buffer.append(row_xml(row_number, values, self._column_xfs))
+                    if len(buffer) >= self.flush_every:
+                        sheet.write(''.join(buffer).encode('utf-8'))
+                        buffer = []
+                        data = sink.drain()
+                        if data:
+                            yield data
+                buffer.append('</sheetData></worksheet>')
+                sheet.write(''.join(buffer).encode('utf-8'))
+        yield sink.drain()
+
+
+_WORKSHEET_RELATIONSHIP = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet'
+_RELATIONSHIP_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+
+def column_index(letters):
+    """Return the 0-based index of a spreadsheet column letter (A -> 0, AA -> 26)."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _local(name):
+    # Some writers prefix the spreadsheetml elements (x:c, x:v...)
+    return name.rpartition(':')[2]
+
+
+def _first_sheet_path(archive):
+    from xml.etree import ElementTree
+
+    try:
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        relationships = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    except KeyError:
+        return 'xl/worksheets/sheet1.xml'
+    sheet = next((element for element in workbook.iter() if _local(element.tag.rpartition('}')[2]) == 'sheet'), None)
+    if sheet is None:
+        return 'xl/worksheets/sheet1.xml'
+    for relationship in relationships:
+        if relationship.get('Id') == sheet.get(_RELATIONSHIP_ID) and relationship.get('Type') == _WORKSHEET_RELATIONSHIP:
+            target = relationship.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _read_shared_strings(archive):
+    try:
+        data = archive.read('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings, parts = [], []
+    # Phonetic runs (<rPh>) are not part of the text
+    state = {'text': False, 'phonetic': False}
+
+    def start(name, attrs):
+        name = _local(name)
+        if name == 't':
+            state['text'] = not state['phonetic']
+        elif name == 'rPh':
+            state['phonetic'] = True
+
+    def end(name):
+        name = _local(name)
+        if name == 't':
+            state['text'] = False
+        elif name == 'rPh':
+            state['phonetic'] = False
+        elif name == 'si':
+            strings.append(''.join(parts))
+            parts.clear()
+
+    def characters(data):
+        if state['text']:
+            parts.append(data)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler, parser.EndElementHandler = start, end
+    parser.CharacterDataHandler = characters
+    parser.Parse(data, True)
+    return strings
+
+
+def iter_xlsx_rows(file, read_size=1 << 16):
+    """
+    Yield the rows of the first sheet of an .xlsx file as lists of values.
+
+    A streaming expat parser, several times faster than openpyxl's read-only
+    mode. Values are str, int, float, bool or None (empty strings too); dates
+    come as their Excel serial number, since no import column holds dates.
+    Missing cells are filled with None and missing rows are empty lists.
+    """
+    with zipfile.ZipFile(file) as archive:
+        shared_strings = _read_shared_strings(archive)
+        rows = []
+        row = []
+        row_number = 0
+        ref = kind = None
+        parts = []
+        collecting = False
+        # Column letters -> index, filled as references are met
+        columns = {}
+
+        def start(name, attrs):
+            nonlocal row, row_number, ref, kind, collecting
+            if ':' in name:
+                name = _local(name)
+            if name == 'c':
+                ref = attrs.get('r')
+                kind = attrs.get('t')
+                parts.clear()
+            elif name == 'v' or name == 't':
+                collecting = True
+            elif name == 'row':
+                number = int(attrs.get('r', row_number + 1))
+                # Rows left out of the file are empty
+                rows.extend([] for _ in range(number - row_number - 1))
+                row_number = number
+                row = []
+
+        def end(name):
+            nonlocal collecting
+            if ':' in name:
+                name = _local(name)
+            if name == 'v' or name == 't':
+                collecting = False
+            elif name == 'c':
+                text = ''.join(parts)
+                if not text or kind == 'e':
+                    value = None
+                elif kind == 's':
+                    value = shared_strings[int(text)] or None
+                elif kind == 'inlineStr' or kind == 'str':
+                    value = text
+                elif kind == 'b':
+                    value = text == '1'
+                elif text.lstrip('-').isdigit():
+                    value = int(text)
+                else:
+                    value = float(text)
+                if ref:
+                    letters = ref.rstrip('0123456789')
+                    index = columns.get(letters)
+                    if index is None:
+                        index = columns[letters] = column_index(letters)
+                    if index > len(row):
+                        row.extend([None] * (index - len(row)))
+                row.append(value)
+            elif name == 'row':
+                rows.append(row)
+
+        def characters(data):
+            if collecting:
+                parts.append(data)
+
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler, parser.EndElementHandler = start, end
+        parser.CharacterDataHandler = characters
+        with archive.open(_first_sheet_path(archive)) as sheet:
+            while True:
+                data = sheet.read(read_size)
+                parser.Parse(data, not data)
+                yield from rows
+                rows.clear()
+                if not data:
+                    break